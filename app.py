@@ -3,37 +3,68 @@
 import streamlit as st
 from src.ui.visualizacion import mostrar_visualizacion
 from src.ui.convertir_png import mostrar_convertir_png  # Importar la nueva función
-from src.ui.clasificacion_deep_learning import (
-    cargar_modelo_primary,
-    cargar_modelo_secondary_masas,
-    cargar_modelo_secondary_calcifi,
-    procesar_archivo,
-    clasificar_imagen,
-    mostrar_resultados_primary,
-    mostrar_resultados_secondary_masas,
-    mostrar_resultados_secondary_calcifi
+from src.inferencia.cliente import clasificar_remoto, clasificar_remoto_lote, estado_servidor
+from src.config.settings import SERVIDOR_INFERENCIA_URL
+from src.utilidades.descarga_modelos import (
+    obtener_modelo,
+    obtener_modelos,
+    limpiar_temporales,
+    ProgresoLimitado
+)
+from src.config.modelos import (
+    MODEL_DIR,
+    MODELOS_INFO,
+    PREDICTION_MAPPINGS,
+    MODELO_SECUNDARIO_POR_ETIQUETA,
+    ruta_modelo
 )
 from PIL import Image
 import os
-import torch
-import requests
-import zipfile
 import logging
 import time
 import random
+from functools import partial
 
 # Configuración del logger
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 
+# Funciones de src.ui.clasificacion_deep_learning por modelo. Se guardan por nombre porque ese módulo
+# importa torch y transformers, y solo se carga al abrir la sección de clasificación.
+CARGADORES = {
+    'primario': 'cargar_modelo_primary',
+    'secondary_masas': 'cargar_modelo_secondary_masas',
+    'secondary_calcifi': 'cargar_modelo_secondary_calcifi'
+}
+
+MOSTRAR_RESULTADOS_SECUNDARIOS = {
+    'secondary_masas': 'mostrar_resultados_secondary_masas',
+    'secondary_calcifi': 'mostrar_resultados_secondary_calcifi'
+}
+
+
+def _funcion_clasificacion(nombre):
+    """
+    Devuelve una función del subsistema de clasificación, importándolo en el primer uso.
+
+    :param nombre: Nombre de la función en src.ui.clasificacion_deep_learning.
+    :return: La función solicitada.
+    """
+    from src.ui import clasificacion_deep_learning
+    return getattr(clasificacion_deep_learning, nombre)
+
+
 @st.cache_resource
-def descargar_modelo(model_dir, model_folder, file_url):
+def descargar_modelo(model_dir, model_folder, file_url, sha256=None):
     """
-    Descarga y extrae el modelo desde SharePoint si no existe localmente.
+    Descarga y extrae el modelo desde SharePoint si no existe localmente; el ZIP se verifica solo si
+    MODELOS_INFO trae su SHA-256. Una descarga interrumpida se reanuda en el siguiente intento.
+
+    :raises Exception: Si la descarga o la extracción fallan. Se relanza para que st.cache_resource no guarde
+                       el fallo y el siguiente intento retome el archivo parcial.
     """
     model_path = os.path.join(model_dir, model_folder)
-    os.makedirs(model_dir, exist_ok=True)
 
     if os.path.exists(model_path):
         st.info(f"El modelo '{model_folder}' ya está presente localmente.")
@@ -42,40 +73,169 @@ def descargar_modelo(model_dir, model_folder, file_url):
     st.info(f"Descargando el modelo '{model_folder}' desde SharePoint. Esto puede tardar unos minutos...")
 
     try:
-        # Obtener el contenido del archivo ZIP desde el enlace de SharePoint
         with st.spinner(f"Descargando {model_folder}..."):
-            response = requests.get(file_url, stream=True)
-            if response.status_code != 200:
-                st.error(f"Error al descargar el modelo '{model_folder}'. Código de estado: {response.status_code}")
-                return None
-
-            zip_path = os.path.join(model_dir, f"{model_folder}.zip")
-            total_size_in_bytes = int(response.headers.get('content-length', 0))
-            block_size = 1024  # 1 Kibibyte
             progress_bar = st.progress(0)
-            downloaded_size = 0
-
-            with open(zip_path, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    downloaded_size += len(data)
-                    f.write(data)
-                    if total_size_in_bytes > 0:
-                        progress = downloaded_size / total_size_in_bytes
-                        progress_bar.progress(min(progress, 1.0))
-
-        # Extraer el archivo ZIP
-        with st.spinner(f"Extrayendo {model_folder}..."):
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(model_dir)
-
-        # Eliminar el archivo ZIP descargado
-        os.remove(zip_path)
+            limpiar_temporales(model_dir)
+            obtener_modelo(
+                model_dir,
+                model_folder,
+                file_url,
+                sha256=sha256,
+                al_avanzar=ProgresoLimitado(
+                    lambda descargado, total: progress_bar.progress(min(descargado / total, 1.0)) if total else None
+                )
+            )
         st.success(f"Modelo '{model_folder}' descargado y extraído correctamente.")
         return model_path
     except Exception as e:
         logger.error(f"Error al descargar o extraer el modelo '{model_folder}': {e}")
         st.error(f"Error al descargar o extraer el modelo '{model_folder}': {e}")
-        return None
+        raise
+
+
+def descargar_modelos_faltantes():
+    """
+    Descarga en paralelo los modelos de la cascada que aún no están en disco.
+    """
+    faltantes = {key: info for key, info in MODELOS_INFO.items() if not os.path.exists(ruta_modelo(key))}
+    if not faltantes:
+        st.info("Todos los modelos están presentes localmente.")
+        return
+
+    barras = {key: st.progress(0, text=info['model_folder']) for key, info in faltantes.items()}
+
+    def al_progresar(estado):
+        for key, (descargado, total) in estado.items():
+            if total:
+                barras[key].progress(min(descargado / total, 1.0),
+                                     text=f"{faltantes[key]['model_folder']}: {descargado / 1024 ** 2:.0f} MB")
+
+    with st.spinner(f"Descargando {len(faltantes)} modelos..."):
+        resultados = obtener_modelos(faltantes, MODEL_DIR, al_progresar=al_progresar)
+
+    for key, resultado in resultados.items():
+        if isinstance(resultado, Exception):
+            st.error(f"Error al descargar o extraer el modelo '{faltantes[key]['model_folder']}': {resultado}")
+        else:
+            barras[key].progress(1.0, text=f"{faltantes[key]['model_folder']}: listo")
+    # Las rutas ya existen; se invalida la caché para que descargar_modelo las detecte
+    descargar_modelo.clear()
+
+
+def preparar_clasificador(key, precision='fp32'):
+    """
+    Descarga (si es necesario) y carga un único modelo de la cascada.
+
+    :param key: Clave del modelo en MODELOS_INFO.
+    :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
+    :return: Pipeline de clasificación o None si no se pudo preparar.
+    """
+    info = MODELOS_INFO[key]
+    with st.spinner(f"Preparando el modelo '{info['model_folder']}'..."):
+        try:
+            model_path = descargar_modelo(
+                model_dir=MODEL_DIR,
+                model_folder=info['model_folder'],
+                file_url=info['file_url'],
+                sha256=info.get('sha256')
+            )
+        except Exception:
+            # descargar_modelo ya mostró el error
+            return None
+    return _funcion_clasificacion(CARGADORES[key])(model_path, precision)
+
+
+def clasificar_en_lote(uploaded_images, batch_size, precision='fp32', url_servidor=None):
+    """
+    Procesa varias imágenes y las clasifica en lote con la cascada primaria/secundaria.
+
+    :param uploaded_images: Lista de archivos cargados por el usuario.
+    :param batch_size: Cantidad de imágenes por pasada del modelo.
+    :param precision: Modo de precisión de los modelos.
+    :param url_servidor: URL del servidor de inferencia. Si es None la inferencia se hace en este proceso.
+    """
+    from src.ui.clasificacion_deep_learning import procesar_archivo, clasificar_cascada_lote, mostrar_resultados_lote
+
+    nombres = []
+    images = []
+    with st.spinner("Procesando las imágenes..."):
+        for uploaded_image in uploaded_images:
+            image, tipo_archivo = procesar_archivo(uploaded_image)
+            if image:
+                nombres.append(uploaded_image.name)
+                images.append(image)
+            else:
+                st.error(f"No se pudo procesar la imagen {uploaded_image.name}")
+
+    if not images:
+        return
+
+    if url_servidor:
+        # El servidor agrupa las solicitudes concurrentes en micro-lotes
+        with st.spinner(f"Clasificando {len(images)} imágenes en el servidor de inferencia..."):
+            try:
+                resultados, metricas = clasificar_remoto_lote(images, url_servidor, precision=precision)
+            except RuntimeError as e:
+                st.error(str(e))
+                return
+        mostrar_resultados_lote(nombres, resultados, metricas)
+        return
+
+    classifier_primary = preparar_clasificador('primario', precision)
+    if not classifier_primary:
+        st.error("No se pudo cargar el modelo primario para la clasificación.")
+        return
+
+    with st.spinner(f"Clasificando {len(images)} imágenes..."):
+        resultados, metricas = clasificar_cascada_lote(
+            images,
+            classifier_primary,
+            lambda key: preparar_clasificador(key, precision),
+            PREDICTION_MAPPINGS,
+            MODELO_SECUNDARIO_POR_ETIQUETA,
+            batch_size=batch_size
+        )
+    mostrar_resultados_lote(nombres, resultados, metricas)
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def consultar_estado_servidor(url_servidor):
+    """
+    Estado del servidor de inferencia, reutilizado durante unos segundos: cada interacción vuelve a
+    ejecutar el script y, sin caché, cada una haría una petición HTTP (hasta 2 s si el servidor no responde).
+
+    :param url_servidor: URL del servidor de inferencia.
+    :return: Diccionario de estado o None si el servidor no responde.
+    """
+    return estado_servidor(url_servidor)
+
+
+def clasificar_en_servidor(image, url_servidor, precision='fp32'):
+    """
+    Clasifica una imagen con el servidor de inferencia y muestra los resultados de la cascada.
+
+    :param image: Imagen PIL Image ya preprocesada.
+    :param url_servidor: URL del servidor de inferencia.
+    :param precision: Modo de precisión de los modelos en el servidor.
+    """
+    from src.ui.clasificacion_deep_learning import mostrar_resultados_primary
+
+    with st.spinner("Clasificando en el servidor de inferencia..."):
+        try:
+            resultado = clasificar_remoto(image, url_servidor, precision=precision)
+        except RuntimeError as e:
+            st.error(str(e))
+            return
+
+    mostrar_resultados_primary(resultado['primario'])
+    key = resultado['modelo_secundario']
+    if key is not None:
+        _funcion_clasificacion(MOSTRAR_RESULTADOS_SECUNDARIOS[key])(resultado['secundario'])
+    elif resultado['etiqueta_primaria'] in MODELO_SECUNDARIO_POR_ETIQUETA:
+        st.error(f"No se pudo cargar el modelo secundario para la clasificación de "
+                 f"{resultado['etiqueta_primaria']}.")
+    elif resultado['etiqueta_primaria'] == 'no_encontrado':
+        st.write("### La imagen no contiene masas ni calcificaciones detectadas.")
 
 
 def main():
@@ -132,6 +292,10 @@ def main():
             )
             opciones['uploaded_files'] = uploaded_files
             opciones['mostrar_metadatos'] = st.sidebar.checkbox("Mostrar Metadatos", value=False)
+            opciones['visor_ventana'] = st.sidebar.checkbox(
+                "Visor interactivo de ventana/nivel", value=False,
+                help="Ajusta centro y ancho de ventana sobre una copia de 16 bits sin volver a decodificar el DICOM."
+            )
             opciones['aplicar_voilut'] = st.sidebar.checkbox("Aplicar VOI LUT", value=False)
             opciones['invertir_interpretacion'] = st.sidebar.checkbox("Invertir Interpretación Fotométrica",
                                                                       value=False)
@@ -155,6 +319,12 @@ def main():
                     opciones['transformaciones_seleccionadas'][key] = st.sidebar.checkbox(label=label, value=False,
                                                                                           key=key)
 
+            # Una imagen se muestra en alta resolución (o en el visor de ventana/nivel) y varias en cuadrícula
+            try:
+                mostrar_visualizacion(opciones)
+            except Exception as e:
+                st.error(f"Error al visualizar las imágenes DICOM: {e}")
+
         elif subseccion == "Convertir a PNG":
             try:
                 mostrar_convertir_png(opciones)
@@ -164,6 +334,62 @@ def main():
     elif tipo_carga == "Clasificación mediante Deep Learning":
         st.sidebar.write("### Opciones para Clasificación mediante Deep Learning")
 
+        # torch y transformers se importan solo al abrir esta sección
+        from src.ui.clasificacion_deep_learning import (
+            procesar_archivo,
+            clasificar_imagen,
+            clasificar_tensor,
+            clasificar_reducida,
+            clasificar_cascada_paralela,
+            configurar_hilos,
+            leer_dicom_tensor,
+            mostrar_resultados_primary,
+            mostrar_estado_modelos,
+            precalentar_modelos
+        )
+        from src.procesamiento.tensores import tensor_a_imagen
+        from src.inferencia.precision import PRECISIONES
+
+        precision = st.sidebar.selectbox(
+            "Precisión de inferencia",
+            PRECISIONES,
+            help="fp32: precisión completa. bf16: autocast bfloat16. "
+                 "int8: cuantización dinámica de las capas Linear (solo CPU)."
+        )
+        usar_servidor = st.sidebar.checkbox(
+            "Usar servidor de inferencia",
+            value=False,
+            help="Envía las imágenes al servidor local de inferencia (python -m src.inferencia.servidor), "
+                 "que agrupa las solicitudes de todos los usuarios en micro-lotes."
+        )
+        url_servidor = None
+        if usar_servidor:
+            url_servidor = st.sidebar.text_input("URL del servidor de inferencia", value=SERVIDOR_INFERENCIA_URL)
+            if consultar_estado_servidor(url_servidor) is None:
+                st.sidebar.warning(f"El servidor de inferencia no responde en {url_servidor}.")
+        modo_lote = st.sidebar.checkbox("Modo lote (varias imágenes)", value=False)
+
+        if modo_lote:
+            # Subir varias imágenes y clasificarlas en lotes
+            uploaded_images = st.sidebar.file_uploader(
+                "Cargar imágenes (DICOM, PNG, JPG)",
+                type=["dcm", "dicom", "png", "jpg", "jpeg"],
+                accept_multiple_files=True
+            )
+            batch_size = st.sidebar.number_input(
+                "Tamaño de lote",
+                min_value=1,
+                max_value=64,
+                step=1,
+                value=8,
+                help="Cantidad de imágenes por pasada del modelo."
+            )
+            mostrar_estado_modelos()
+
+            if uploaded_images:
+                clasificar_en_lote(uploaded_images, int(batch_size), precision, url_servidor)
+            return
+
         # Subir una imagen (DICOM, PNG, JPG)
         uploaded_image = st.sidebar.file_uploader(
             "Cargar imagen (DICOM, PNG, JPG)",
@@ -171,71 +397,109 @@ def main():
             accept_multiple_files=False
         )
 
-        if uploaded_image is not None:
-            # Procesar la imagen
-            image, tipo_archivo = procesar_archivo(uploaded_image)
+        # Estado de los modelos compartidos por el proceso
+        mostrar_estado_modelos()
 
-            if image:
+        if st.sidebar.button("Descargar modelos faltantes"):
+            descargar_modelos_faltantes()
+
+        reduccion_tokens = st.sidebar.slider(
+            "Reducción de tokens (parches de fondo)",
+            min_value=0.0,
+            max_value=0.75,
+            value=0.0,
+            step=0.05,
+            help="Fracción de parches casi constantes que se descartan antes del encoder del ViT. "
+                 "0 usa el modelo completo."
+        )
+        preprocesamiento_tensor = st.sidebar.checkbox(
+            "Preprocesamiento directo a tensor (DICOM)",
+            value=False,
+            help="Convierte el DICOM a tensor con una sola redimensión, sin conversiones intermedias a PIL."
+        )
+        ejecucion_paralela = st.sidebar.checkbox(
+            "Ejecución paralela de la cascada",
+            value=False,
+            help="Ejecuta los modelos secundarios a la vez que el primario y conserva solo el que corresponde. "
+                 "Requiere los tres modelos en memoria y núcleos de CPU libres."
+        )
+        if ejecucion_paralela:
+            nucleos = os.cpu_count() or 1
+            hilos_por_modelo = int(st.sidebar.number_input(
+                "Hilos intra-op por modelo",
+                min_value=1,
+                max_value=nucleos,
+                step=1,
+                value=max(1, nucleos // 3),
+                help="torch.set_num_threads en cada hilo de la cascada."
+            ))
+            hilos_inter_op = int(st.sidebar.number_input(
+                "Hilos inter-op",
+                min_value=1,
+                max_value=nucleos,
+                step=1,
+                value=1,
+                help="torch.set_num_interop_threads; solo se aplica antes de la primera inferencia del proceso."
+            ))
+        precalentar = st.sidebar.checkbox(
+            "Precargar modelos secundarios en segundo plano",
+            value=False,
+            help="Carga los modelos secundarios restantes después de mostrar el primer resultado."
+        )
+
+        if uploaded_image is not None:
+            extension = os.path.splitext(uploaded_image.name)[1].lower()
+            if preprocesamiento_tensor and extension in ['.dcm', '.dicom']:
+                # Convertir el DICOM directamente a tensor, sin pasar por PIL
+                entrada = leer_dicom_tensor(uploaded_image)
+                image = tensor_a_imagen(entrada) if entrada is not None else None
+                clasificar = clasificar_tensor
+            else:
+                # Procesar la imagen
+                image, tipo_archivo = procesar_archivo(uploaded_image)
+                entrada = image
+                clasificar = clasificar_imagen
+
+            if reduccion_tokens > 0:
+                clasificar = partial(clasificar_reducida, proporcion=reduccion_tokens)
+
+            if image is not None:
                 st.image(image, caption='Imagen procesada (224x224)', use_column_width=True)
 
-                # Definir las rutas y file_urls para los tres modelos
-                modelos_info = {
-                    'primario': {
-                        'model_folder': 'ViT-large-patch16-224_B',
-                        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/EVMIWphh_1ZIrDG6VeKXZX0BIT3vlDBoensMcRx-YTve3w?e=WTaQdV'
-                        # Enlace de descarga directo del modelo primario
-                    },
-                    'secondary_masas': {
-                        'model_folder': 'VT_V8',
-                        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/INSERT_SECONDARY_MASAS_URL_HERE?e=XXXXXX'
-                        # Reemplaza con el URL de descarga directo del modelo secundario para masas
-                    },
-                    'secondary_calcifi': {
-                        'model_folder': 'CALCI',
-                        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/EbGZhS3H-XFHvOFJKsTmz4sBX2g7OqtrtnaSzlap3b0h5Q?e=iuNG1y'
-                        # Enlace de descarga directo del modelo CALCI
-                    }
-                }
-
-                # Descargar y cargar los modelos
-                classifiers = {}
-                prediction_mappings = {}
-
-                for key, info in modelos_info.items():
-                    with st.spinner(f"Preparando el modelo '{info['model_folder']}'..."):
-                        model_path = descargar_modelo(
-                            model_dir=os.path.join('src', 'data', 'modelos'),
-                            model_folder=info['model_folder'],
-                            file_url=info['file_url']
-                        )
+                if url_servidor:
+                    if clasificar is clasificar_imagen:
+                        clasificar_en_servidor(image, url_servidor, precision)
+                        return
+                    # El servidor solo ejecuta la cascada sobre la imagen PIL completa
+                    logger.info("El preprocesamiento a tensor y la reducción de tokens no se admiten en el "
+                                "servidor de inferencia; la clasificación se hace en este proceso.")
+                    st.info("El servidor de inferencia no admite el preprocesamiento directo a tensor ni la "
+                            "reducción de tokens: esta imagen se clasifica en este proceso.")
 
-                    if model_path:
-                        if key == 'primario':
-                            classifiers['primario'] = cargar_modelo_primary(model_path)
-                            prediction_mappings['primario'] = {
-                                'LABEL_0': 'masas',
-                                'LABEL_1': 'calcificaciones',
-                                'LABEL_2': 'no_encontrado'
-                            }
-                        elif key == 'secondary_masas':
-                            classifiers['secondary_masas'] = cargar_modelo_secondary_masas(model_path)
-                            prediction_mappings['secondary_masas'] = {
-                                'LABEL_0': 'benigna',
-                                'LABEL_1': 'maligna'
-                            }
-                        elif key == 'secondary_calcifi':
-                            classifiers['secondary_calcifi'] = cargar_modelo_secondary_calcifi(model_path)
-                            prediction_mappings['secondary_calcifi'] = {
-                                'LABEL_0': 'benigna',
-                                'LABEL_1': 'sospechosa',
-                                'LABEL_2': 'maligna'
-                            }
+                # El modelo primario se prepara primero; los secundarios solo cuando se necesitan
+                classifier_primary = preparar_clasificador('primario', precision)
 
                 # Verificar que el modelo primario se ha cargado correctamente
-                if 'primario' in classifiers and classifiers['primario']:
-                    # Realizar la inferencia primaria
-                    mapped_result_primary = clasificar_imagen(image, classifiers['primario'],
-                                                              prediction_mappings['primario'])
+                if classifier_primary:
+                    if ejecucion_paralela:
+                        # Los secundarios se ejecutan a la vez que el primario
+                        configurar_hilos(inter_op=hilos_inter_op)
+                        classifiers_secondary = {key: preparar_clasificador(key, precision)
+                                                 for key in MOSTRAR_RESULTADOS_SECUNDARIOS}
+                        mapped_result_primary, mapped_result_secondary = clasificar_cascada_paralela(
+                            entrada,
+                            classifier_primary,
+                            classifiers_secondary,
+                            PREDICTION_MAPPINGS,
+                            MODELO_SECUNDARIO_POR_ETIQUETA,
+                            clasificar=clasificar,
+                            hilos_por_modelo=hilos_por_modelo
+                        )
+                    else:
+                        classifiers_secondary = None
+                        # Realizar la inferencia primaria
+                        mapped_result_primary = clasificar(entrada, classifier_primary,
+                                                           PREDICTION_MAPPINGS['primario'])
 
                     # Mostrar los resultados de la clasificación primaria
                     mostrar_resultados_primary(mapped_result_primary)
@@ -244,36 +508,32 @@ def main():
                     if mapped_result_primary:
                         # Determinar la etiqueta con mayor puntuación
                         primary_label = max(mapped_result_primary, key=mapped_result_primary.get)
-                        if primary_label == 'masas':
-                            if 'secondary_masas' in classifiers and classifiers['secondary_masas']:
-                                # Realizar la inferencia secundaria para masas
-                                mapped_result_secondary_masas = clasificar_imagen(image, classifiers['secondary_masas'],
-                                                                                  prediction_mappings[
-                                                                                      'secondary_masas'])
-                                # Mostrar los resultados de la clasificación secundaria para masas
-                                mostrar_resultados_secondary_masas(mapped_result_secondary_masas)
+                        key = MODELO_SECUNDARIO_POR_ETIQUETA.get(primary_label)
+                        if key is not None:
+                            if classifiers_secondary is None:
+                                classifier_secondary = preparar_clasificador(key, precision)
+                                if classifier_secondary:
+                                    # Realizar la inferencia secundaria
+                                    mapped_result_secondary = clasificar(entrada, classifier_secondary,
+                                                                         PREDICTION_MAPPINGS[key])
                             else:
-                                st.error("No se pudo cargar el modelo secundario para la clasificación de masas.")
-
-                        elif primary_label == 'calcificaciones':
-                            if 'secondary_calcifi' in classifiers and classifiers['secondary_calcifi']:
-                                # Realizar la inferencia secundaria para calcificaciones
-                                mapped_result_secondary_calcifi = clasificar_imagen(image,
-                                                                                    classifiers['secondary_calcifi'],
-                                                                                    prediction_mappings[
-                                                                                        'secondary_calcifi'])
-                                # Mostrar los resultados de la clasificación secundaria para calcificaciones
-                                mostrar_resultados_secondary_calcifi(mapped_result_secondary_calcifi)
+                                classifier_secondary = classifiers_secondary.get(key)
+                            if classifier_secondary:
+                                _funcion_clasificacion(MOSTRAR_RESULTADOS_SECUNDARIOS[key])(mapped_result_secondary)
                             else:
-                                st.error(
-                                    "No se pudo cargar el modelo secundario para la clasificación de calcificaciones.")
+                                st.error(f"No se pudo cargar el modelo secundario para la clasificación de "
+                                         f"{primary_label}.")
                         elif primary_label == 'no_encontrado':
                             st.write("### La imagen no contiene masas ni calcificaciones detectadas.")
+
+                    # Precargar en segundo plano los secundarios que aún no están en memoria
+                    if precalentar:
+                        precalentar_modelos([ruta_modelo(key) for key in MOSTRAR_RESULTADOS_SECUNDARIOS],
+                                            precision)
                 else:
                     st.error("No se pudo cargar el modelo primario para la clasificación.")
         else:
             pass
 
-
 if __name__ == "__main__":
     main()
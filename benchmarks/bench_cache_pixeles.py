@@ -0,0 +1,71 @@
+# benchmarks/bench_cache_pixeles.py
+# Compara la decodificación de DICOM comprimidos con la lectura desde la caché de píxeles (.npy con mmap),
+# tanto de pixel_array solo como de procesar_dicom completo.
+#
+# Uso: python -m benchmarks.bench_cache_pixeles [--repeticiones 3]
+
+import argparse
+import io
+import tempfile
+import time
+import numpy as np
+import pydicom
+from pydicom.uid import JPEG2000Lossless, RLELossless
+from benchmarks.dicom_sintetico import crear_dataset, crear_pixeles_mamografia, dataset_a_bytes
+from src.procesamiento import cache_pixeles
+from src.procesamiento.cache_pixeles import CachePixeles
+from src.procesamiento.motor_dicom import procesar_dicom
+
+SINTAXIS = {
+    'JPEG 2000 Lossless': JPEG2000Lossless,
+    'RLE Lossless': RLELossless,
+}
+
+
+def medir(funcion, datos, repeticiones):
+    """
+    Tiempo medio en ms de funcion(ds), leyendo el dataset desde los bytes en cada llamada.
+    """
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(pydicom.dcmread(io.BytesIO(datos)))
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de píxeles decodificados.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    pixeles = crear_pixeles_mamografia()
+    print(f"Imagen {pixeles.shape[0]}x{pixeles.shape[1]} uint16")
+    print(f"{'Sintaxis':<22}{'Operación':<26}{'Sin caché (ms)':>16}{'Con caché (ms)':>16}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        cache = CachePixeles(directorio)
+        for nombre, sintaxis in SINTAXIS.items():
+            ds = crear_dataset(pixeles)
+            try:
+                ds.compress(sintaxis)
+            except Exception as e:
+                print(f"Se omite {nombre}: {e}")
+                continue
+            datos = dataset_a_bytes(ds)
+
+            # Primera pasada: decodifica y llena la caché; las siguientes abren el .npy con mmap
+            cache.obtener(pydicom.dcmread(io.BytesIO(datos)))
+            decodificar = medir(lambda ds: ds.pixel_array, datos, args.repeticiones)
+            desde_cache = medir(lambda ds: np.asarray(cache.obtener(ds)).sum(), datos, args.repeticiones)
+            print(f"{nombre:<22}{'pixel_array':<26}{decodificar:>16.1f}{desde_cache:>16.1f}")
+
+            cache_pixeles.CACHE_PIXELES = False
+            sin_cache = medir(lambda ds: procesar_dicom(ds, output_size=(512, 512)), datos, args.repeticiones)
+            cache_pixeles.CACHE_PIXELES = True
+            cache_pixeles._cache_pixeles = cache
+            con_cache = medir(lambda ds: procesar_dicom(ds, output_size=(512, 512)), datos, args.repeticiones)
+            print(f"{nombre:<22}{'procesar_dicom 512x512':<26}{sin_cache:>16.1f}{con_cache:>16.1f}")
+        print(f"Caché: {cache.bytes_en_disco() / 1024 ** 2:.1f} MB, {cache.aciertos} aciertos, {cache.fallos} fallos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_catalogo.py
+# Mide el catálogo de metadatos DICOM: escaneo inicial, re-escaneo incremental, y listar/filtrar/contar,
+# frente a recorrer la carpeta con os.walk y leer cada archivo completo.
+#
+# Uso: python -m benchmarks.bench_catalogo [--archivos 2000] [--carpeta /tmp/catalogo_bench]
+
+import argparse
+import os
+import tempfile
+import time
+import pydicom
+from benchmarks.dicom_sintetico import crear_dataset, crear_pixeles_mamografia, dataset_a_bytes
+from src.procesamiento.catalogo import CatalogoDicom
+
+
+def generar_archivos(carpeta, cantidad, filas, columnas):
+    """
+    Escribe 'cantidad' archivos DICOM sintéticos repartidos en subcarpetas, alternando lateralidad y modalidad.
+    """
+    pixeles = crear_pixeles_mamografia(filas, columnas)
+    for indice in range(cantidad):
+        ds = crear_dataset(pixeles)
+        ds.ImageLaterality = 'L' if indice % 2 else 'R'
+        ds.Modality = 'MG' if indice % 5 else 'OT'
+        subcarpeta = os.path.join(carpeta, f"estudio_{indice // 100:04d}")
+        os.makedirs(subcarpeta, exist_ok=True)
+        with open(os.path.join(subcarpeta, f"imagen_{indice:06d}.dcm"), 'wb') as f:
+            f.write(dataset_a_bytes(ds))
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return (time.perf_counter() - inicio) * 1000, resultado
+
+
+def lectura_completa(carpeta):
+    modalidades = []
+    for raiz, _, archivos in os.walk(carpeta):
+        for archivo in archivos:
+            if archivo.lower().endswith(('.dcm', '.dicom')):
+                modalidades.append(pydicom.dcmread(os.path.join(raiz, archivo)).Modality)
+    return sum(1 for modalidad in modalidades if modalidad == 'MG')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del catálogo de metadatos DICOM.")
+    parser.add_argument('--archivos', type=int, default=2000)
+    parser.add_argument('--filas', type=int, default=512)
+    parser.add_argument('--columnas', type=int, default=416)
+    parser.add_argument('--carpeta', help="Carpeta donde generar los archivos (por defecto, una temporal).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporal:
+        carpeta = args.carpeta or os.path.join(temporal, 'raw')
+        generar_archivos(carpeta, args.archivos, args.filas, args.columnas)
+        catalogo = CatalogoDicom(os.path.join(temporal, 'catalogo.sqlite'))
+
+        print(f"{args.archivos} archivos de {args.filas}x{args.columnas} en {carpeta}")
+        tiempo, resumen = cronometrar(lambda: catalogo.escanear(carpeta))
+        print(f"Escaneo inicial:           {tiempo:10.1f} ms {resumen}")
+        tiempo, resumen = cronometrar(lambda: catalogo.escanear(carpeta))
+        print(f"Re-escaneo sin cambios:    {tiempo:10.1f} ms {resumen}")
+        tiempo, filas = cronometrar(lambda: catalogo.listar(carpeta=carpeta))
+        print(f"Listar:                    {tiempo:10.1f} ms ({len(filas)} filas)")
+        tiempo, filas = cronometrar(lambda: catalogo.listar(carpeta=carpeta, modality='MG', laterality='L'))
+        print(f"Filtrar MG + L:            {tiempo:10.1f} ms ({len(filas)} filas)")
+        tiempo, cantidad = cronometrar(lambda: catalogo.contar(carpeta=carpeta, modality='MG'))
+        print(f"Contar MG:                 {tiempo:10.1f} ms ({cantidad})")
+        tiempo, cantidad = cronometrar(lambda: lectura_completa(carpeta))
+        print(f"os.walk + lectura completa:{tiempo:10.1f} ms ({cantidad} MG)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/bench_codificacion.py
+# Compara tiempo de codificación y tamaño de salida de cada formato y nivel de compresión
+# sobre una mamografía sintética convertida al tamaño indicado.
+#
+# Uso: python -m benchmarks.bench_codificacion [--lado 1024] [--repeticiones 5]
+
+import argparse
+from benchmarks.dicom_sintetico import crear_dataset
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.procesamiento.codificacion import codificar, profundidad
+
+CONFIGURACIONES = [
+    ('PNG', {'compresion_png': 0}),
+    ('PNG', {'compresion_png': 1}),
+    ('PNG', {'compresion_png': 1, 'estrategia_png': 'rle'}),
+    ('PNG', {'compresion_png': 3}),
+    ('PNG', {'compresion_png': 6}),
+    ('PNG', {'compresion_png': 9}),
+    ('PNG16', {'compresion_png': 1}),
+    ('PNG16', {'compresion_png': 6}),
+    ('WEBP', {}),
+    ('JPG', {'calidad_jpg': 95}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los formatos de salida de la conversión.")
+    parser.add_argument('--lado', type=int, default=1024)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    ds = crear_dataset()
+    imagenes = {bits: procesar_dicom(ds, output_size=(args.lado, args.lado), bits=bits) for bits in (8, 16)}
+
+    print(f"Imagen {args.lado}x{args.lado}")
+    print(f"{'Formato':<10}{'Opciones':<42}{'ms/imagen':>10}{'KB':>10}")
+    for formato, opciones in CONFIGURACIONES:
+        imagen = imagenes[profundidad(formato)]
+        total = 0.0
+        for _ in range(args.repeticiones):
+            datos, segundos = codificar(imagen, formato, **opciones)
+            total += segundos
+        print(f"{formato:<10}{str(opciones):<42}{total * 1000 / args.repeticiones:>10.1f}{len(datos) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_decodificacion.py
+# Compara la decodificación completa con la decodificación reducida para varias sintaxis de transferencia:
+# tiempo, pico de memoria y diferencia media con la salida completa para cada tamaño de salida.
+# Falla si una sintaxis con camino reducido (sin comprimir y JPEG 2000) devuelve los píxeles a resolución completa
+# cuando el tamaño de salida permite reducir.
+#
+# Uso: python -m benchmarks.bench_decodificacion [--repeticiones 3] [--filas 4096 --columnas 3328]
+
+import argparse
+import io
+import time
+import tracemalloc
+import numpy as np
+import pydicom
+from pydicom.uid import ExplicitVRLittleEndian, JPEG2000Lossless, RLELossless
+from benchmarks.dicom_sintetico import crear_dataset, crear_pixeles_mamografia, dataset_a_bytes
+from src.procesamiento import cache_pixeles
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.procesamiento.decodificacion import decodificar_reducido, FACTOR_MARGEN_SUBMUESTREO
+
+SINTAXIS = {
+    'Explicit VR LE': ExplicitVRLittleEndian,
+    'JPEG 2000 Lossless': JPEG2000Lossless,
+    'RLE Lossless': RLELossless,
+}
+
+
+def reduccion_esperada(sintaxis, output_size, filas, columnas):
+    """
+    Indica si la decodificación reducida debe devolver menos píxeles que la imagen completa.
+    """
+    ancho, alto = output_size
+    if sintaxis == JPEG2000Lossless:
+        # Basta un nivel wavelet que cubra la salida (el codificador genera varios)
+        return filas // 2 >= alto and columnas // 2 >= ancho
+    if sintaxis == ExplicitVRLittleEndian:
+        return min(filas // (FACTOR_MARGEN_SUBMUESTREO * alto), columnas // (FACTOR_MARGEN_SUBMUESTREO * ancho)) >= 2
+    return False
+
+
+def preparar(pixeles, sintaxis):
+    """
+    Serializa un dataset sintético en la sintaxis indicada.
+    Devuelve None si no hay un codificador instalado para esa sintaxis.
+    """
+    ds = crear_dataset(pixeles)
+    if sintaxis != ExplicitVRLittleEndian:
+        try:
+            ds.compress(sintaxis)
+        except Exception as e:
+            print(f"Se omite {sintaxis.name}: {e}")
+            return None
+    return dataset_a_bytes(ds)
+
+
+def medir(funcion, datos, repeticiones):
+    """
+    Devuelve el tiempo medio en ms, el pico de memoria en MB y el último resultado.
+    Cada llamada lee el dataset desde los bytes para incluir la decodificación.
+    """
+    def llamada():
+        return funcion(pydicom.dcmread(io.BytesIO(datos)))
+
+    resultado = llamada()  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = llamada()
+    tiempo = (time.perf_counter() - inicio) / repeticiones * 1000
+
+    tracemalloc.start()
+    llamada()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tiempo, pico / 1024 ** 2, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la decodificación a resolución reducida.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--filas', type=int, default=4096)
+    parser.add_argument('--columnas', type=int, default=3328)
+    args = parser.parse_args()
+    # Con la caché de píxeles la decodificación completa mediría aciertos en lugar de decodificar
+    cache_pixeles.CACHE_PIXELES = False
+
+    pixeles = crear_pixeles_mamografia(args.filas, args.columnas)
+    print(f"Imagen {args.filas}x{args.columnas} uint16")
+    print(f"{'Sintaxis':<22}{'Salida':<11}{'Completa (ms)':>15}{'Reducida (ms)':>15}"
+          f"{'Completa (MB)':>15}{'Reducida (MB)':>15}{'Dif. media':>12}")
+
+    for nombre, sintaxis in SINTAXIS.items():
+        datos = preparar(pixeles, sintaxis)
+        if datos is None:
+            continue
+        for output_size in ((224, 224), (256, 256), (512, 512)):
+            if reduccion_esperada(sintaxis, output_size, args.filas, args.columnas):
+                # Sin esta comprobación, un camino reducido que vuelve en silencio a la decodificación
+                # completa solo se notaría como un tiempo parecido al de la columna completa
+                forma = decodificar_reducido(pydicom.dcmread(io.BytesIO(datos)), output_size).shape
+                assert forma[0] < args.filas and forma[1] < args.columnas, (
+                    f"{nombre} {output_size}: la decodificación reducida devolvió {forma}, la resolución completa")
+            tiempo_completa, memoria_completa, completa = medir(
+                lambda ds: procesar_dicom(ds, output_size=output_size), datos, args.repeticiones)
+            tiempo_reducida, memoria_reducida, reducida = medir(
+                lambda ds: procesar_dicom(ds, output_size=output_size, reducida=True), datos, args.repeticiones)
+            diferencia = np.abs(completa.astype(np.int16) - reducida.astype(np.int16)).mean()
+            etiqueta = f"{output_size[0]}x{output_size[1]}"
+            print(f"{nombre:<22}{etiqueta:<11}{tiempo_completa:>15.1f}{tiempo_reducida:>15.1f}"
+                  f"{memoria_completa:>15.1f}{memoria_reducida:>15.1f}{diferencia:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
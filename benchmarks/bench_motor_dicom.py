@@ -0,0 +1,112 @@
+# benchmarks/bench_motor_dicom.py
+# Compara el motor común de píxeles DICOM con las tres implementaciones anteriores
+# (convertir_png, leer_dicom y procesar_imagen_dicom_cached): tiempo y pico de memoria por imagen de 4k×3k.
+# También compara la tabla precompilada del motor con su camino float32.
+#
+# Uso: python -m benchmarks.bench_motor_dicom [--repeticiones 5] [--filas 4096 --columnas 3328]
+
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from pydicom.pixel_data_handlers.util import apply_voi_lut
+from benchmarks.dicom_sintetico import crear_dataset, crear_pixeles_mamografia
+from src.procesamiento.motor_dicom import procesar_dicom, ventanear, a_uint8, debe_invertir
+
+
+def legado_convertir_png(ds, output_size=(224, 224)):
+    img_windowed = apply_voi_lut(ds.pixel_array, ds, prefer_lut=True)
+    if ds.PhotometricInterpretation == 'MONOCHROME1':
+        img_windowed = img_windowed.max() - img_windowed
+    img_normalized = (img_windowed - img_windowed.min()) / (img_windowed.max() - img_windowed.min()) * 255
+    img_normalized = img_normalized.astype(np.uint8)
+    return cv2.resize(img_normalized, output_size, interpolation=cv2.INTER_AREA)
+
+
+def legado_leer_dicom(ds):
+    img_windowed = apply_voi_lut(ds.pixel_array, ds, prefer_lut=True)
+    if ds.PhotometricInterpretation == 'MONOCHROME1':
+        img_windowed = img_windowed.max() - img_windowed
+    img_normalized = (img_windowed - img_windowed.min()) / (img_windowed.max() - img_windowed.min()) * 255
+    return img_normalized.astype(np.uint8)
+
+
+def legado_procesar(ds):
+    data = apply_voi_lut(ds.pixel_array, ds)
+    if ds.PhotometricInterpretation == 'MONOCHROME1':
+        data = np.amax(data) - data
+    data = data - np.min(data)
+    if np.max(data) != 0:
+        data = data / np.max(data)
+    else:
+        data = np.zeros(data.shape)
+    return (data * 255).astype(np.uint8)
+
+
+def motor_procesar(ds):
+    data = procesar_dicom(ds, flotante=True)
+    data *= 255
+    return data.astype(np.uint8)
+
+
+def motor_float(ds):
+    return a_uint8(ventanear(ds.pixel_array, ds), debe_invertir(ds))
+
+
+def medir(funcion, ds, repeticiones):
+    """
+    Devuelve el tiempo medio en ms y el pico de memoria asignada en MB de una llamada.
+    La decodificación de los píxeles se hace antes para medir solo la transformación.
+    """
+    funcion(ds)  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(ds)
+    tiempo = (time.perf_counter() - inicio) / repeticiones * 1000
+
+    tracemalloc.start()
+    funcion(ds)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tiempo, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor común de píxeles DICOM.")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--filas', type=int, default=4096)
+    parser.add_argument('--columnas', type=int, default=3328)
+    args = parser.parse_args()
+
+    pixeles = crear_pixeles_mamografia(args.filas, args.columnas)
+    print(f"Imagen {args.filas}x{args.columnas} uint16 ({pixeles.nbytes / 1024 ** 2:.1f} MB)")
+    print(f"{'Camino':<22}{'Caso':<16}{'Anterior (ms)':>14}{'Motor (ms)':>12}{'Anterior (MB)':>15}{'Motor (MB)':>12}")
+
+    caminos = [
+        ('convertir_png', legado_convertir_png, lambda ds: procesar_dicom(ds, output_size=(224, 224))),
+        ('leer_dicom', legado_leer_dicom, procesar_dicom),
+        ('procesar', legado_procesar, motor_procesar),
+    ]
+    casos = [
+        ('ventana', crear_dataset(pixeles)),
+        ('sin ventana', crear_dataset(pixeles, ventana=False)),
+        ('MONOCHROME1', crear_dataset(pixeles, photometric_interpretation='MONOCHROME1')),
+    ]
+    for nombre_caso, ds in casos:
+        ds.pixel_array  # Decodificar una vez; pydicom guarda el array en el dataset
+        for nombre, legado, motor in caminos:
+            tiempo_legado, memoria_legado = medir(legado, ds, args.repeticiones)
+            tiempo_motor, memoria_motor = medir(motor, ds, args.repeticiones)
+            print(f"{nombre:<22}{nombre_caso:<16}{tiempo_legado:>14.1f}{tiempo_motor:>12.1f}"
+                  f"{memoria_legado:>15.1f}{memoria_motor:>12.1f}")
+
+    print(f"\n{'Caso':<16}{'Float32 (ms)':>14}{'Tabla (ms)':>12}{'Float32 (MB)':>15}{'Tabla (MB)':>12}")
+    for nombre_caso, ds in casos:
+        tiempo_float, memoria_float = medir(motor_float, ds, args.repeticiones)
+        tiempo_tabla, memoria_tabla = medir(procesar_dicom, ds, args.repeticiones)
+        print(f"{nombre_caso:<16}{tiempo_float:>14.1f}{tiempo_tabla:>12.1f}{memoria_float:>15.1f}{memoria_tabla:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/bench_planificador.py
+# Compara el rendimiento de la conversión por lotes con el backend de hilos y el de procesos.
+#
+# Uso: python -m benchmarks.bench_planificador [--archivos 64] [--workers N]
+
+import argparse
+import os
+import tempfile
+from benchmarks.bench_catalogo import generar_archivos
+from src.procesamiento.catalogo import CatalogoDicom
+from src.procesamiento.conversion_lote import convertir_carpeta
+from src.procesamiento.planificador import BACKENDS, workers_por_defecto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los backends del planificador de conversión.")
+    parser.add_argument('--archivos', type=int, default=64)
+    parser.add_argument('--filas', type=int, default=2048)
+    parser.add_argument('--columnas', type=int, default=1664)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    workers = args.workers or workers_por_defecto()
+    with tempfile.TemporaryDirectory() as temporal:
+        carpeta = os.path.join(temporal, 'raw')
+        generar_archivos(carpeta, args.archivos, args.filas, args.columnas)
+        catalogo = CatalogoDicom(os.path.join(temporal, 'catalogo.sqlite'))
+        catalogo.escanear(carpeta)
+
+        print(f"{args.archivos} archivos de {args.filas}x{args.columnas}, {workers} workers")
+        for backend in BACKENDS:
+            resumen = convertir_carpeta(carpeta, os.path.join(temporal, backend), (224, 224), 'PNG', workers,
+                                        forzar=True, catalogo=catalogo, backend=backend)
+            tasa = resumen['convertidos'] / resumen['segundos']
+            print(f"{backend:<10}{resumen['segundos']:8.2f} s {tasa:8.1f} imágenes/s "
+                  f"({len(resumen['fallidos'])} fallidos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_preprocesamiento.py
+# Compara el preprocesamiento DICOM -> PIL -> procesador con el camino directo a tensor.
+#
+# Uso: python -m benchmarks.bench_preprocesamiento [--modelo src/data/modelos/ViT-large-patch16-224_B]
+
+import argparse
+import io
+import time
+import torch
+from transformers import AutoImageProcessor, ViTImageProcessor
+from benchmarks.dicom_sintetico import crear_dataset, dataset_a_bytes
+from src.procesamiento.tensores import normalizar_para_modelo, tamano_procesador
+from src.ui.clasificacion_deep_learning import leer_dicom, leer_dicom_tensor
+
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta la función varias veces y devuelve el tiempo medio en milisegundos y el último resultado.
+    """
+    resultado = funcion()  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del preprocesamiento previo a la inferencia.")
+    parser.add_argument('--modelo', help="Carpeta del modelo cuyo procesador de imágenes se usará.")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    image_processor = AutoImageProcessor.from_pretrained(args.modelo) if args.modelo else ViTImageProcessor()
+    dicom_bytes = dataset_a_bytes(crear_dataset())
+
+    def camino_pil():
+        image = leer_dicom(io.BytesIO(dicom_bytes))
+        return image_processor(images=image, return_tensors='pt')['pixel_values']
+
+    def camino_tensor():
+        tensor = leer_dicom_tensor(io.BytesIO(dicom_bytes), tamano_procesador(image_processor))
+        return normalizar_para_modelo(tensor, image_processor)
+
+    tiempo_pil, pixel_values_pil = medir(camino_pil, args.repeticiones)
+    tiempo_tensor, pixel_values_tensor = medir(camino_tensor, args.repeticiones)
+    diferencia = (pixel_values_pil - pixel_values_tensor).abs()
+
+    print(f"Camino PIL:    {tiempo_pil:8.1f} ms/imagen")
+    print(f"Camino tensor: {tiempo_tensor:8.1f} ms/imagen ({tiempo_pil / tiempo_tensor:.2f}x)")
+    print(f"Diferencia en pixel_values: media {diferencia.mean().item():.4f}, máxima {diferencia.max().item():.4f}")
+
+
+if __name__ == "__main__":
+    torch.set_grad_enabled(False)
+    main()
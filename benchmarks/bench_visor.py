@@ -0,0 +1,58 @@
+# benchmarks/bench_visor.py
+# Compara el costo de un cambio de ventana en el visor: reprocesar el DICOM completo con procesar_dicom
+# frente a aplicar la tabla de ventana sobre la copia de trabajo de 16 bits (nivel de pantalla y completa).
+#
+# Uso: python -m benchmarks.bench_visor [--repeticiones 10]
+
+import argparse
+import time
+from benchmarks.dicom_sintetico import crear_dataset
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.procesamiento.visor import CopiaTrabajo, tabla_ventana
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(i)
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del visor de ventana/nivel.")
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    ds = crear_dataset()
+    inicio = time.perf_counter()
+    copia = CopiaTrabajo.desde_dataset(ds)
+    creacion = (time.perf_counter() - inicio) * 1000
+    print(f"Imagen {ds.Rows}x{ds.Columns}, nivel de pantalla {copia.pantalla.shape[1]}x{copia.pantalla.shape[0]}")
+    print(f"Copia de trabajo creada en {creacion:.1f} ms")
+
+    # Cada repetición usa un centro distinto para no medir solo aciertos de la tabla cacheada
+    def centro(i):
+        return copia.minimo + (copia.maximo - copia.minimo) * (i + 1) / (args.repeticiones + 1)
+
+    def reprocesar(i):
+        ds.WindowCenter = centro(i)
+        procesar_dicom(ds)
+
+    resultados = [
+        ('procesar_dicom (decodifica y ventanea)', medir(reprocesar, args.repeticiones)),
+        ('Tabla + nivel de pantalla', medir(lambda i: copia.renderizar(centro(i), 1000), args.repeticiones)),
+        ('Tabla + resolución completa',
+         medir(lambda i: copia.renderizar(centro(i), 1000, completa=True), args.repeticiones)),
+    ]
+    tabla_ventana.cache_clear()
+    resultados.append(('Solo construir la tabla', medir(
+        lambda i: tabla_ventana(centro(i), 1000.0, False, 'LINEAR', copia.pendiente, copia.intercepto),
+        args.repeticiones)))
+
+    print(f"{'Operación':<42}{'ms':>10}")
+    for nombre, ms in resultados:
+        print(f"{nombre:<42}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/comparar_carga.py
+# Compara la carga con from_pretrained y la carga rápida desde la instantánea mapeada en memoria.
+# Cada medición se hace en un proceso nuevo, para que el tiempo y el pico de memoria sean los de un arranque.
+#
+# Uso: python -m benchmarks.comparar_carga --modelo src/data/modelos/ViT-large-patch16-224_B \
+#          [--precision fp32] [--repeticiones 3]
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Código del proceso hijo: importa las dependencias, mide solo la carga e imprime el resultado en JSON
+_SCRIPT_HIJO = (
+    "import json, sys, time\n"
+    "from src.inferencia.precision import cargar_modelo\n"
+    "from src.utilidades.memoria import pico_memoria_bytes, memoria_residente_bytes\n"
+    "pico_inicial = pico_memoria_bytes()\n"
+    "inicio = time.perf_counter()\n"
+    "model = cargar_modelo(sys.argv[1], sys.argv[2], -1, rapido=sys.argv[3] == '1')\n"
+    "segundos = time.perf_counter() - inicio\n"
+    "print(json.dumps({'segundos': segundos, 'pico_rss': pico_memoria_bytes(), 'pico_inicial': pico_inicial,\n"
+    "                  'rss': memoria_residente_bytes()}))\n"
+)
+
+
+def medir(model_path, precision, rapido):
+    """
+    Carga el modelo en un proceso nuevo.
+
+    :return: Diccionario con 'segundos', 'pico_rss', 'pico_inicial' y 'rss' (bytes).
+    """
+    proceso = subprocess.run([sys.executable, '-c', _SCRIPT_HIJO, model_path, precision, '1' if rapido else '0'],
+                             capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr[-2000:])
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el tiempo de carga y el pico de memoria de los modelos.")
+    parser.add_argument('--modelo', required=True, help="Carpeta del modelo.")
+    parser.add_argument('--precision', default='fp32', choices=['fp32', 'bf16'])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    # La primera carga rápida genera la instantánea si aún no existe
+    inicio = time.perf_counter()
+    medir(args.modelo, args.precision, True)
+    print(f"Preparación de la instantánea: {time.perf_counter() - inicio:.1f} s (incluye el arranque del proceso)")
+
+    print(f"{'Ruta de carga':<18}{'Carga (s)':>11}{'Pico RSS (MB)':>15}{'Δ pico (MB)':>13}{'RSS final (MB)':>16}")
+    for nombre, rapido in [('from_pretrained', False), ('instantánea mmap', True)]:
+        mediciones = [medir(args.modelo, args.precision, rapido) for _ in range(args.repeticiones)]
+        mejor = min(mediciones, key=lambda medicion: medicion['segundos'])
+        pico = max(medicion['pico_rss'] for medicion in mediciones)
+        delta = max(medicion['pico_rss'] - medicion['pico_inicial'] for medicion in mediciones)
+        rss = max(medicion['rss'] for medicion in mediciones)
+        print(f"{nombre:<18}{mejor['segundos']:>11.2f}{pico / 1024 ** 2:>15.1f}{delta / 1024 ** 2:>13.1f}"
+              f"{rss / 1024 ** 2:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/comparar_precision.py
+# Compara un modelo en fp32 con sus variantes bf16/int8 sobre una carpeta de imágenes:
+# latencia, memoria y concordancia de etiquetas.
+#
+# Uso: python -m benchmarks.comparar_precision --modelo src/data/modelos/ViT-large-patch16-224_B \
+#          --carpeta data/raw/estudios [--precisiones int8 bf16] [--limite 200]
+
+import argparse
+import os
+import time
+import torch
+from src.inferencia.precision import PRECISIONES
+from src.inferencia.registro import construir_pipeline, calcular_memoria_modelo
+from src.procesamiento.lectura_imagenes import leer_archivo_modelo
+from src.utilidades.memoria import memoria_residente_bytes
+
+EXTENSIONES = ('.dcm', '.dicom', '.png', '.jpg', '.jpeg')
+
+
+def cargar_imagenes(carpeta, limite=None):
+    """
+    Lee y preprocesa las imágenes de la carpeta igual que la interfaz de clasificación.
+
+    :return: Lista de tuplas (ruta, imagen PIL).
+    """
+    rutas = []
+    for root, dirs, files in os.walk(carpeta):
+        for file in sorted(files):
+            if file.lower().endswith(EXTENSIONES):
+                rutas.append(os.path.join(root, file))
+    rutas = sorted(rutas)[:limite]
+
+    imagenes = []
+    for ruta in rutas:
+        try:
+            with open(ruta, 'rb') as f:
+                image, tipo_archivo = leer_archivo_modelo(f)
+        except Exception as e:
+            print(f"Se omite {ruta}: {e}")
+            continue
+        imagenes.append((ruta, image))
+    return imagenes
+
+
+def evaluar(clasificador, imagenes):
+    """
+    Clasifica las imágenes una a una y devuelve las predicciones top-1 y la latencia media en ms.
+    """
+    predicciones = []
+    clasificador(imagenes[0][1])  # Calentamiento
+    inicio = time.perf_counter()
+    for ruta, image in imagenes:
+        resultado = clasificador(image, top_k=1)[0]
+        predicciones.append((resultado['label'], resultado['score']))
+    latencia = (time.perf_counter() - inicio) / len(imagenes) * 1000
+    return predicciones, latencia
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la inferencia fp32 con los modos de precisión reducida.")
+    parser.add_argument('--modelo', required=True, help="Carpeta del modelo.")
+    parser.add_argument('--carpeta', required=True, help="Carpeta con imágenes DICOM, PNG o JPG.")
+    parser.add_argument('--precisiones', nargs='+', default=['int8'], choices=[p for p in PRECISIONES if p != 'fp32'])
+    parser.add_argument('--limite', type=int, default=None, help="Cantidad máxima de imágenes.")
+    args = parser.parse_args()
+
+    imagenes = cargar_imagenes(args.carpeta, args.limite)
+    if not imagenes:
+        print(f"No se encontraron imágenes en {args.carpeta}")
+        return
+    print(f"Imágenes: {len(imagenes)}")
+
+    resultados = {}
+    for precision in ['fp32'] + args.precisiones:
+        memoria_antes = memoria_residente_bytes()
+        inicio = time.perf_counter()
+        clasificador = construir_pipeline(args.modelo, -1, precision)
+        tiempo_carga = time.perf_counter() - inicio
+        memoria_rss = memoria_residente_bytes() - memoria_antes
+        predicciones, latencia = evaluar(clasificador, imagenes)
+        resultados[precision] = {
+            'predicciones': predicciones,
+            'latencia': latencia,
+            'tiempo_carga': tiempo_carga,
+            'memoria_modelo': calcular_memoria_modelo(clasificador.model),
+            'memoria_rss': memoria_rss
+        }
+        del clasificador
+
+    referencia = resultados['fp32']
+    print(f"{'Precisión':<10}{'Carga (s)':>10}{'ms/imagen':>11}{'Aceleración':>13}{'Pesos (MB)':>12}"
+          f"{'ΔRSS (MB)':>11}{'Concordancia':>14}{'Δ puntuación':>14}")
+    for precision, resultado in resultados.items():
+        # Diferencia media de puntuación sobre las imágenes con la misma etiqueta top-1
+        coincidencias = [abs(ref[1] - pred[1]) for ref, pred in zip(referencia['predicciones'],
+                                                                     resultado['predicciones']) if ref[0] == pred[0]]
+        concordancia = len(coincidencias) / len(imagenes)
+        delta = sum(coincidencias) / len(coincidencias) if coincidencias else 0.0
+        print(f"{precision:<10}{resultado['tiempo_carga']:>10.1f}{resultado['latencia']:>11.1f}"
+              f"{referencia['latencia'] / resultado['latencia']:>12.2f}x"
+              f"{resultado['memoria_modelo'] / 1024 ** 2:>12.1f}{resultado['memoria_rss'] / 1024 ** 2:>11.1f}"
+              f"{concordancia * 100:>13.1f}%{delta:>14.4f}")
+
+    for precision, resultado in resultados.items():
+        if precision == 'fp32':
+            continue
+        discrepancias = [
+            (ruta, ref[0], pred[0])
+            for (ruta, image), ref, pred in zip(imagenes, referencia['predicciones'], resultado['predicciones'])
+            if ref[0] != pred[0]
+        ]
+        for ruta, etiqueta_ref, etiqueta in discrepancias:
+            print(f"[{precision}] {ruta}: fp32={etiqueta_ref} {precision}={etiqueta}")
+
+
+if __name__ == "__main__":
+    torch.set_grad_enabled(False)
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/comparar_reduccion_tokens.py
+# Compara la inferencia completa de un modelo ViT con la reducción de tokens sobre una carpeta etiquetada:
+# latencia, concordancia con el modelo completo y exactitud.
+#
+# La carpeta debe tener una subcarpeta por clase; el nombre de la subcarpeta es la etiqueta esperada
+# (ya mapeada con PREDICTION_MAPPINGS o la etiqueta cruda del modelo).
+#
+# Uso: python -m benchmarks.comparar_reduccion_tokens --modelo src/data/modelos/ViT-large-patch16-224_B \
+#          --carpeta data/raw/etiquetadas [--mapeo primario] [--proporciones 0.25 0.5 0.75] [--limite 200]
+
+import argparse
+import os
+import time
+import torch
+from benchmarks.comparar_precision import cargar_imagenes
+from src.config.modelos import PREDICTION_MAPPINGS
+from src.inferencia.reduccion_tokens import forward_reducido
+from src.inferencia.registro import construir_pipeline
+
+
+def evaluar(clasificador, imagenes, mapping, proporcion):
+    """
+    Clasifica las imágenes una a una y devuelve las etiquetas top-1 mapeadas y la latencia media en ms.
+    Con proporción 0 se ejecuta el forward completo del modelo.
+    """
+    model = clasificador.model
+
+    def inferir(image):
+        pixel_values = clasificador.image_processor(images=image, return_tensors='pt')['pixel_values']
+        pixel_values = pixel_values.to(model.device, model.dtype)
+        if proporcion > 0:
+            logits = forward_reducido(model, pixel_values, proporcion)
+        else:
+            logits = model(pixel_values=pixel_values).logits
+        etiqueta = model.config.id2label[int(logits[0].argmax())]
+        return mapping.get(etiqueta, etiqueta)
+
+    inferir(imagenes[0][1])  # Calentamiento
+    inicio = time.perf_counter()
+    predicciones = [inferir(image) for ruta, image in imagenes]
+    latencia = (time.perf_counter() - inicio) / len(imagenes) * 1000
+    return predicciones, latencia
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la inferencia completa con la reducción de tokens.")
+    parser.add_argument('--modelo', required=True, help="Carpeta del modelo.")
+    parser.add_argument('--carpeta', required=True, help="Carpeta con una subcarpeta de imágenes por clase.")
+    parser.add_argument('--mapeo', default=None, choices=list(PREDICTION_MAPPINGS),
+                        help="Mapeo de etiquetas del modelo a aplicar antes de comparar.")
+    parser.add_argument('--proporciones', nargs='+', type=float, default=[0.25, 0.5, 0.75])
+    parser.add_argument('--limite', type=int, default=None, help="Cantidad máxima de imágenes.")
+    args = parser.parse_args()
+
+    imagenes = cargar_imagenes(args.carpeta, args.limite)
+    if not imagenes:
+        print(f"No se encontraron imágenes en {args.carpeta}")
+        return
+    etiquetas = [os.path.basename(os.path.dirname(os.path.relpath(ruta, args.carpeta))) for ruta, image in imagenes]
+    print(f"Imágenes: {len(imagenes)}")
+
+    clasificador = construir_pipeline(args.modelo, -1)
+    mapping = PREDICTION_MAPPINGS.get(args.mapeo, {})
+
+    resultados = {}
+    for proporcion in [0.0] + [p for p in args.proporciones if p > 0]:
+        resultados[proporcion] = evaluar(clasificador, imagenes, mapping, proporcion)
+
+    referencia, latencia_ref = resultados[0.0]
+    print(f"{'Reducción':<10}{'Tokens':>8}{'ms/imagen':>11}{'Aceleración':>13}{'Concordancia':>14}{'Exactitud':>11}")
+    patch_size = clasificador.model.config.patch_size
+    image_size = clasificador.model.config.image_size
+    total_tokens = (image_size // patch_size) ** 2
+    for proporcion, (predicciones, latencia) in resultados.items():
+        concordancia = sum(ref == pred for ref, pred in zip(referencia, predicciones)) / len(imagenes)
+        # Solo cuentan para la exactitud las imágenes cuya carpeta tiene nombre de etiqueta
+        etiquetadas = [(esperada, pred) for esperada, pred in zip(etiquetas, predicciones) if esperada]
+        exactitud = sum(esperada == pred for esperada, pred in etiquetadas) / len(etiquetadas) if etiquetadas else 0.0
+        tokens = max(1, int(round(total_tokens * (1 - proporcion))))
+        print(f"{proporcion:<10.2f}{tokens:>8}{latencia:>11.1f}{latencia_ref / latencia:>12.2f}x"
+              f"{concordancia * 100:>13.1f}%{exactitud * 100:>10.1f}%")
+
+
+if __name__ == "__main__":
+    torch.set_grad_enabled(False)
+    main()
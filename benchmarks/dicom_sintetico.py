@@ -0,0 +1,86 @@
+# benchmarks/dicom_sintetico.py
+# Generación de DICOM sintéticos para los benchmarks
+
+import io
+import numpy as np
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+
+
+def crear_pixeles_mamografia(filas=4096, columnas=3328, bits_stored=12, semilla=0):
+    """
+    Genera una imagen sintética con fondo plano y una región de tejido con ruido,
+    parecida en rango y distribución a una mamografía.
+
+    :param filas: Alto de la imagen.
+    :param columnas: Ancho de la imagen.
+    :param bits_stored: Bits almacenados por píxel.
+    :param semilla: Semilla del generador aleatorio.
+    :return: Array uint16 de forma (filas, columnas).
+    """
+    rng = np.random.default_rng(semilla)
+    maximo = 2 ** bits_stored - 1
+    y, x = np.ogrid[:filas, :columnas]
+    tejido = ((y - filas / 2) / (filas / 2)) ** 2 + (x / columnas) ** 2 < 1.0
+    pixeles = np.full((filas, columnas), maximo // 20, dtype=np.uint16)
+    ruido = rng.integers(maximo // 4, maximo, size=int(tejido.sum()), dtype=np.uint16)
+    pixeles[tejido] = ruido
+    return pixeles
+
+
+def crear_dataset(pixeles=None, photometric_interpretation='MONOCHROME2', bits_stored=12, ventana=True,
+                  transfer_syntax=ExplicitVRLittleEndian):
+    """
+    Crea un dataset DICOM en memoria con los píxeles indicados.
+
+    :param pixeles: Array uint16 con la imagen. Si es None se genera una mamografía sintética.
+    :param photometric_interpretation: 'MONOCHROME1' o 'MONOCHROME2'.
+    :param bits_stored: Bits almacenados por píxel.
+    :param ventana: Si es True agrega WindowCenter/WindowWidth.
+    :param transfer_syntax: UID de la sintaxis de transferencia.
+    :return: Dataset de pydicom.
+    """
+    if pixeles is None:
+        pixeles = crear_pixeles_mamografia(bits_stored=bits_stored)
+
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = '1.2.840.10008.5.1.4.1.1.1.2'  # Digital Mammography
+    file_meta.MediaStorageSOPInstanceUID = generate_uid()
+    file_meta.TransferSyntaxUID = transfer_syntax
+
+    ds = Dataset()
+    ds.file_meta = file_meta
+    ds.SOPClassUID = file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    ds.StudyInstanceUID = generate_uid()
+    ds.SeriesInstanceUID = generate_uid()
+    ds.PatientID = 'SINTETICO'
+    ds.StudyDate = '20240101'
+    ds.Modality = 'MG'
+    ds.ImageLaterality = 'L'
+    ds.Rows, ds.Columns = pixeles.shape
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = photometric_interpretation
+    ds.BitsAllocated = 16
+    ds.BitsStored = bits_stored
+    ds.HighBit = bits_stored - 1
+    ds.PixelRepresentation = 0
+    if ventana:
+        maximo = 2 ** bits_stored - 1
+        ds.WindowCenter = maximo // 2
+        ds.WindowWidth = maximo // 2
+    ds.PixelData = pixeles.tobytes()
+    return ds
+
+
+def dataset_a_bytes(ds):
+    """
+    Serializa un dataset DICOM a bytes.
+
+    :param ds: Dataset de pydicom.
+    :return: Bytes del archivo DICOM.
+    """
+    buffer = io.BytesIO()
+    pydicom.dcmwrite(buffer, ds, enforce_file_format=True)
+    return buffer.getvalue()
@@ -0,0 +1,206 @@
+# benchmarks/verificar_descarga.py
+# Verifica la descarga de modelos contra un servidor HTTP local que simula los casos de la red:
+# descarga completa, reanudación con Range (206), servidor sin Range (200), parcial ya completo (416),
+# conexión cortada a mitad de la respuesta, hash incorrecto, dos descargas simultáneas del mismo archivo
+# y la instalación completa de un ZIP con obtener_modelo.
+#
+# Uso: python -m benchmarks.verificar_descarga
+
+import io
+import os
+import time
+import zipfile
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utilidades.descarga_modelos import ErrorDescarga, descargar_archivo, obtener_modelo
+
+# Más grande que TAMANO_BLOQUE, para que una conexión cortada deje bytes en el archivo parcial
+CONTENIDO = os.urandom(20 * 1024 * 1024 + 123)
+
+
+class ManejadorPrueba(BaseHTTPRequestHandler):
+    """
+    Sirve server.contenido según server.modo: 'range' (admite Range), 'sin_range' (siempre 200 completo)
+    o 'cortar' (anuncia el tamaño completo y cierra la conexión a la mitad).
+    """
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.solicitudes.append(self.headers.get('Range'))
+        contenido = servidor.contenido
+        inicio = 0
+        rango = self.headers.get('Range')
+        if servidor.modo == 'range' and rango:
+            inicio = int(rango.split('=')[1].split('-')[0])
+            if inicio >= len(contenido):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(contenido)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {inicio}-{len(contenido) - 1}/{len(contenido)}")
+        else:
+            self.send_response(200)
+        cuerpo = contenido[inicio:]
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        if servidor.modo == 'cortar':
+            self.wfile.write(cuerpo[:len(cuerpo) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        # En trozos con pausas, para que las descargas simultáneas se solapen
+        for posicion in range(0, len(cuerpo), 256 * 1024):
+            self.wfile.write(cuerpo[posicion:posicion + 256 * 1024])
+            time.sleep(servidor.pausa)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def crear_servidor():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManejadorPrueba)
+    servidor.daemon_threads = True
+    servidor.lock = threading.Lock()
+    servidor.solicitudes = []
+    servidor.contenido = CONTENIDO
+    servidor.modo = 'range'
+    servidor.pausa = 0.0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def preparar(servidor, modo, pausa=0.0, contenido=CONTENIDO):
+    servidor.modo = modo
+    servidor.pausa = pausa
+    servidor.contenido = contenido
+    servidor.solicitudes.clear()
+
+
+def leer(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+def escribir(ruta, datos):
+    with open(ruta, 'wb') as f:
+        f.write(datos)
+
+
+def main():
+    servidor = crear_servidor()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/modelo.zip"
+    tercio = len(CONTENIDO) // 3
+
+    with tempfile.TemporaryDirectory() as temporal:
+        destino = os.path.join(temporal, 'modelo.zip')
+        parcial = f"{destino}.part"
+
+        def limpiar():
+            for ruta in (destino, parcial):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+
+        # Descarga completa, con verificación del hash
+        preparar(servidor, 'range')
+        descargar_archivo(url, destino, sha256=hashlib.sha256(CONTENIDO).hexdigest())
+        assert leer(destino) == CONTENIDO and not os.path.exists(parcial)
+        assert servidor.solicitudes == [None]
+        print("completa: ok")
+
+        # Reanudación: solo se piden los bytes que faltan
+        limpiar()
+        escribir(parcial, CONTENIDO[:tercio])
+        preparar(servidor, 'range')
+        descargar_archivo(url, destino)
+        assert leer(destino) == CONTENIDO
+        assert servidor.solicitudes == [f"bytes={tercio}-"]
+        print("reanudación (206): ok")
+
+        # El servidor ignora Range: el parcial (aquí con basura) se descarta y se descarga de nuevo
+        limpiar()
+        escribir(parcial, b'\0' * tercio)
+        preparar(servidor, 'sin_range')
+        descargar_archivo(url, destino)
+        assert leer(destino) == CONTENIDO
+        print("servidor sin Range (200): ok")
+
+        # El parcial ya está completo: el servidor responde 416 y se usa el parcial
+        limpiar()
+        escribir(parcial, CONTENIDO)
+        preparar(servidor, 'range')
+        descargar_archivo(url, destino)
+        assert leer(destino) == CONTENIDO
+        print("parcial completo (416): ok")
+
+        # Conexión cortada: error, el parcial se conserva y el siguiente intento lo reanuda
+        limpiar()
+        preparar(servidor, 'cortar')
+        try:
+            descargar_archivo(url, destino)
+            raise AssertionError("Una descarga cortada no lanzó ErrorDescarga")
+        except ErrorDescarga:
+            pass
+        assert not os.path.exists(destino)
+        recibido = os.path.getsize(parcial)
+        assert 0 < recibido < len(CONTENIDO)
+        preparar(servidor, 'range')
+        descargar_archivo(url, destino)
+        assert leer(destino) == CONTENIDO
+        assert servidor.solicitudes == [f"bytes={recibido}-"]
+        print("conexión cortada y reanudada: ok")
+
+        # Hash incorrecto: error y el parcial se elimina para no reanudar sobre datos malos
+        limpiar()
+        preparar(servidor, 'range')
+        try:
+            descargar_archivo(url, destino, sha256='0' * 64)
+            raise AssertionError("Un hash incorrecto no lanzó ErrorDescarga")
+        except ErrorDescarga:
+            pass
+        assert not os.path.exists(destino) and not os.path.exists(parcial)
+        print("hash incorrecto: ok")
+
+        # Dos descargas simultáneas del mismo archivo: una espera el bloqueo y reutiliza el resultado
+        limpiar()
+        preparar(servidor, 'range', pausa=0.05)
+        errores = []
+
+        def descargar():
+            try:
+                descargar_archivo(url, destino)
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=descargar) for _ in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert not errores, errores
+        assert leer(destino) == CONTENIDO
+        assert len(servidor.solicitudes) == 1, servidor.solicitudes
+        print("descargas simultáneas: ok")
+
+        # Instalación completa: ZIP con los archivos en la raíz, extraído y renombrado a la carpeta del modelo
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_ref:
+            zip_ref.writestr('config.json', '{}')
+            zip_ref.writestr('model.safetensors', CONTENIDO)
+        model_dir = os.path.join(temporal, 'modelos')
+        preparar(servidor, 'range', contenido=buffer.getvalue())
+        model_path = obtener_modelo(model_dir, 'modelo', url)
+        assert leer(os.path.join(model_path, 'model.safetensors')) == CONTENIDO
+        assert sorted(os.listdir(model_dir)) == ['modelo'], os.listdir(model_dir)
+        print("instalación del modelo: ok")
+
+    servidor.shutdown()
+    print("Todas las verificaciones de descarga pasaron.")
+
+
+if __name__ == "__main__":
+    main()
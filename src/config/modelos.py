@@ -0,0 +1,63 @@
+# src/config/modelos.py
+# Definición de los modelos de la cascada de clasificación
+
+import os
+from src.config.settings import BASE_DIR
+
+# Directorio local donde se guardan los modelos
+MODEL_DIR = os.path.join(BASE_DIR, 'data', 'modelos')
+
+# Definir las rutas y file_urls para los tres modelos.
+# 'sha256' es el hash esperado del ZIP. Los enlaces de SharePoint no publican uno, así que por ahora es None
+# y la descarga no se verifica (solo se comprueba la integridad del ZIP al extraerlo). Al fijar el hash de
+# un modelo, su descarga pasa a verificarse.
+MODELOS_INFO = {
+    'primario': {
+        'model_folder': 'ViT-large-patch16-224_B',
+        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/EVMIWphh_1ZIrDG6VeKXZX0BIT3vlDBoensMcRx-YTve3w?e=WTaQdV',
+        # Enlace de descarga directo del modelo primario
+        'sha256': None
+    },
+    'secondary_masas': {
+        'model_folder': 'VT_V8',
+        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/INSERT_SECONDARY_MASAS_URL_HERE?e=XXXXXX',
+        # Reemplaza con el URL de descarga directo del modelo secundario para masas
+        'sha256': None
+    },
+    'secondary_calcifi': {
+        'model_folder': 'CALCI',
+        'file_url': 'https://usmcl-my.sharepoint.com/:u:/g/personal/julio_maturana_usm_cl/EbGZhS3H-XFHvOFJKsTmz4sBX2g7OqtrtnaSzlap3b0h5Q?e=iuNG1y',
+        # Enlace de descarga directo del modelo CALCI
+        'sha256': None
+    }
+}
+
+PREDICTION_MAPPINGS = {
+    'primario': {
+        'LABEL_0': 'masas',
+        'LABEL_1': 'calcificaciones',
+        'LABEL_2': 'no_encontrado'
+    },
+    'secondary_masas': {
+        'LABEL_0': 'benigna',
+        'LABEL_1': 'maligna'
+    },
+    'secondary_calcifi': {
+        'LABEL_0': 'benigna',
+        'LABEL_1': 'sospechosa',
+        'LABEL_2': 'maligna'
+    }
+}
+
+# Modelo secundario que corresponde a cada etiqueta del modelo primario
+MODELO_SECUNDARIO_POR_ETIQUETA = {
+    'masas': 'secondary_masas',
+    'calcificaciones': 'secondary_calcifi'
+}
+
+
+def ruta_modelo(key):
+    """
+    Devuelve la ruta local del modelo indicado.
+    """
+    return os.path.join(MODEL_DIR, MODELOS_INFO[key]['model_folder'])
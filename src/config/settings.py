@@ -14,3 +14,74 @@ LOG_DIR = os.path.join(BASE_DIR, 'logs')
 
 # Asegurarse de que el directorio de logs existe
 os.makedirs(LOG_DIR, exist_ok=True)
+
+# Directorios de datos
+DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), 'data')
+DATA_RAW_DIR = os.path.join(DATA_DIR, 'raw')
+DATA_PROCESSED_DIR = os.path.join(DATA_DIR, 'processed')
+DATA_TEMP_DIR = os.path.join(DATA_DIR, 'temp')
+
+# Catálogo persistente de metadatos DICOM (lecturas solo de cabecera, actualización incremental por mtime)
+CATALOGO_DICOM_SQLITE = os.path.join(DATA_TEMP_DIR, 'catalogo_dicom.sqlite')
+
+# Caché de resultados de clasificación
+CACHE_RESULTADOS_MAX_ENTRADAS = 1024
+CACHE_RESULTADOS_EN_DISCO = True
+CACHE_RESULTADOS_SQLITE = os.path.join(DATA_TEMP_DIR, 'cache_resultados.sqlite')
+
+# Servidor de inferencia
+SERVIDOR_INFERENCIA_URL = os.environ.get('SERVIDOR_INFERENCIA_URL', 'http://127.0.0.1:8765')
+SERVIDOR_INFERENCIA_MAX_LOTE = 8
+SERVIDOR_INFERENCIA_MAX_ESPERA_MS = 25
+
+# Carga de modelos mapeada en memoria (instantánea solo si los pesos originales no se pueden asignar directamente)
+CARGA_RAPIDA_MODELOS = os.environ.get('CARGA_RAPIDA_MODELOS', '1') != '0'
+
+# Decodificación a resolución reducida cuando la salida es pequeña (JPEG 2000 por niveles, sin comprimir con paso)
+DECODIFICACION_REDUCIDA = os.environ.get('DECODIFICACION_REDUCIDA', '1') != '0'
+
+# La entrada de los modelos de clasificación se decodifica completa salvo que se active explícitamente:
+# los pesos se entrenaron con imágenes redimensionadas desde la resolución completa
+DECODIFICACION_REDUCIDA_CLASIFICACION = os.environ.get('DECODIFICACION_REDUCIDA_CLASIFICACION', '0') == '1'
+
+# Presupuesto de disco compartido por las cachés de imágenes en data/temp; cada una recibe una fracción fija,
+# de modo que el total nunca supera este valor
+CACHE_DISCO_MAX_BYTES = int(os.environ.get('CACHE_DISCO_MAX_BYTES', 6 * 1024 ** 3))
+REPARTO_CACHE_DISCO = {
+    'pixeles': 0.4,
+    'copias_trabajo': 0.3,
+    'imagenes': 0.2,
+    'miniaturas': 0.1,
+}
+
+# Caché persistente de píxeles decodificados de DICOM comprimidos (.npy abiertos con mmap, acotada en bytes)
+CACHE_PIXELES = os.environ.get('CACHE_PIXELES', '1') != '0'
+CACHE_PIXELES_DIR = os.path.join(DATA_TEMP_DIR, 'cache_pixeles')
+CACHE_PIXELES_MAX_BYTES = int(CACHE_DISCO_MAX_BYTES * REPARTO_CACHE_DISCO['pixeles'])
+
+# Backend de la conversión por lotes: 'procesos' (evita el GIL en la decodificación) o 'hilos'
+CONVERSION_BACKEND = os.environ.get('CONVERSION_BACKEND', 'procesos')
+
+# Nivel de compresión PNG (zlib, 0 el más rápido a 9 el más pequeño) por defecto en la interfaz, la CLI de
+# conversión y el codificador; el 3 de OpenCV tarda bastante más por imagen en lotes grandes
+COMPRESION_PNG_POR_DEFECTO = int(os.environ.get('COMPRESION_PNG', 1))
+
+# Exportación a shards .npy mapeados en memoria: imágenes por shard
+EXPORTACION_NPY_IMAGENES_POR_SHARD = 1024
+
+# Caché de imágenes procesadas de la visualización: LRU en memoria acotado en bytes con volcado a disco
+CACHE_IMAGENES_MAX_BYTES = 512 * 1024 ** 2
+CACHE_IMAGENES_DIR = os.path.join(DATA_TEMP_DIR, 'cache_imagenes')
+CACHE_IMAGENES_DISCO_MAX_BYTES = int(CACHE_DISCO_MAX_BYTES * REPARTO_CACHE_DISCO['imagenes'])
+
+# Miniaturas de la cuadrícula de visualización: ancho de columna, calidad JPEG y caché propia
+MINIATURA_ANCHO = 400
+MINIATURA_CALIDAD_JPG = 85
+CACHE_MINIATURAS_MAX_BYTES = 64 * 1024 ** 2
+CACHE_MINIATURAS_DIR = os.path.join(DATA_TEMP_DIR, 'cache_miniaturas')
+CACHE_MINIATURAS_DISCO_MAX_BYTES = int(CACHE_DISCO_MAX_BYTES * REPARTO_CACHE_DISCO['miniaturas'])
+
+# Visor de ventana/nivel: copias de trabajo de 16 bits (resolución completa y nivel de pantalla)
+CACHE_COPIAS_TRABAJO_MAX_BYTES = 1024 * 1024 ** 2
+CACHE_COPIAS_TRABAJO_DIR = os.path.join(DATA_TEMP_DIR, 'cache_copias_trabajo')
+CACHE_COPIAS_TRABAJO_DISCO_MAX_BYTES = int(CACHE_DISCO_MAX_BYTES * REPARTO_CACHE_DISCO['copias_trabajo'])
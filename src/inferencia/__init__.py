@@ -0,0 +1 @@
+# src/inferencia/__init__.py
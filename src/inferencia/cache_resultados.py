@@ -0,0 +1,162 @@
+# src/inferencia/cache_resultados.py
+# Caché de resultados de clasificación por contenido de la imagen y versión del modelo
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from src.inferencia.precision import huella_pesos
+
+logger = logging.getLogger(__name__)
+
+
+def digest_imagen(entrada):
+    """
+    Calcula el digest de una imagen ya preprocesada (PIL Image, array NumPy o tensor de torch).
+
+    :param entrada: Imagen preprocesada que recibe el modelo.
+    :return: Digest hexadecimal.
+    """
+    if hasattr(entrada, 'detach'):
+        array = entrada.detach().cpu().numpy()
+    else:
+        array = np.asarray(entrada)
+    array = np.ascontiguousarray(array)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{array.dtype}{array.shape}".encode())
+    h.update(memoryview(array).cast('B'))
+    return h.hexdigest()
+
+
+def hash_pesos(model_path):
+    """
+    Identifica la versión de los pesos del modelo por el nombre, el tamaño y la fecha de modificación de sus
+    archivos (la misma huella que invalida la instantánea y el modelo cuantizado), sin leer su contenido:
+    hashear gigabytes de pesos en cada arranque costaba más que las inferencias que la caché evita.
+
+    :param model_path: Ruta al directorio del modelo.
+    :return: Hash hexadecimal de la huella de los pesos.
+    """
+    return hashlib.blake2b(json.dumps(huella_pesos(model_path)).encode(), digest_size=16).hexdigest()
+
+
+def huella_modelo(model_path, precision='fp32'):
+    """
+    Identifica la versión de un modelo: carpeta, huella de los pesos y modo de precisión.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param precision: Modo de precisión con el que se ejecuta.
+    :return: Cadena que identifica al modelo.
+    """
+    return f"{os.path.basename(os.path.normpath(model_path))}:{hash_pesos(model_path)[:16]}:{precision}"
+
+
+class CacheResultados:
+    """
+    Caché de resultados de clasificación con un nivel LRU en memoria y un nivel opcional en SQLite.
+    Las claves combinan la huella del modelo y el digest de la imagen preprocesada, de modo que
+    los resultados sobreviven a los reinicios y se invalidan solos al cambiar los pesos.
+    """
+
+    def __init__(self, max_entradas=1024, ruta_sqlite=None):
+        self.max_entradas = max_entradas
+        self.ruta_sqlite = ruta_sqlite
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+        if ruta_sqlite:
+            os.makedirs(os.path.dirname(ruta_sqlite), exist_ok=True)
+            with self._conectar() as conexion:
+                conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS resultados ("
+                    "clave TEXT PRIMARY KEY, resultado TEXT NOT NULL, creado REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: las sesiones de Streamlit se ejecutan en hilos distintos
+        conexion = sqlite3.connect(self.ruta_sqlite, timeout=10)
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    @staticmethod
+    def clave(huella, digest):
+        return f"{huella}|{digest}"
+
+    def obtener(self, clave):
+        """
+        Busca un resultado en memoria y, si no está, en disco.
+
+        :param clave: Clave devuelta por CacheResultados.clave.
+        :return: Resultado guardado o None si no existe.
+        """
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                return self._memoria[clave]
+
+        resultado = None
+        if self.ruta_sqlite:
+            try:
+                with self._conectar() as conexion:
+                    fila = conexion.execute("SELECT resultado FROM resultados WHERE clave = ?", (clave,)).fetchone()
+                if fila is not None:
+                    resultado = json.loads(fila[0])
+            except sqlite3.Error as e:
+                logger.error(f"Error al leer la caché de resultados: {e}")
+
+        with self._lock:
+            if resultado is None:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            self._guardar_en_memoria(clave, resultado)
+        return resultado
+
+    def guardar(self, clave, resultado):
+        """
+        Guarda un resultado en memoria y, si está habilitado, en disco.
+
+        :param clave: Clave devuelta por CacheResultados.clave.
+        :param resultado: Resultado serializable a JSON.
+        """
+        with self._lock:
+            self._guardar_en_memoria(clave, resultado)
+
+        if self.ruta_sqlite:
+            try:
+                with self._conectar() as conexion:
+                    conexion.execute(
+                        "INSERT OR REPLACE INTO resultados (clave, resultado, creado) VALUES (?, ?, ?)",
+                        (clave, json.dumps(resultado), time.time())
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error al escribir la caché de resultados: {e}")
+
+    def _guardar_en_memoria(self, clave, resultado):
+        self._memoria[clave] = resultado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def limpiar(self):
+        """
+        Elimina todos los resultados guardados, en memoria y en disco.
+        """
+        with self._lock:
+            self._memoria.clear()
+        if self.ruta_sqlite:
+            with self._conectar() as conexion:
+                conexion.execute("DELETE FROM resultados")
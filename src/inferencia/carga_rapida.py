@@ -0,0 +1,190 @@
+# src/inferencia/carga_rapida.py
+# Carga rápida de modelos: el esqueleto se crea en el dispositivo 'meta' (sin reservar memoria) y se le
+# asignan directamente los tensores de un archivo safetensors mapeado en memoria, sin copias intermedias.
+# Solo cuando los pesos originales no se pueden asignar directamente (formato .bin o nombres antiguos de
+# transformers) la primera carga guarda una instantánea con los nombres actuales, común a todas las
+# precisiones y dispositivos, para que los reinicios sean inmediatos.
+#
+# Uso (preconstruir la instantánea si hace falta, p. ej. al crear la imagen del contenedor):
+#     python -m src.inferencia.carga_rapida --modelo src/data/modelos/ViT-large-patch16-224_B
+
+import os
+import glob
+import json
+import logging
+import argparse
+import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
+from transformers import AutoConfig, AutoModelForImageClassification
+from src.inferencia.precision import archivos_pesos, huella_pesos
+
+logger = logging.getLogger(__name__)
+
+# Nombre de la instantánea dentro de la carpeta del modelo. Los pesos son los mismos en fp32 y bf16
+# (bf16 solo envuelve el forward en autocast) y se mapean en el dispositivo al leerlos.
+ARCHIVO_INSTANTANEA = 'instantanea.safetensors'
+
+# Instantáneas de versiones anteriores, guardadas por precisión y dispositivo
+PATRON_INSTANTANEAS_ANTIGUAS = 'instantanea_*_*.safetensors'
+
+
+def nombre_dispositivo(device):
+    """
+    Convierte el dispositivo del pipeline en un dispositivo de torch.
+
+    :param device: Dispositivo del pipeline (0, "mps" o -1).
+    :return: Cadena del dispositivo de torch ('cpu', 'mps' o 'cuda:N').
+    """
+    if device == -1:
+        return 'cpu'
+    if device == 'mps':
+        return 'mps'
+    return f'cuda:{device}'
+
+
+def ruta_instantanea(model_path):
+    """
+    Devuelve la ruta de la instantánea del modelo.
+    """
+    return os.path.join(model_path, ARCHIVO_INSTANTANEA)
+
+
+def _eliminar_instantaneas_antiguas(model_path):
+    # Cada una duplicaba los pesos completos del modelo
+    for ruta in glob.glob(os.path.join(model_path, PATRON_INSTANTANEAS_ANTIGUAS)):
+        try:
+            os.remove(ruta)
+            logger.info(f"Instantánea antigua eliminada: '{ruta}'")
+        except OSError as e:
+            logger.error(f"No se pudo eliminar la instantánea antigua '{ruta}': {e}")
+
+
+def _leer_safetensors(ruta, dispositivo):
+    """
+    Lee los tensores de un archivo safetensors. En CPU los tensores quedan respaldados por el mapeo
+    del archivo, de modo que las páginas se cargan bajo demanda y no se duplican.
+
+    :return: Tupla (diccionario de tensores, metadatos del archivo).
+    """
+    with safe_open(ruta, framework='pt', device=dispositivo) as f:
+        return {clave: f.get_tensor(clave) for clave in f.keys()}, f.metadata() or {}
+
+
+def construir_desde_pesos(model_path, state_dict):
+    """
+    Crea el esqueleto del modelo en el dispositivo 'meta' y le asigna los tensores sin copiarlos.
+    Con assign=True el modelo toma el dtype de los tensores asignados; para obtener el mismo modelo que
+    from_pretrained (que sin torch_dtype carga en el dtype por defecto de torch, fp32) los tensores de punto
+    flotante guardados en otro dtype (p. ej. checkpoints fp16) se convierten antes; los demás no se copian.
+
+    :param model_path: Ruta al directorio del modelo (para la configuración).
+    :param state_dict: Pesos del modelo.
+    :return: Modelo en modo evaluación.
+    :raises ValueError: Si faltan pesos o quedan tensores sin materializar.
+    """
+    config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+    with torch.device('meta'):
+        model = AutoModelForImageClassification.from_config(config, trust_remote_code=True)
+
+    dtype = torch.get_default_dtype()
+    state_dict = {clave: tensor.to(dtype) if tensor.is_floating_point() and tensor.dtype != dtype else tensor
+                  for clave, tensor in state_dict.items()}
+    faltantes, inesperadas = model.load_state_dict(state_dict, strict=False, assign=True)
+    if inesperadas:
+        logger.info(f"Pesos no usados al cargar '{model_path}': {', '.join(inesperadas[:5])}")
+    # Los pesos compartidos (p. ej. embeddings atados) se vuelven a enlazar después de asignarlos
+    if hasattr(model, 'tie_weights'):
+        model.tie_weights()
+    sin_materializar = [nombre for nombre, tensor in list(model.named_parameters()) + list(model.named_buffers())
+                        if tensor.is_meta]
+    if sin_materializar:
+        raise ValueError(f"Faltan pesos para {', '.join(sin_materializar[:5])} (faltantes: {len(faltantes)})")
+    return model.eval()
+
+
+def guardar_instantanea(model, model_path):
+    """
+    Guarda los pesos del modelo ya preparado como instantánea safetensors, junto con la huella de los
+    pesos originales para invalidarla cuando cambien. El archivo temporal se elimina ante cualquier error.
+    """
+    ruta = ruta_instantanea(model_path)
+    state_dict = {clave: tensor.contiguous() for clave, tensor in model.state_dict().items()}
+    metadatos = {'huella': json.dumps(huella_pesos(model_path))}
+    ruta_temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        # safetensors no admite tensores que comparten memoria; se guardan copias independientes
+        save_file({clave: tensor.clone() if _comparte_memoria(tensor, state_dict) else tensor
+                   for clave, tensor in state_dict.items()}, ruta_temporal, metadata=metadatos)
+        os.replace(ruta_temporal, ruta)
+    except Exception as e:
+        logger.error(f"No se pudo guardar la instantánea del modelo en '{ruta}': {e}")
+    finally:
+        if os.path.exists(ruta_temporal):
+            try:
+                os.remove(ruta_temporal)
+            except OSError as e:
+                logger.error(f"No se pudo eliminar el archivo temporal '{ruta_temporal}': {e}")
+
+
+def _comparte_memoria(tensor, state_dict):
+    puntero = tensor.untyped_storage().data_ptr()
+    return sum(otro.untyped_storage().data_ptr() == puntero for otro in state_dict.values()) > 1
+
+
+def cargar_rapido(model_path, device=-1):
+    """
+    Carga el modelo asignando directamente los pesos safetensors originales o, si no se puede, los de la
+    instantánea. Solo cuando tampoco hay una instantánea vigente se usa from_pretrained y se guarda la
+    instantánea para la próxima vez. Sirve para 'fp32' y 'bf16'; 'int8' tiene su propia caché.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param device: Dispositivo del pipeline (0, "mps" o -1).
+    :return: Modelo en modo evaluación, ya en el dispositivo.
+    """
+    dispositivo = nombre_dispositivo(device)
+    _eliminar_instantaneas_antiguas(model_path)
+
+    archivos = [ruta_archivo for ruta_archivo in archivos_pesos(model_path) if ruta_archivo.endswith('.safetensors')]
+    if archivos:
+        state_dict = {}
+        for ruta_archivo in archivos:
+            state_dict.update(_leer_safetensors(ruta_archivo, dispositivo)[0])
+        try:
+            return construir_desde_pesos(model_path, state_dict)
+        except ValueError as e:
+            logger.info(f"Los pesos de '{model_path}' no coinciden con el modelo ({e}); se usa la instantánea.")
+
+    ruta = ruta_instantanea(model_path)
+    if os.path.exists(ruta):
+        try:
+            state_dict, metadatos = _leer_safetensors(ruta, dispositivo)
+            if metadatos.get('huella') == json.dumps(huella_pesos(model_path)):
+                return construir_desde_pesos(model_path, state_dict)
+            logger.info(f"La instantánea '{ruta}' está obsoleta; se vuelve a generar.")
+        except Exception as e:
+            logger.error(f"Error al leer la instantánea '{ruta}': {e}")
+
+    # Los pesos originales usan nombres antiguos o formato .bin: from_pretrained los convierte
+    # y la instantánea queda con los nombres actuales, lista para asignarse directamente
+    model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True).eval()
+    guardar_instantanea(model, model_path)
+    return model.to(dispositivo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la instantánea de carga rápida de un modelo.")
+    parser.add_argument('--modelo', required=True, help="Carpeta del modelo.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    cargar_rapido(args.modelo)
+    ruta = ruta_instantanea(args.modelo)
+    if os.path.exists(ruta):
+        logger.info(f"Instantánea lista en {ruta}")
+    else:
+        logger.info(f"Los pesos de '{args.modelo}' se asignan directamente; no hace falta una instantánea.")
+
+
+if __name__ == "__main__":
+    main()
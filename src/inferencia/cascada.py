@@ -0,0 +1,133 @@
+# src/inferencia/cascada.py
+# Clasificación en lote con la cascada primaria/secundaria, compartida por la interfaz y el servidor de inferencia
+
+import time
+import logging
+from src.inferencia.cache_resultados import digest_imagen, huella_modelo
+
+logger = logging.getLogger(__name__)
+
+
+def huella_clasificador(classifier):
+    """
+    Devuelve la huella del modelo de un pipeline creado por el registro, o None si no se conoce su origen.
+    Se calcula una sola vez por pipeline (el registro lo hace al cargarlo) y se guarda en classifier.huella:
+    recorrer los archivos de pesos en cada inferencia costaba más que los aciertos de la caché, y la huella
+    del momento de la carga es la de los pesos que el modelo tiene en memoria.
+    """
+    huella = getattr(classifier, 'huella', None)
+    if huella is not None:
+        return huella
+    model_path = getattr(classifier, 'model_path', None)
+    if model_path is None:
+        return None
+    try:
+        huella = huella_modelo(model_path, classifier.precision)
+    except OSError as e:
+        logger.error(f"No se pudo calcular la huella del modelo '{model_path}': {e}")
+        return None
+    classifier.huella = huella
+    return huella
+
+
+def clasificar_lote(images, classifier, prediction_mapping, batch_size=8, cache=None):
+    """
+    Realiza la inferencia sobre varias imágenes agrupándolas en lotes y mapea las etiquetas predichas.
+
+    :param images: Lista de imágenes PIL Image a clasificar.
+    :param classifier: Pipeline de clasificación de imágenes.
+    :param prediction_mapping: Diccionario para mapear etiquetas predichas a etiquetas legibles.
+    :param batch_size: Cantidad de imágenes por pasada del modelo.
+    :param cache: CacheResultados opcional; solo se infieren las imágenes que no están en ella.
+    :return: Lista de diccionarios con etiquetas mapeadas y puntuaciones.
+    :raises Exception: Si la inferencia falla.
+    """
+    huella = huella_clasificador(classifier) if cache is not None else None
+    if huella is None:
+        results = classifier(images, batch_size=batch_size)
+    else:
+        claves = [cache.clave(huella, digest_imagen(image)) for image in images]
+        results = [cache.obtener(clave) for clave in claves]
+        pendientes = [idx for idx, result in enumerate(results) if result is None]
+        if pendientes:
+            nuevos = classifier([images[idx] for idx in pendientes], batch_size=batch_size)
+            for idx, result in zip(pendientes, nuevos):
+                results[idx] = result
+                cache.guardar(claves[idx], result)
+    return [
+        {prediction_mapping.get(result['label'], result['label']): result['score'] for result in image_results}
+        for image_results in results
+    ]
+
+
+def clasificar_cascada_lote(images, classifier_primary, obtener_clasificador_secundario, prediction_mappings,
+                            modelo_secundario_por_etiqueta, batch_size=8, cache=None, reportar_error=None):
+    """
+    Clasifica varias imágenes con la cascada primaria/secundaria.
+    Todas las imágenes pasan en lotes por el modelo primario y luego se agrupan según la etiqueta primaria
+    para una pasada en lote por el modelo secundario correspondiente.
+
+    :param images: Lista de imágenes PIL Image a clasificar.
+    :param classifier_primary: Pipeline del modelo primario.
+    :param obtener_clasificador_secundario: Función que recibe la clave del modelo secundario y
+                                            devuelve su pipeline (o None si no se pudo cargar).
+    :param prediction_mappings: Diccionario clave de modelo -> mapeo de etiquetas.
+    :param modelo_secundario_por_etiqueta: Diccionario etiqueta primaria -> clave del modelo secundario.
+    :param batch_size: Cantidad de imágenes por pasada del modelo.
+    :param cache: CacheResultados opcional.
+    :param reportar_error: Función opcional que recibe el mensaje de cada lote fallido (por ejemplo st.error);
+                           los errores siempre se registran en el log.
+    :return: Tupla (lista de resultados por imagen, métricas de rendimiento) o (None, None) si falla el primario.
+    """
+    def lote(lista, classifier, key):
+        try:
+            return clasificar_lote(lista, classifier, prediction_mappings[key], batch_size, cache=cache)
+        except Exception as e:
+            mensaje = f"Ocurrió un error durante la clasificación en lote con el modelo '{key}': {e}"
+            logger.error(mensaje)
+            if reportar_error is not None:
+                reportar_error(mensaje)
+            return None
+
+    tiempo_inferencia = 0.0
+
+    inicio = time.perf_counter()
+    primarios = lote(images, classifier_primary, 'primario')
+    tiempo_inferencia += time.perf_counter() - inicio
+    if primarios is None:
+        return None, None
+
+    resultados = []
+    grupos = {}
+    for idx, mapped_result in enumerate(primarios):
+        primary_label = max(mapped_result, key=mapped_result.get)
+        resultados.append({
+            'primario': mapped_result,
+            'etiqueta_primaria': primary_label,
+            'modelo_secundario': None,
+            'secundario': None
+        })
+        key = modelo_secundario_por_etiqueta.get(primary_label)
+        if key is not None:
+            grupos.setdefault(key, []).append(idx)
+
+    # Una pasada en lote por cada modelo secundario necesario
+    for key, indices in grupos.items():
+        classifier = obtener_clasificador_secundario(key)
+        if not classifier:
+            continue
+        inicio = time.perf_counter()
+        secundarios = lote([images[i] for i in indices], classifier, key)
+        tiempo_inferencia += time.perf_counter() - inicio
+        if secundarios is None:
+            continue
+        for idx, mapped_result in zip(indices, secundarios):
+            resultados[idx]['modelo_secundario'] = key
+            resultados[idx]['secundario'] = mapped_result
+
+    metricas = {
+        'imagenes': len(images),
+        'tiempo_inferencia': tiempo_inferencia,
+        'imagenes_por_segundo': len(images) / tiempo_inferencia if tiempo_inferencia > 0 else 0.0
+    }
+    return resultados, metricas
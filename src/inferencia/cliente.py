@@ -0,0 +1,93 @@
+# src/inferencia/cliente.py
+# Cliente del servidor local de inferencia
+
+import io
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from src.config.settings import SERVIDOR_INFERENCIA_URL
+
+
+def _imagen_a_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def clasificar_remoto(image, url=SERVIDOR_INFERENCIA_URL, nombre_archivo='imagen.png', timeout=300, precision=None):
+    """
+    Envía una imagen al servidor de inferencia y devuelve el resultado de la cascada.
+
+    :param image: Imagen PIL Image ya preprocesada, o bytes de un archivo PNG, JPG o DICOM.
+    :param url: URL base del servidor.
+    :param nombre_archivo: Nombre del archivo, usado por el servidor para detectar el formato de los bytes.
+    :param timeout: Tiempo máximo de espera en segundos.
+    :param precision: Modo de precisión de los modelos. Si es None el servidor usa el suyo por defecto.
+    :return: Diccionario con 'primario', 'etiqueta_primaria', 'modelo_secundario' y 'secundario'.
+    :raises RuntimeError: Si el servidor responde con un error o no está disponible.
+    """
+    contenido = image if isinstance(image, bytes) else _imagen_a_png(image)
+    cabeceras = {'Content-Type': 'application/octet-stream', 'X-Nombre-Archivo': quote(nombre_archivo)}
+    if precision is not None:
+        cabeceras['X-Precision'] = precision
+    solicitud = urllib.request.Request(
+        f"{url.rstrip('/')}/clasificar",
+        data=contenido,
+        method='POST',
+        headers=cabeceras
+    )
+    try:
+        with urllib.request.urlopen(solicitud, timeout=timeout) as respuesta:
+            return json.loads(respuesta.read())
+    except urllib.error.HTTPError as e:
+        try:
+            mensaje = json.loads(e.read()).get('error', str(e))
+        except ValueError:
+            mensaje = str(e)
+        raise RuntimeError(f"El servidor de inferencia respondió con un error ({e.code}): {mensaje}") from e
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"No se pudo conectar con el servidor de inferencia en {url}: {e.reason}") from e
+
+
+def clasificar_remoto_lote(images, url=SERVIDOR_INFERENCIA_URL, max_concurrencia=8, timeout=300, precision=None):
+    """
+    Envía varias imágenes al servidor de forma concurrente para que las agrupe en micro-lotes.
+
+    :param images: Lista de imágenes PIL Image ya preprocesadas.
+    :param url: URL base del servidor.
+    :param max_concurrencia: Cantidad máxima de solicitudes simultáneas.
+    :param timeout: Tiempo máximo de espera por solicitud en segundos.
+    :param precision: Modo de precisión de los modelos. Si es None el servidor usa el suyo por defecto.
+    :return: Tupla (lista de resultados por imagen, métricas de rendimiento), con el mismo formato
+             que clasificar_cascada_lote.
+    """
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+        resultados = list(executor.map(
+            lambda image: clasificar_remoto(image, url, timeout=timeout, precision=precision), images
+        ))
+    duracion = time.perf_counter() - inicio
+    metricas = {
+        'imagenes': len(images),
+        'tiempo_inferencia': duracion,
+        'imagenes_por_segundo': len(images) / duracion if duracion > 0 else 0.0
+    }
+    return resultados, metricas
+
+
+def estado_servidor(url=SERVIDOR_INFERENCIA_URL, timeout=2):
+    """
+    Consulta el estado del servidor de inferencia.
+
+    :param url: URL base del servidor.
+    :param timeout: Tiempo máximo de espera en segundos.
+    :return: Diccionario de estado o None si el servidor no responde.
+    """
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/salud", timeout=timeout) as respuesta:
+            return json.loads(respuesta.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
@@ -0,0 +1,145 @@
+# src/inferencia/precision.py
+# Modos de precisión para la inferencia de los modelos de clasificación
+
+import os
+import logging
+import torch
+from transformers import AutoConfig, AutoModelForImageClassification
+
+logger = logging.getLogger(__name__)
+
+# Modos disponibles: fp32 (por defecto), autocast bf16 y cuantización dinámica INT8 de las capas Linear
+PRECISIONES = ('fp32', 'bf16', 'int8')
+
+# Archivos de pesos que puede contener la carpeta de un modelo
+ARCHIVOS_PESOS = ('model.safetensors', 'pytorch_model.bin')
+
+# Nombre del archivo donde se guarda el modelo cuantizado dentro de la carpeta del modelo
+ARCHIVO_CUANTIZADO_INT8 = 'cuantizado_int8.pt'
+
+
+def archivos_pesos(model_path):
+    """
+    Lista los archivos de pesos presentes en la carpeta del modelo.
+
+    :param model_path: Ruta al directorio del modelo.
+    :return: Lista ordenada de rutas a los archivos de pesos.
+    """
+    return sorted(
+        os.path.join(model_path, nombre) for nombre in os.listdir(model_path)
+        if nombre in ARCHIVOS_PESOS or (nombre.startswith('model-') and nombre.endswith('.safetensors'))
+    )
+
+
+def huella_pesos(model_path):
+    """
+    Calcula una huella barata (nombre, tamaño y fecha de modificación) de los pesos del modelo.
+    Sirve para detectar si una versión derivada guardada en disco quedó obsoleta.
+
+    :param model_path: Ruta al directorio del modelo.
+    :return: Lista de tuplas (nombre, tamaño, mtime).
+    """
+    huella = []
+    for ruta in archivos_pesos(model_path):
+        info = os.stat(ruta)
+        huella.append((os.path.basename(ruta), info.st_size, int(info.st_mtime)))
+    return huella
+
+
+def dispositivo_para_precision(device, precision):
+    """
+    Ajusta el dispositivo según la precisión: la cuantización dinámica INT8 solo se ejecuta en CPU.
+
+    :param device: Dispositivo solicitado (0, "mps" o -1).
+    :param precision: Modo de precisión.
+    :return: Dispositivo a usar.
+    """
+    if precision == 'int8' and device != -1:
+        logger.info("La cuantización dinámica INT8 solo está disponible en CPU; se usará la CPU.")
+        return -1
+    return device
+
+
+def _cuantizar(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cargar_modelo_int8(model_path, model=None):
+    """
+    Devuelve el modelo con las capas Linear cuantizadas dinámicamente a INT8.
+    El resultado se guarda en la carpeta del modelo para no volver a cuantizar en cada arranque.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param model: Modelo fp32 ya cargado. Si es None y no hay caché válida se carga desde la carpeta.
+    :return: Modelo cuantizado en modo evaluación.
+    """
+    ruta_cache = os.path.join(model_path, ARCHIVO_CUANTIZADO_INT8)
+    huella = huella_pesos(model_path)
+
+    if os.path.exists(ruta_cache):
+        try:
+            guardado = torch.load(ruta_cache, map_location='cpu', weights_only=False, mmap=True)
+            if guardado.get('huella') == huella:
+                # Se construye el esqueleto cuantizado y se le asignan los pesos ya cuantizados
+                config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+                esqueleto = AutoModelForImageClassification.from_config(config, trust_remote_code=True)
+                esqueleto = _cuantizar(esqueleto.eval())
+                esqueleto.load_state_dict(guardado['state_dict'])
+                return esqueleto
+            logger.info(f"El modelo cuantizado de '{model_path}' está obsoleto; se vuelve a cuantizar.")
+        except Exception as e:
+            logger.error(f"Error al leer el modelo cuantizado '{ruta_cache}': {e}")
+
+    if model is None:
+        model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True)
+    model_int8 = _cuantizar(model.eval())
+
+    try:
+        ruta_temporal = f"{ruta_cache}.tmp"
+        torch.save({'huella': huella, 'state_dict': model_int8.state_dict()}, ruta_temporal)
+        os.replace(ruta_temporal, ruta_cache)
+    except OSError as e:
+        logger.error(f"No se pudo guardar el modelo cuantizado en '{ruta_cache}': {e}")
+    return model_int8
+
+
+def activar_autocast_bf16(model, device):
+    """
+    Envuelve el forward del modelo en autocast bfloat16. Los pesos se mantienen en fp32.
+
+    :param model: Modelo de PyTorch.
+    :param device: Dispositivo del pipeline (0, "mps" o -1).
+    :return: El mismo modelo, con el forward envuelto.
+    """
+    device_type = 'cpu' if device == -1 else ('mps' if device == 'mps' else 'cuda')
+    model.forward = torch.autocast(device_type=device_type, dtype=torch.bfloat16)(model.forward)
+    return model
+
+
+def cargar_modelo(model_path, precision='fp32', device=-1, rapido=True):
+    """
+    Carga el modelo de clasificación en el modo de precisión solicitado.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param precision: 'fp32', 'bf16' o 'int8'.
+    :param device: Dispositivo del pipeline (0, "mps" o -1).
+    :param rapido: Si es True se usa la carga mapeada en memoria con instantánea (ver carga_rapida).
+    :return: Modelo listo para el pipeline.
+    """
+    if precision not in PRECISIONES:
+        raise ValueError(f"Precisión no soportada: {precision}. Opciones: {', '.join(PRECISIONES)}")
+    if precision == 'int8':
+        return cargar_modelo_int8(model_path)
+
+    model = None
+    if rapido:
+        from src.inferencia.carga_rapida import cargar_rapido
+        try:
+            model = cargar_rapido(model_path, device)
+        except Exception as e:
+            logger.info(f"Carga rápida no disponible para '{model_path}' ({e}); se usa from_pretrained.")
+    if model is None:
+        model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True)
+    if precision == 'bf16':
+        activar_autocast_bf16(model, device)
+    return model
@@ -0,0 +1,73 @@
+# src/inferencia/reduccion_tokens.py
+# Inferencia con reducción de tokens para modelos ViT: se descartan los parches de fondo casi constantes
+# antes del encoder, de modo que las capas de atención procesan solo los parches con información.
+
+import torch
+
+
+def _partes_vit(model):
+    """
+    Obtiene los componentes del modelo ViT necesarios para ejecutar el forward por partes.
+
+    :param model: Modelo de clasificación de transformers (p. ej. ViTForImageClassification).
+    :return: Tupla (embeddings, encoder, layernorm, classifier, tamaño de parche). El encoder es el módulo
+             'encoder' o, en las versiones de transformers sin él, la lista de capas 'layers'.
+    :raises ValueError: Si la arquitectura no es compatible.
+    """
+    base = getattr(model, getattr(model, 'base_model_prefix', ''), None)
+    encoder = getattr(base, 'encoder', None) or getattr(base, 'layers', None)
+    partes = (getattr(base, 'embeddings', None), encoder, getattr(base, 'layernorm', None),
+              getattr(model, 'classifier', None))
+    patch_size = getattr(model.config, 'patch_size', None)
+    if any(parte is None for parte in partes) or patch_size is None:
+        raise ValueError(f"La arquitectura {type(model).__name__} no admite reducción de tokens.")
+    if getattr(base.embeddings, 'distillation_token', None) is not None:
+        raise ValueError("Los modelos con token de destilación no admiten reducción de tokens.")
+    return partes + (patch_size,)
+
+
+def puntuar_parches(pixel_values, patch_size):
+    """
+    Puntúa cada parche por su desviación estándar: los parches de fondo son casi constantes.
+
+    :param pixel_values: Tensor (N, C, alto, ancho).
+    :param patch_size: Tamaño del parche del modelo.
+    :return: Tensor (N, cantidad de parches) en el mismo orden que los tokens del modelo.
+    """
+    parches = pixel_values.unfold(2, patch_size, patch_size).unfold(3, patch_size, patch_size)
+    return parches.std(dim=(-1, -2)).mean(dim=1).flatten(1)
+
+
+def forward_reducido(model, pixel_values, proporcion=0.5):
+    """
+    Ejecuta el modelo descartando la proporción indicada de parches con menor variación.
+    El token CLS y los embeddings de posición de los parches conservados se mantienen intactos.
+
+    :param model: Modelo ViT de clasificación de transformers.
+    :param pixel_values: Tensor (N, C, alto, ancho) ya normalizado para el modelo.
+    :param proporcion: Fracción de parches a descartar, entre 0 y 1.
+    :return: Logits (N, cantidad de clases).
+    """
+    embeddings, encoder, layernorm, classifier, patch_size = _partes_vit(model)
+
+    hidden_states = embeddings(pixel_values)
+    cls_token, tokens = hidden_states[:, :1], hidden_states[:, 1:]
+    cantidad = tokens.shape[1]
+    conservar = max(1, int(round(cantidad * (1 - proporcion))))
+
+    if conservar < cantidad:
+        # Se conservan los parches con más variación, en su orden espacial original
+        indices = puntuar_parches(pixel_values, patch_size).topk(conservar, dim=1).indices.sort(dim=1).values
+        tokens = tokens.gather(1, indices[..., None].expand(-1, -1, tokens.shape[-1]))
+    hidden_states = torch.cat([cls_token, tokens], dim=1)
+
+    if isinstance(encoder, torch.nn.ModuleList):
+        for capa in encoder:
+            salida = capa(hidden_states)
+            hidden_states = salida[0] if isinstance(salida, tuple) else salida
+        sequence_output = hidden_states
+    else:
+        salida = encoder(hidden_states)
+        sequence_output = salida.last_hidden_state if hasattr(salida, 'last_hidden_state') else salida[0]
+    sequence_output = layernorm(sequence_output)
+    return classifier(sequence_output[:, 0, :])
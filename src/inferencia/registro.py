@@ -0,0 +1,209 @@
+# src/inferencia/registro.py
+# Registro de modelos de clasificación compartido por el proceso (interfaz de Streamlit o servidor de inferencia)
+
+import os
+import gc
+import time
+import logging
+import threading
+import torch
+from transformers import pipeline, AutoImageProcessor
+from src.inferencia.precision import cargar_modelo, dispositivo_para_precision
+from src.inferencia.cascada import huella_clasificador
+from src.config.settings import CARGA_RAPIDA_MODELOS
+
+logger = logging.getLogger(__name__)
+
+
+def determinar_dispositivo():
+    """
+    Determina el dispositivo disponible para la inferencia.
+
+    :return: 0 para GPU CUDA, "mps" para GPU Apple MPS o -1 para CPU.
+    """
+    if torch.cuda.is_available():
+        return 0  # GPU CUDA
+    elif torch.backends.mps.is_available():
+        return "mps"  # GPU Apple MPS
+    else:
+        return -1  # CPU
+
+
+def construir_pipeline(model_path, device, precision='fp32'):
+    """
+    Construye el pipeline de clasificación de imágenes a partir de la carpeta del modelo.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param device: Dispositivo en el que se ejecutará el pipeline.
+    :param precision: Modo de precisión: 'fp32', 'bf16' (autocast) o 'int8' (cuantización dinámica).
+    :return: Pipeline de clasificación de imágenes.
+    """
+    # Cargar procesador de imágenes y modelo
+    image_processor = AutoImageProcessor.from_pretrained(model_path)
+    model = cargar_modelo(model_path, precision, device, rapido=CARGA_RAPIDA_MODELOS)
+
+    classifier = pipeline("image-classification", model=model, image_processor=image_processor, device=device)
+    # Origen del modelo, usado para identificar su versión en la caché de resultados
+    classifier.model_path = model_path
+    classifier.precision = precision
+    return classifier
+
+
+def calcular_memoria_modelo(model):
+    """
+    Calcula la memoria ocupada por los pesos y buffers de un modelo, incluidos los pesos cuantizados.
+
+    :param model: Modelo de PyTorch.
+    :return: Tamaño en bytes.
+    """
+    total = 0
+    for valor in model.state_dict().values():
+        # Las capas cuantizadas guardan sus pesos empaquetados como tuplas de tensores
+        tensores = valor if isinstance(valor, tuple) else (valor,)
+        for tensor in tensores:
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class RegistroModelos:
+    """
+    Registro de modelos compartido por todo el proceso.
+
+    Mantiene una única instancia de cada pipeline por (carpeta del modelo, dispositivo, precisión), de modo que
+    las re-ejecuciones del script y las distintas sesiones de Streamlit reutilizan el modelo ya cargado
+    en lugar de reconstruirlo desde el disco.
+    """
+
+    def __init__(self):
+        self._modelos = {}
+        self._locks_carga = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clave(model_path, device, precision):
+        if device is None:
+            device = determinar_dispositivo()
+        device = dispositivo_para_precision(device, precision)
+        return os.path.abspath(model_path), device, precision
+
+    def obtener(self, model_path, device=None, precision='fp32'):
+        """
+        Devuelve el pipeline del modelo, cargándolo solo si aún no está en memoria.
+
+        :param model_path: Ruta al directorio del modelo.
+        :param device: Dispositivo de inferencia. Si es None se determina automáticamente.
+        :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
+        :return: Pipeline de clasificación de imágenes.
+        :raises Exception: Si la carga del modelo falla.
+        """
+        clave = self._clave(model_path, device, precision)
+
+        with self._lock:
+            entrada = self._modelos.get(clave)
+            if entrada is not None:
+                entrada['ultimo_uso'] = time.time()
+                return entrada['clasificador']
+            lock_carga = self._locks_carga.setdefault(clave, threading.Lock())
+
+        # Un lock por modelo evita que dos sesiones carguen el mismo modelo a la vez
+        with lock_carga:
+            with self._lock:
+                entrada = self._modelos.get(clave)
+            if entrada is not None:
+                return entrada['clasificador']
+
+            inicio = time.perf_counter()
+            clasificador = construir_pipeline(model_path, clave[1], precision)
+            ahora = time.time()
+            entrada = {
+                'clasificador': clasificador,
+                # Huella de los pesos cargados para las claves de la caché de resultados, calculada una vez
+                'huella': huella_clasificador(clasificador),
+                'memoria_bytes': calcular_memoria_modelo(clasificador.model),
+                'tiempo_carga': time.perf_counter() - inicio,
+                'cargado_en': ahora,
+                'ultimo_uso': ahora
+            }
+            with self._lock:
+                self._modelos[clave] = entrada
+            logger.info(f"Modelo '{clave[0]}' cargado en {entrada['tiempo_carga']:.1f} s "
+                        f"(dispositivo {clave[1]}, {precision}).")
+            return clasificador
+
+    def esta_cargado(self, model_path, device=None, precision='fp32'):
+        """
+        Indica si el modelo ya está cargado en memoria.
+
+        :param model_path: Ruta al directorio del modelo.
+        :param device: Dispositivo de inferencia. Si es None se determina automáticamente.
+        :param precision: Modo de precisión.
+        :return: True si el modelo está en el registro.
+        """
+        clave = self._clave(model_path, device, precision)
+        with self._lock:
+            return clave in self._modelos
+
+    def estado(self):
+        """
+        Devuelve el estado de los modelos cargados.
+
+        :return: Lista de diccionarios con carpeta, dispositivo, huella, memoria y tiempos de cada modelo.
+        """
+        with self._lock:
+            return [
+                {
+                    'carpeta': carpeta,
+                    'dispositivo': dispositivo,
+                    'precision': precision,
+                    'huella': entrada['huella'],
+                    'memoria_bytes': entrada['memoria_bytes'],
+                    'tiempo_carga': entrada['tiempo_carga'],
+                    'cargado_en': entrada['cargado_en'],
+                    'ultimo_uso': entrada['ultimo_uso']
+                }
+                for (carpeta, dispositivo, precision), entrada in self._modelos.items()
+            ]
+
+    def memoria_total(self):
+        """
+        :return: Memoria total en bytes ocupada por los modelos cargados.
+        """
+        with self._lock:
+            return sum(entrada['memoria_bytes'] for entrada in self._modelos.values())
+
+    def liberar(self, model_path, device=None, precision='fp32'):
+        """
+        Elimina un modelo del registro y libera su memoria.
+
+        :param model_path: Ruta al directorio del modelo.
+        :param device: Dispositivo de inferencia. Si es None se determina automáticamente.
+        :param precision: Modo de precisión.
+        :return: True si el modelo estaba cargado y fue liberado.
+        """
+        clave = self._clave(model_path, device, precision)
+        with self._lock:
+            entrada = self._modelos.pop(clave, None)
+        if entrada is None:
+            return False
+        del entrada
+        self._liberar_memoria()
+        return True
+
+    def liberar_todos(self):
+        """
+        Elimina todos los modelos del registro y libera su memoria.
+
+        :return: Cantidad de modelos liberados.
+        """
+        with self._lock:
+            cantidad = len(self._modelos)
+            self._modelos.clear()
+        self._liberar_memoria()
+        return cantidad
+
+    @staticmethod
+    def _liberar_memoria():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
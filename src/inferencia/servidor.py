@@ -0,0 +1,279 @@
+# src/inferencia/servidor.py
+# Servidor local de inferencia con micro-lotes dinámicos, independiente del proceso de Streamlit
+#
+# Uso: python -m src.inferencia.servidor [--host 127.0.0.1] [--puerto 8765] [--max-lote 8] [--max-espera-ms 25]
+
+import io
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+from src.config.modelos import PREDICTION_MAPPINGS, MODELO_SECUNDARIO_POR_ETIQUETA, ruta_modelo
+from src.inferencia.precision import PRECISIONES
+from src.inferencia.registro import RegistroModelos
+from src.inferencia.cascada import clasificar_cascada_lote
+from src.inferencia.cache_resultados import CacheResultados
+from src.procesamiento.lectura_imagenes import leer_archivo_modelo
+from src.config.settings import SERVIDOR_INFERENCIA_MAX_LOTE, SERVIDOR_INFERENCIA_MAX_ESPERA_MS
+from src.config.settings import CACHE_RESULTADOS_MAX_ENTRADAS, CACHE_RESULTADOS_EN_DISCO, CACHE_RESULTADOS_SQLITE
+
+logger = logging.getLogger(__name__)
+
+# Marca para detener el hilo de la cola
+_FIN = object()
+
+
+class ColaMicroLotes:
+    """
+    Cola que agrupa solicitudes concurrentes en micro-lotes.
+    Un único hilo toma la primera solicitud pendiente y espera como máximo 'max_espera_ms' a que lleguen
+    más, hasta 'max_lote'. Con poca carga la latencia añadida es mínima y con mucha carga los lotes crecen,
+    de modo que el rendimiento escala con la demanda.
+    """
+
+    def __init__(self, procesar_lote, max_lote=8, max_espera_ms=25):
+        """
+        :param procesar_lote: Función que recibe una lista de elementos y devuelve una lista de resultados.
+        :param max_lote: Tamaño máximo de cada micro-lote.
+        :param max_espera_ms: Tiempo máximo que espera la primera solicitud a que se complete el lote.
+        """
+        self.procesar_lote = procesar_lote
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.lotes = 0
+        self.elementos = 0
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="micro-lotes", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, elemento):
+        """
+        Encola un elemento para procesarlo en el próximo micro-lote.
+
+        :param elemento: Elemento a procesar.
+        :return: Future con el resultado del elemento.
+        """
+        futuro = Future()
+        self._cola.put((elemento, futuro))
+        return futuro
+
+    def detener(self):
+        """
+        Detiene el hilo de la cola después de procesar las solicitudes pendientes.
+        """
+        self._cola.put((_FIN, None))
+        self._hilo.join()
+
+    def _bucle(self):
+        while True:
+            elemento, futuro = self._cola.get()
+            if elemento is _FIN:
+                return
+
+            lote = [(elemento, futuro)]
+            limite = time.monotonic() + self.max_espera
+            detener = False
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if siguiente[0] is _FIN:
+                    detener = True
+                    break
+                lote.append(siguiente)
+
+            self._procesar(lote)
+            if detener:
+                return
+
+    def _procesar(self, lote):
+        try:
+            resultados = list(self.procesar_lote([elemento for elemento, futuro in lote]))
+            # Con menos resultados que elementos, zip dejaría futuros sin resolver y sus clientes esperando
+            if len(resultados) != len(lote):
+                raise ValueError(f"El procesador devolvió {len(resultados)} resultados para {len(lote)} elementos")
+            for (elemento, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+        except Exception as e:
+            logger.error(f"Error al procesar un micro-lote de {len(lote)} elementos: {e}")
+            for elemento, futuro in lote:
+                futuro.set_exception(e)
+        self.lotes += 1
+        self.elementos += len(lote)
+
+
+def crear_procesador_cascada(registro, precision='fp32', cache=None):
+    """
+    Crea la función que clasifica un micro-lote de imágenes con la cascada primaria/secundaria.
+    Cada elemento lleva la precisión pedida por el cliente; las imágenes se agrupan por precisión
+    y cada grupo pasa por la cascada de los modelos en ese modo.
+
+    :param registro: Registro de modelos del servidor.
+    :param precision: Modo de precisión cuyo modelo primario se carga al arrancar.
+    :param cache: CacheResultados opcional.
+    :return: Función que recibe una lista de tuplas (imagen PIL, precisión) y devuelve sus resultados.
+    :raises Exception: Si el modelo primario no se puede cargar.
+    """
+    def obtener_clasificador(key, precision):
+        try:
+            return registro.obtener(ruta_modelo(key), precision=precision)
+        except Exception as e:
+            logger.error(f"Error al cargar el modelo '{key}' ({precision}): {e}")
+            return None
+
+    # El primario se carga al arrancar para que la primera solicitud no pague la carga
+    registro.obtener(ruta_modelo('primario'), precision=precision)
+
+    def procesar_lote(elementos):
+        grupos = {}
+        for idx, (image, precision_elemento) in enumerate(elementos):
+            grupos.setdefault(precision_elemento, []).append(idx)
+
+        resultados = [None] * len(elementos)
+        for precision_grupo, indices in grupos.items():
+            classifier_primary = obtener_clasificador('primario', precision_grupo)
+            if classifier_primary is None:
+                raise RuntimeError(f"No se pudo cargar el modelo primario en {precision_grupo}.")
+            resultados_grupo, metricas = clasificar_cascada_lote(
+                [elementos[idx][0] for idx in indices],
+                classifier_primary,
+                lambda key: obtener_clasificador(key, precision_grupo),
+                PREDICTION_MAPPINGS,
+                MODELO_SECUNDARIO_POR_ETIQUETA,
+                batch_size=len(indices),
+                cache=cache
+            )
+            if resultados_grupo is None:
+                raise RuntimeError("La clasificación del micro-lote falló.")
+            for idx, resultado in zip(indices, resultados_grupo):
+                resultados[idx] = resultado
+        return resultados
+
+    return procesar_lote
+
+
+class ManejadorInferencia(BaseHTTPRequestHandler):
+    """
+    API HTTP del servidor:
+    - POST /clasificar: cuerpo con la imagen (PNG, JPG o DICOM); el nombre del archivo va en la cabecera
+      X-Nombre-Archivo y el modo de precisión, opcional, en X-Precision. Devuelve el resultado de la cascada en JSON.
+    - GET /salud: estado del servidor, modelos cargados y tamaño medio de los micro-lotes.
+    """
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/salud':
+            self._responder(404, {'error': 'Ruta no encontrada'})
+            return
+        cola = self.server.cola
+        self._responder(200, {
+            'estado': 'ok',
+            'modelos': self.server.registro.estado(),
+            'lotes': cola.lotes,
+            'imagenes': cola.elementos,
+            'tamano_medio_lote': cola.elementos / cola.lotes if cola.lotes else 0.0
+        })
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/clasificar':
+            self._responder(404, {'error': 'Ruta no encontrada'})
+            return
+
+        longitud = int(self.headers.get('Content-Length', 0))
+        archivo = io.BytesIO(self.rfile.read(longitud))
+        archivo.name = unquote(self.headers.get('X-Nombre-Archivo', 'imagen.png'))
+
+        precision = self.headers.get('X-Precision', self.server.precision)
+        if precision not in PRECISIONES:
+            self._responder(400, {'error': f"Precisión no soportada: '{precision}'. "
+                                           f"Opciones: {', '.join(PRECISIONES)}"})
+            return
+
+        try:
+            image, tipo_archivo = leer_archivo_modelo(archivo)
+        except Exception as e:
+            logger.error(f"Error al procesar la imagen '{archivo.name}': {e}")
+            self._responder(400, {'error': f"No se pudo procesar la imagen '{archivo.name}': {e}"})
+            return
+
+        try:
+            resultado = self.server.cola.enviar((image, precision)).result(timeout=self.server.timeout_inferencia)
+        except Exception as e:
+            self._responder(500, {'error': str(e)})
+            return
+        self._responder(200, resultado)
+
+    def _responder(self, codigo, contenido):
+        cuerpo = json.dumps(contenido).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+
+def crear_servidor(host='127.0.0.1', puerto=8765, max_lote=SERVIDOR_INFERENCIA_MAX_LOTE,
+                   max_espera_ms=SERVIDOR_INFERENCIA_MAX_ESPERA_MS, precision='fp32', procesar_lote=None,
+                   timeout_inferencia=300):
+    """
+    Crea el servidor HTTP de inferencia con su cola de micro-lotes.
+
+    :param host: Dirección en la que escucha.
+    :param puerto: Puerto en el que escucha.
+    :param max_lote: Tamaño máximo de cada micro-lote.
+    :param max_espera_ms: Espera máxima para completar un micro-lote.
+    :param precision: Modo de precisión de las solicitudes que no envían la cabecera X-Precision.
+    :param procesar_lote: Función que recibe una lista de tuplas (imagen, precisión) y devuelve sus resultados.
+                          Si es None se usa la cascada de clasificación.
+    :param timeout_inferencia: Tiempo máximo en segundos que una solicitud espera su resultado.
+    :return: Instancia de ThreadingHTTPServer lista para serve_forever().
+    """
+    registro = RegistroModelos()
+    if procesar_lote is None:
+        ruta_sqlite = CACHE_RESULTADOS_SQLITE if CACHE_RESULTADOS_EN_DISCO else None
+        cache = CacheResultados(max_entradas=CACHE_RESULTADOS_MAX_ENTRADAS, ruta_sqlite=ruta_sqlite)
+        procesar_lote = crear_procesador_cascada(registro, precision, cache)
+
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorInferencia)
+    servidor.daemon_threads = True
+    servidor.registro = registro
+    servidor.precision = precision
+    servidor.cola = ColaMicroLotes(procesar_lote, max_lote=max_lote, max_espera_ms=max_espera_ms)
+    servidor.timeout_inferencia = timeout_inferencia
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de inferencia con micro-lotes dinámicos.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--max-lote', type=int, default=SERVIDOR_INFERENCIA_MAX_LOTE)
+    parser.add_argument('--max-espera-ms', type=float, default=SERVIDOR_INFERENCIA_MAX_ESPERA_MS)
+    parser.add_argument('--precision', default='fp32', choices=PRECISIONES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    servidor = crear_servidor(args.host, args.puerto, args.max_lote, args.max_espera_ms, args.precision)
+    logger.info(f"Servidor de inferencia escuchando en http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.cola.detener()
+
+
+if __name__ == "__main__":
+    main()
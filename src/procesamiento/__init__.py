@@ -1,4 +1,4 @@
 # src/procesamiento/__init__.py
 
-from .lectura_dicom import leer_imagen_dicom, obtener_metadatos_relevantes
+from .lectura_dicom import leer_imagen_dicom, leer_cabecera_dicom, obtener_metadatos_relevantes
 # Añade otras importaciones si es necesario
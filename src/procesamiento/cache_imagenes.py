@@ -0,0 +1,268 @@
+# src/procesamiento/cache_imagenes.py
+# Caché de imágenes procesadas para la visualización, direccionada por contenido.
+# Las claves combinan un digest del archivo con una clave canónica de las opciones de procesamiento, y las entradas
+# guardan solo la imagen de salida y un diccionario de metadatos reducido (nunca el Dataset de pydicom).
+# El nivel en memoria es un LRU acotado en bytes; lo que sale de él se vuelca a un nivel en disco también acotado.
+# El nivel en disco lleva su total de bytes y el orden de uso en memoria: el directorio solo se recorre al iniciar.
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Opciones que cambian la imagen procesada; el resto (archivos cargados, metadatos a mostrar...) no entra en la clave
+OPCIONES_PROCESAMIENTO = ('aplicar_voilut', 'invertir_interpretacion', 'aplicar_transformaciones',
+                          'transformaciones_seleccionadas')
+
+
+def digest_bytes(datos):
+    """
+    Calcula el digest del contenido de un archivo.
+
+    :param datos: Bytes del archivo.
+    :return: Digest hexadecimal.
+    """
+    return hashlib.blake2b(datos, digest_size=16).hexdigest()
+
+
+def digest_archivo(ruta):
+    """
+    Digest barato de un archivo en disco a partir de su ruta, tamaño y fecha de modificación, sin leerlo.
+
+    :param ruta: Ruta al archivo.
+    :return: Digest hexadecimal.
+    """
+    info = os.stat(ruta)
+    return hashlib.blake2b(f"{os.path.abspath(ruta)}|{info.st_size}|{info.st_mtime_ns}".encode(),
+                           digest_size=16).hexdigest()
+
+
+def clave_opciones(opciones):
+    """
+    Serializa de forma canónica las opciones que afectan a la imagen procesada.
+
+    :param opciones: Diccionario de opciones de procesamiento.
+    :return: Cadena JSON con claves ordenadas.
+    """
+    relevantes = {clave: opciones.get(clave) for clave in OPCIONES_PROCESAMIENTO}
+    if not relevantes['aplicar_transformaciones']:
+        relevantes['transformaciones_seleccionadas'] = None
+    return json.dumps(relevantes, sort_keys=True, default=str)
+
+
+class CacheImagenes:
+    """
+    Caché de dos niveles de imágenes procesadas: LRU en memoria acotado en bytes y volcado a disco.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, directorio_disco=None, max_bytes_disco=4 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.directorio_disco = directorio_disco
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        # Índice del nivel en disco: clave -> bytes del .npy, del usado hace más tiempo al más reciente
+        self._disco = OrderedDict()
+        self._bytes_disco = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        if directorio_disco:
+            os.makedirs(directorio_disco, exist_ok=True)
+            self._indexar_disco()
+
+    def _indexar_disco(self):
+        """
+        Construye el índice del nivel en disco a partir de los archivos existentes, ordenados por último uso.
+        """
+        entradas = []
+        try:
+            with os.scandir(self.directorio_disco) as archivos:
+                for archivo in archivos:
+                    if archivo.name.endswith('.npy'):
+                        try:
+                            info = archivo.stat()
+                        except OSError:
+                            continue  # Eliminado por otro hilo o proceso mientras se recorría
+                        entradas.append((info.st_mtime, info.st_size, archivo.name[:-len('.npy')]))
+        except OSError as e:
+            logger.error(f"Error al recorrer la caché de imágenes en disco: {e}")
+            return
+        for _, tamano, clave in sorted(entradas):
+            self._disco[clave] = tamano
+            self._bytes_disco += tamano
+
+    @staticmethod
+    def clave(digest, opciones):
+        """
+        Construye la clave de una entrada.
+
+        :param digest: Digest del archivo (digest_bytes o digest_archivo).
+        :param opciones: Diccionario de opciones de procesamiento.
+        :return: Clave hexadecimal.
+        """
+        return hashlib.blake2b(f"{digest}|{clave_opciones(opciones)}".encode(), digest_size=16).hexdigest()
+
+    def _rutas_disco(self, clave):
+        base = os.path.join(self.directorio_disco, clave)
+        return f"{base}.npy", f"{base}.json"
+
+    def obtener(self, clave):
+        """
+        Busca una entrada en memoria y, si no está, en disco (y la promueve a memoria).
+
+        :param clave: Clave devuelta por CacheImagenes.clave.
+        :return: Tupla (imagen, metadatos) o None si no existe.
+        """
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                imagen, metadatos, _ = self._memoria[clave]
+                return imagen, metadatos
+
+        entrada = self._leer_disco(clave) if self.directorio_disco else None
+        with self._lock:
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self.aciertos_disco += 1
+            desalojadas = self._guardar_en_memoria(clave, *entrada)
+        self._volcar_disco(desalojadas)
+        return entrada
+
+    def guardar(self, clave, imagen, metadatos):
+        """
+        Guarda una imagen procesada y sus metadatos reducidos.
+        Se guarda una vista de solo lectura: el array del llamador no cambia, pero no debe modificarse después.
+
+        :param clave: Clave devuelta por CacheImagenes.clave.
+        :param imagen: Array NumPy de la imagen de salida.
+        :param metadatos: Diccionario serializable a JSON.
+        """
+        imagen = imagen.view()
+        imagen.setflags(write=False)
+        with self._lock:
+            desalojadas = self._guardar_en_memoria(clave, imagen, metadatos)
+        self._volcar_disco(desalojadas)
+
+    def _guardar_en_memoria(self, clave, imagen, metadatos):
+        """
+        Inserta la entrada en el LRU y desaloja las más antiguas hasta quedar bajo max_bytes.
+        Se llama con el lock tomado; las entradas desalojadas se vuelcan a disco después de soltarlo.
+
+        :return: Lista de tuplas (clave, imagen, metadatos) desalojadas.
+        """
+        if clave in self._memoria:
+            self._bytes_memoria -= self._memoria.pop(clave)[2]
+        tamano = imagen.nbytes
+        self._memoria[clave] = (imagen, metadatos, tamano)
+        self._bytes_memoria += tamano
+        desalojadas = []
+        while self._bytes_memoria > self.max_bytes and len(self._memoria) > 1:
+            clave_vieja, (imagen_vieja, metadatos_viejos, tamano_viejo) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= tamano_viejo
+            desalojadas.append((clave_vieja, imagen_vieja, metadatos_viejos))
+        return desalojadas
+
+    def _volcar_disco(self, desalojadas):
+        """
+        Escribe en disco las entradas desalojadas de memoria, sin el lock tomado para no bloquear a los lectores.
+        """
+        if not self.directorio_disco or not desalojadas:
+            return
+        for clave, imagen, metadatos in desalojadas:
+            ruta_npy, ruta_json = self._rutas_disco(clave)
+            with self._lock:
+                if clave in self._disco:
+                    self._disco.move_to_end(clave)
+                    continue
+            # Se escribe a un temporal propio del hilo y se renombra para que un lector nunca vea un archivo a medias
+            temporal = f"{ruta_npy}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temporal, 'wb') as f:
+                    np.save(f, imagen)
+                with open(ruta_json, 'w', encoding='utf-8') as f:
+                    json.dump(metadatos, f, default=str)
+                os.replace(temporal, ruta_npy)
+                tamano = os.path.getsize(ruta_npy)
+            except OSError as e:
+                logger.error(f"Error al volcar la caché de imágenes a disco: {e}")
+                try:
+                    os.remove(temporal)
+                except OSError:
+                    pass
+                continue
+            with self._lock:
+                self._bytes_disco += tamano - self._disco.pop(clave, 0)
+                self._disco[clave] = tamano
+        self._recortar_disco()
+
+    def _leer_disco(self, clave):
+        ruta_npy, ruta_json = self._rutas_disco(clave)
+        try:
+            imagen = np.load(ruta_npy)
+            with open(ruta_json, 'r', encoding='utf-8') as f:
+                metadatos = json.load(f)
+            os.utime(ruta_npy)  # Conserva el orden de uso para el índice del próximo inicio
+        except (OSError, ValueError):
+            with self._lock:
+                self._bytes_disco -= self._disco.pop(clave, 0)
+            return None
+        with self._lock:
+            if clave in self._disco:
+                self._disco.move_to_end(clave)
+        imagen.setflags(write=False)
+        return imagen, metadatos
+
+    def _recortar_disco(self):
+        """
+        Elimina las entradas en disco usadas hace más tiempo hasta quedar bajo max_bytes_disco, según el índice.
+        """
+        eliminadas = []
+        with self._lock:
+            while self._bytes_disco > self.max_bytes_disco and self._disco:
+                clave, tamano = self._disco.popitem(last=False)
+                self._bytes_disco -= tamano
+                eliminadas.append(clave)
+        for clave in eliminadas:
+            for ruta_archivo in self._rutas_disco(clave):
+                try:
+                    os.remove(ruta_archivo)
+                except OSError:
+                    pass
+
+    def bytes_en_disco(self):
+        with self._lock:
+            return self._bytes_disco
+
+    def bytes_en_memoria(self):
+        with self._lock:
+            return self._bytes_memoria
+
+    def limpiar(self):
+        """
+        Elimina todas las entradas, en memoria y en disco.
+        """
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+            self._disco.clear()
+            self._bytes_disco = 0
+        if self.directorio_disco:
+            try:
+                with os.scandir(self.directorio_disco) as archivos:
+                    for archivo in archivos:
+                        if archivo.name.endswith(('.npy', '.json', '.tmp')):
+                            try:
+                                os.remove(archivo.path)
+                            except OSError as e:
+                                logger.error(f"No se pudo eliminar {archivo.path}: {e}")
+            except OSError as e:
+                logger.error(f"Error al recorrer la caché de imágenes en disco: {e}")
@@ -0,0 +1,209 @@
+# src/procesamiento/cache_pixeles.py
+# Caché persistente de píxeles decodificados. Los DICOM comprimidos (JPEG 2000, JPEG-LS, JPEG...) se decodifican
+# una sola vez y el array crudo se guarda como .npy; los usos siguientes lo abren con mmap, sin descomprimir,
+# y los procesos que leen el mismo estudio comparten las páginas a través de la caché del sistema operativo.
+# Los datos sin comprimir no se cachean: pydicom ya los lee directamente del archivo.
+
+import os
+import hashlib
+import logging
+import threading
+import numpy as np
+from src.config.settings import CACHE_PIXELES, CACHE_PIXELES_DIR, CACHE_PIXELES_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+_cache_pixeles = None
+_lock_cache_pixeles = threading.Lock()
+
+
+def clave_pixeles(ds):
+    """
+    Clave de los píxeles de un dataset: SOP Instance UID, sintaxis de transferencia y hash de PixelData.
+    Hashear los bytes comprimidos es mucho más barato que decodificarlos y evita servir píxeles
+    viejos si un archivo se reescribe con el mismo UID.
+
+    :param ds: Dataset DICOM con PixelData.
+    :return: Clave hexadecimal.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(ds.get('SOPInstanceUID', '')).encode())
+    h.update(str(ds.file_meta.get('TransferSyntaxUID', '')).encode())
+    h.update(ds.PixelData)
+    return h.hexdigest()
+
+
+def _es_comprimido(ds):
+    file_meta = getattr(ds, 'file_meta', None)
+    sintaxis = file_meta.get('TransferSyntaxUID') if file_meta is not None else None
+    return sintaxis is not None and sintaxis.is_compressed and 'PixelData' in ds
+
+
+class CachePixeles:
+    """
+    Caché en disco de arrays de píxeles decodificados, acotada en bytes.
+    Cada entrada es un .npy que se abre con mmap; al superar el tope se eliminan las usadas hace más tiempo.
+    """
+
+    def __init__(self, directorio, max_bytes=CACHE_PIXELES_MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        os.makedirs(directorio, exist_ok=True)
+        self._bytes = sum(tamano for _, tamano, _ in self._entradas())
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.npy")
+
+    def _entradas(self):
+        entradas = []
+        with os.scandir(self.directorio) as archivos:
+            for archivo in archivos:
+                if archivo.name.endswith('.npy'):
+                    try:
+                        info = archivo.stat()
+                    except OSError:
+                        continue
+                    entradas.append((info.st_mtime, info.st_size, archivo.path))
+        return entradas
+
+    def buscar(self, ds):
+        """
+        Devuelve los píxeles cacheados del dataset sin decodificar nada.
+        Es una consulta previa (p. ej. antes de la decodificación reducida de JPEG 2000): si no hay entrada
+        no cuenta como fallo, porque el llamador no decodifica ni guarda los píxeles completos.
+
+        :param ds: Dataset DICOM.
+        :return: Array de solo lectura mapeado en memoria, o None si no está en la caché (o no se cachea).
+        """
+        if not _es_comprimido(ds):
+            return None
+        ruta = self._ruta(clave_pixeles(ds))
+        try:
+            pixeles = np.load(ruta, mmap_mode='r')
+            os.utime(ruta)  # Marca el uso para el desalojo por antigüedad
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self.aciertos += 1
+        return pixeles
+
+    def obtener(self, ds):
+        """
+        Devuelve los píxeles del dataset desde la caché, o los decodifica con pixel_array y los guarda.
+
+        :param ds: Dataset DICOM.
+        :return: Array de píxeles (de solo lectura si viene de la caché).
+        """
+        if not _es_comprimido(ds):
+            return ds.pixel_array
+        clave = clave_pixeles(ds)
+        ruta = self._ruta(clave)
+        try:
+            pixeles = np.load(ruta, mmap_mode='r')
+            os.utime(ruta)
+            with self._lock:
+                self.aciertos += 1
+            return pixeles
+        except (OSError, ValueError):
+            pass
+
+        with self._lock:
+            self.fallos += 1
+        pixeles = ds.pixel_array
+        self._guardar(ruta, pixeles)
+        return pixeles
+
+    def _guardar(self, ruta, pixeles):
+        # Temporal único por proceso e hilo y renombrado atómico: la conversión por lotes escribe desde varios procesos
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, 'wb') as f:
+                np.save(f, pixeles)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.error(f"Error al guardar píxeles en la caché: {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._bytes += os.path.getsize(ruta)
+            recortar = self._bytes > self.max_bytes
+        if recortar:
+            self._recortar()
+
+    def _recortar(self):
+        """
+        Elimina las entradas usadas hace más tiempo hasta quedar bajo max_bytes.
+        El total se recalcula del directorio, que otros procesos también modifican.
+        Los arrays ya mapeados siguen siendo válidos aunque su archivo se elimine.
+        """
+        entradas = self._entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            total -= tamano
+        with self._lock:
+            self._bytes = total
+
+    def bytes_en_disco(self):
+        with self._lock:
+            return self._bytes
+
+    def limpiar(self):
+        """
+        Elimina todas las entradas.
+        """
+        for _, _, ruta in self._entradas():
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes = 0
+
+
+def obtener_cache_pixeles():
+    """
+    Devuelve la caché de píxeles del proceso, o None si está desactivada en la configuración.
+
+    :return: Instancia única de CachePixeles o None.
+    """
+    global _cache_pixeles
+    if not CACHE_PIXELES:
+        return None
+    with _lock_cache_pixeles:
+        if _cache_pixeles is None:
+            _cache_pixeles = CachePixeles(CACHE_PIXELES_DIR, CACHE_PIXELES_MAX_BYTES)
+        return _cache_pixeles
+
+
+def pixeles_dicom(ds):
+    """
+    Reemplazo de ds.pixel_array que pasa por la caché de píxeles decodificados.
+
+    :param ds: Dataset DICOM.
+    :return: Array de píxeles; los que vienen de la caché son de solo lectura.
+    """
+    cache = obtener_cache_pixeles()
+    return ds.pixel_array if cache is None else cache.obtener(ds)
+
+
+def buscar_pixeles_dicom(ds):
+    """
+    Píxeles del dataset solo si ya están en la caché, sin decodificar.
+
+    :param ds: Dataset DICOM.
+    :return: Array de solo lectura o None.
+    """
+    cache = obtener_cache_pixeles()
+    return None if cache is None else cache.buscar(ds)
@@ -0,0 +1,272 @@
+# src/procesamiento/catalogo.py
+# Catálogo persistente de metadatos DICOM en SQLite.
+# Los archivos se escanean leyendo solo la cabecera y el catálogo se actualiza de forma incremental
+# comparando tamaño y fecha de modificación, de modo que listar, filtrar y contar no relee los archivos.
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from src.procesamiento.lectura_dicom import leer_cabecera_dicom
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_DICOM = ('.dcm', '.dicom')
+
+# Columna del catálogo -> palabra clave DICOM leída de la cabecera
+TAGS_CATALOGO = {
+    'patient_id': 'PatientID',
+    'study_date': 'StudyDate',
+    'study_uid': 'StudyInstanceUID',
+    'series_uid': 'SeriesInstanceUID',
+    'sop_uid': 'SOPInstanceUID',
+    'modality': 'Modality',
+    'laterality': 'ImageLaterality',
+    'view_position': 'ViewPosition',
+    'photometric': 'PhotometricInterpretation',
+    'rows': 'Rows',
+    'columns': 'Columns',
+}
+
+# Columnas por las que se puede filtrar en listar y contar
+FILTROS = ('patient_id', 'study_date', 'study_uid', 'series_uid', 'modality', 'laterality', 'view_position')
+
+# 'error' marca los archivos cuya cabecera no se pudo leer: quedan registrados con su tamaño y mtime para no
+# releerlos en cada escaneo, pero no aparecen en listar, contar ni valores
+_COLUMNAS = ('ruta', 'carpeta', 'tamano', 'mtime', 'hash', 'transfer_syntax') + tuple(TAGS_CATALOGO) + ('error',)
+
+
+def hash_archivo(ruta):
+    """
+    Calcula el hash BLAKE2b del contenido completo de un archivo.
+
+    :param ruta: Ruta al archivo.
+    :return: Hash hexadecimal.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(4 * 1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _rango_prefijo(carpeta):
+    """
+    Devuelve los límites [inferior, superior) de las rutas dentro de una carpeta,
+    para consultar por prefijo usando el índice de la clave primaria.
+    """
+    prefijo = os.path.join(os.path.abspath(carpeta), '')
+    return prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+def listar_archivos(carpeta, extensiones=EXTENSIONES_DICOM):
+    """
+    Recorre la carpeta con os.scandir y devuelve {ruta: (tamaño, mtime)} de los archivos DICOM.
+    """
+    archivos = {}
+    pendientes = [os.path.abspath(carpeta)]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with os.scandir(actual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendientes.append(entrada.path)
+                    elif entrada.name.lower().endswith(extensiones):
+                        info = entrada.stat()
+                        archivos[entrada.path] = (info.st_size, info.st_mtime)
+        except OSError as e:
+            logger.warning(f"No se pudo recorrer {actual}: {e}")
+    return archivos
+
+
+def _leer_registro(ruta, tamano, mtime):
+    """
+    Lee la cabecera y el hash de un archivo y arma la fila del catálogo.
+
+    :return: Tupla con los valores en el orden de _COLUMNAS; si el archivo no es DICOM válido o no se puede
+             leer, la fila lleva solo la ruta, el tamaño y el mtime, con 'error' en 1.
+    """
+    fila_error = (ruta, os.path.dirname(ruta), tamano, mtime, '', None) + (None,) * len(TAGS_CATALOGO) + (1,)
+    ds = leer_cabecera_dicom(ruta)
+    if ds is None:
+        return fila_error
+    file_meta = getattr(ds, 'file_meta', None)
+    transfer_syntax = str(file_meta.get('TransferSyntaxUID', '')) if file_meta is not None else ''
+    tags = []
+    for palabra_clave in TAGS_CATALOGO.values():
+        valor = ds.get(palabra_clave, None)
+        tags.append(valor if isinstance(valor, int) or valor is None else str(valor))
+    try:
+        digest = hash_archivo(ruta)
+    except OSError as e:
+        logger.error(f"No se pudo calcular el hash de {ruta}: {e}")
+        return fila_error
+    return (ruta, os.path.dirname(ruta), tamano, mtime, digest, transfer_syntax, *tags, 0)
+
+
+class CatalogoDicom:
+    """
+    Catálogo de archivos DICOM guardado en SQLite con índices por carpeta, modalidad, estudio y lateralidad.
+    """
+
+    def __init__(self, ruta_sqlite, max_workers=4):
+        self.ruta_sqlite = ruta_sqlite
+        self.max_workers = max_workers
+        self._lock_escaneo = threading.Lock()
+
+        os.makedirs(os.path.dirname(ruta_sqlite), exist_ok=True)
+        columnas_tags = ", ".join(
+            f"{columna} {'INTEGER' if columna in ('rows', 'columns') else 'TEXT'}" for columna in TAGS_CATALOGO
+        )
+        with self._conectar() as conexion:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS archivos ("
+                "ruta TEXT PRIMARY KEY, carpeta TEXT NOT NULL, tamano INTEGER NOT NULL, mtime REAL NOT NULL, "
+                f"hash TEXT NOT NULL, transfer_syntax TEXT, {columnas_tags}, "
+                "error INTEGER NOT NULL DEFAULT 0, actualizado REAL NOT NULL)"
+            )
+            # Catálogos creados con menos columnas: se agregan y se vacían para que el próximo escaneo las llene
+            existentes = {fila['name'] for fila in conexion.execute("PRAGMA table_info(archivos)")}
+            faltantes = [columna for columna in TAGS_CATALOGO if columna not in existentes]
+            for columna in faltantes:
+                tipo = 'INTEGER' if columna in ('rows', 'columns') else 'TEXT'
+                conexion.execute(f"ALTER TABLE archivos ADD COLUMN {columna} {tipo}")
+            if faltantes:
+                conexion.execute("DELETE FROM archivos")
+            if 'error' not in existentes:
+                conexion.execute("ALTER TABLE archivos ADD COLUMN error INTEGER NOT NULL DEFAULT 0")
+            for columna in ('carpeta', 'modality', 'study_uid', 'laterality', 'hash'):
+                conexion.execute(f"CREATE INDEX IF NOT EXISTS idx_archivos_{columna} ON archivos ({columna})")
+
+    @contextmanager
+    def _conectar(self):
+        # Una conexión por operación: las sesiones de Streamlit se ejecutan en hilos distintos
+        conexion = sqlite3.connect(self.ruta_sqlite, timeout=10)
+        conexion.row_factory = sqlite3.Row
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    def escanear(self, carpeta, extensiones=EXTENSIONES_DICOM):
+        """
+        Actualiza el catálogo para una carpeta de forma incremental.
+        Solo se leen (cabecera y hash) los archivos nuevos o cuyo tamaño o mtime cambió,
+        y se eliminan las filas de archivos que ya no existen. Los archivos ilegibles también se registran,
+        marcados con 'error', y no se vuelven a leer hasta que cambien.
+
+        :param carpeta: Carpeta a escanear (recursivamente).
+        :param extensiones: Extensiones de archivo consideradas DICOM.
+        :return: Diccionario con la cantidad de archivos 'nuevos', 'actualizados', 'sin_cambios',
+                 'eliminados', 'errores' (archivos leídos en este escaneo que no son DICOM válidos) e
+                 'ilegibles' (todos los archivos de la carpeta marcados con error).
+        """
+        inicio = time.perf_counter()
+        with self._lock_escaneo:
+            en_disco = listar_archivos(carpeta, tuple(extensiones))
+            inferior, superior = _rango_prefijo(carpeta)
+            with self._conectar() as conexion:
+                en_catalogo = {
+                    fila['ruta']: (fila['tamano'], fila['mtime'])
+                    for fila in conexion.execute(
+                        "SELECT ruta, tamano, mtime FROM archivos WHERE ruta >= ? AND ruta < ?", (inferior, superior)
+                    )
+                }
+
+            pendientes = [ruta for ruta, firma in en_disco.items() if en_catalogo.get(ruta) != firma]
+            eliminados = [ruta for ruta in en_catalogo if ruta not in en_disco]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                registros = list(executor.map(lambda ruta: _leer_registro(ruta, *en_disco[ruta]), pendientes))
+            validos = [registro for registro in registros if not registro[-1]]
+
+            ahora = time.time()
+            marcadores = ", ".join("?" for _ in range(len(_COLUMNAS) + 1))
+            with self._conectar() as conexion:
+                conexion.executemany("DELETE FROM archivos WHERE ruta = ?", [(ruta,) for ruta in eliminados])
+                conexion.executemany(
+                    f"INSERT OR REPLACE INTO archivos ({', '.join(_COLUMNAS)}, actualizado) VALUES ({marcadores})",
+                    [registro + (ahora,) for registro in registros]
+                )
+                ilegibles = conexion.execute(
+                    "SELECT COUNT(*) FROM archivos WHERE ruta >= ? AND ruta < ? AND error = 1", (inferior, superior)
+                ).fetchone()[0]
+
+        resumen = {
+            'nuevos': sum(1 for registro in validos if registro[0] not in en_catalogo),
+            'actualizados': sum(1 for registro in validos if registro[0] in en_catalogo),
+            'sin_cambios': len(en_disco) - len(pendientes),
+            'eliminados': len(eliminados),
+            'errores': len(registros) - len(validos),
+            'ilegibles': ilegibles,
+        }
+        logger.info(f"Catálogo de {carpeta} actualizado en {time.perf_counter() - inicio:.2f} s: {resumen}")
+        return resumen
+
+    def _condiciones(self, carpeta, filtros):
+        condiciones, parametros = ["error = 0"], []
+        if carpeta is not None:
+            inferior, superior = _rango_prefijo(carpeta)
+            condiciones.append("ruta >= ? AND ruta < ?")
+            parametros.extend((inferior, superior))
+        for columna, valor in filtros.items():
+            if columna not in FILTROS:
+                raise ValueError(f"Filtro no soportado: '{columna}'. Opciones: {', '.join(FILTROS)}")
+            if valor is None:
+                continue
+            condiciones.append(f"{columna} = ?")
+            parametros.append(valor)
+        return f" WHERE {' AND '.join(condiciones)}", parametros
+
+    def listar(self, carpeta=None, limite=None, desplazamiento=0, **filtros):
+        """
+        Lista los archivos catalogados, ordenados por ruta.
+
+        :param carpeta: Limita el resultado a los archivos dentro de esta carpeta.
+        :param limite: Cantidad máxima de filas a devolver. None para todas.
+        :param desplazamiento: Filas a saltar (para paginar).
+        :param filtros: Igualdades sobre las columnas de FILTROS, p. ej. modality='MG', laterality='L'.
+        :return: Lista de diccionarios, uno por archivo.
+        """
+        where, parametros = self._condiciones(carpeta, filtros)
+        consulta = f"SELECT * FROM archivos{where} ORDER BY ruta"
+        if limite is not None:
+            consulta += " LIMIT ? OFFSET ?"
+            parametros.extend((int(limite), int(desplazamiento)))
+        with self._conectar() as conexion:
+            return [dict(fila) for fila in conexion.execute(consulta, parametros)]
+
+    def contar(self, carpeta=None, **filtros):
+        """
+        Cuenta los archivos catalogados que cumplen los filtros.
+
+        :param carpeta: Limita la cuenta a los archivos dentro de esta carpeta.
+        :param filtros: Igualdades sobre las columnas de FILTROS.
+        :return: Cantidad de archivos.
+        """
+        where, parametros = self._condiciones(carpeta, filtros)
+        with self._conectar() as conexion:
+            return conexion.execute(f"SELECT COUNT(*) FROM archivos{where}", parametros).fetchone()[0]
+
+    def valores(self, columna, carpeta=None):
+        """
+        Devuelve los valores distintos de una columna filtrable, p. ej. las modalidades presentes.
+
+        :param columna: Una de FILTROS.
+        :param carpeta: Limita la consulta a los archivos dentro de esta carpeta.
+        :return: Lista ordenada de valores (sin None).
+        """
+        if columna not in FILTROS:
+            raise ValueError(f"Columna no soportada: '{columna}'. Opciones: {', '.join(FILTROS)}")
+        where, parametros = self._condiciones(carpeta, {})
+        where = f"{where} AND {columna} IS NOT NULL"
+        with self._conectar() as conexion:
+            filas = conexion.execute(f"SELECT DISTINCT {columna} FROM archivos{where} ORDER BY 1", parametros)
+            return [fila[0] for fila in filas]
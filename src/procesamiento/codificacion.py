@@ -0,0 +1,95 @@
+# src/procesamiento/codificacion.py
+# Etapa de codificación de las imágenes convertidas: PNG con nivel y estrategia de compresión configurables,
+# PNG de 16 bits, WebP sin pérdida y JPG. Codifica en memoria para medir el tiempo de codificación
+# por separado de la escritura en disco.
+
+import time
+import cv2
+from src.config.settings import COMPRESION_PNG_POR_DEFECTO
+
+# Formato -> (extensión, profundidad en bits)
+FORMATOS_IMAGEN = {
+    'PNG': ('png', 8),
+    'PNG16': ('png', 16),
+    'JPG': ('jpg', 8),
+    'WEBP': ('webp', 8),
+}
+
+# Estrategias de zlib para PNG
+ESTRATEGIAS_PNG = {
+    'default': cv2.IMWRITE_PNG_STRATEGY_DEFAULT,
+    'filtered': cv2.IMWRITE_PNG_STRATEGY_FILTERED,
+    'huffman': cv2.IMWRITE_PNG_STRATEGY_HUFFMAN_ONLY,
+    'rle': cv2.IMWRITE_PNG_STRATEGY_RLE,
+    'fixed': cv2.IMWRITE_PNG_STRATEGY_FIXED,
+}
+
+# Con calidad mayor que 100 el codificador WebP de OpenCV trabaja sin pérdida
+_CALIDAD_WEBP_SIN_PERDIDA = 101
+
+
+def extension(formato):
+    """
+    Extensión de archivo del formato.
+    """
+    return FORMATOS_IMAGEN[formato][0]
+
+
+def profundidad(formato):
+    """
+    Profundidad en bits que requiere el formato (8 o 16).
+    """
+    return FORMATOS_IMAGEN[formato][1]
+
+
+def parametros_codificacion(formato, compresion_png=COMPRESION_PNG_POR_DEFECTO, estrategia_png=None, calidad_jpg=95):
+    """
+    Arma los parámetros de cv2.imencode para el formato.
+
+    :param formato: Una de FORMATOS_IMAGEN.
+    :param compresion_png: Nivel de compresión zlib de 0 (más rápido) a 9 (más pequeño). None para el de OpenCV.
+                           Por defecto COMPRESION_PNG_POR_DEFECTO, el mismo de la interfaz y la CLI.
+    :param estrategia_png: Una de ESTRATEGIAS_PNG. None para la de OpenCV.
+    :param calidad_jpg: Calidad JPEG de 0 a 100.
+    :return: Lista de parámetros.
+    """
+    if formato not in FORMATOS_IMAGEN:
+        raise ValueError(f"Formato no soportado: '{formato}'. Opciones: {', '.join(FORMATOS_IMAGEN)}")
+    parametros = []
+    if formato in ('PNG', 'PNG16'):
+        if compresion_png is not None:
+            if not 0 <= int(compresion_png) <= 9:
+                raise ValueError(f"El nivel de compresión PNG debe estar entre 0 y 9, no {compresion_png}")
+            parametros += [cv2.IMWRITE_PNG_COMPRESSION, int(compresion_png)]
+        if estrategia_png is not None:
+            if estrategia_png not in ESTRATEGIAS_PNG:
+                raise ValueError(f"Estrategia PNG no soportada: '{estrategia_png}'. "
+                                 f"Opciones: {', '.join(ESTRATEGIAS_PNG)}")
+            parametros += [cv2.IMWRITE_PNG_STRATEGY, ESTRATEGIAS_PNG[estrategia_png]]
+    elif formato == 'JPG':
+        parametros += [cv2.IMWRITE_JPEG_QUALITY, int(calidad_jpg)]
+    elif formato == 'WEBP':
+        parametros += [cv2.IMWRITE_WEBP_QUALITY, _CALIDAD_WEBP_SIN_PERDIDA]
+    return parametros
+
+
+def codificar(image, formato, **opciones):
+    """
+    Codifica una imagen en memoria.
+
+    :param image: Array NumPy uint8 (o uint16 para PNG16).
+    :param formato: Una de FORMATOS_IMAGEN.
+    :param opciones: compresion_png, estrategia_png y calidad_jpg (ver parametros_codificacion).
+    :return: Tupla (bytes codificados, segundos de codificación).
+    :raises ValueError: Si la profundidad de la imagen no corresponde al formato o el códec falla.
+    """
+    bits = 16 if image.dtype.itemsize == 2 else 8
+    if bits != profundidad(formato):
+        raise ValueError(f"El formato {formato} requiere imágenes de {profundidad(formato)} bits, no de {bits}")
+    parametros = parametros_codificacion(formato, **opciones)
+    inicio = time.perf_counter()
+    ok, buffer = cv2.imencode(f".{extension(formato)}", image, parametros)
+    segundos = time.perf_counter() - inicio
+    if not ok:
+        raise ValueError(f"OpenCV no pudo codificar la imagen en {formato}")
+    return buffer.tobytes(), segundos
@@ -0,0 +1,275 @@
+# src/procesamiento/conversion_lote.py
+# Conversión por lotes de DICOM a PNG/JPG/WebP (o a shards .npy) sin interfaz, con manifiesto para omitir
+# archivos sin cambios y retomar una conversión interrumpida.
+#
+# Uso (p. ej. desde cron):
+#     python -m src.procesamiento.conversion_lote <carpeta en data/raw> [--tamano 224x224] [--formato png|png16|jpg|webp|npy]
+#                                                [--compresion-png 0-9] [--estrategia-png rle]
+#                                                [--workers N] [--backend procesos|hilos] [--forzar]
+# Código de salida: 0 si todo se convirtió (o ya estaba vigente), 1 si hubo archivos fallidos o DICOM ilegibles,
+# 2 si la carpeta no existe.
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from src.procesamiento.convertir_png import convertir_dicom_a_imagen
+from src.procesamiento.codificacion import FORMATOS_IMAGEN, ESTRATEGIAS_PNG, codificar, extension, profundidad
+from src.procesamiento.catalogo import CatalogoDicom
+from src.procesamiento.planificador import BACKENDS, ejecutar
+from src.procesamiento.exportacion_npy import ExportadorShards
+from src.config.settings import DATA_RAW_DIR, DATA_PROCESSED_DIR, CATALOGO_DICOM_SQLITE, CONVERSION_BACKEND
+from src.config.settings import EXPORTACION_NPY_IMAGENES_POR_SHARD, COMPRESION_PNG_POR_DEFECTO
+
+logger = logging.getLogger(__name__)
+
+# 'NPY' escribe las imágenes en shards .npy con un índice (ver src/procesamiento/exportacion_npy.py)
+FORMATOS = tuple(FORMATOS_IMAGEN) + ('NPY',)
+
+# Nombre del manifiesto dentro de la carpeta de salida (una línea JSON por archivo convertido)
+ARCHIVO_MANIFIESTO = 'manifiesto_conversion.jsonl'
+
+
+def guardar_imagen(image, output_path, formato, **codificacion):
+    """
+    Codifica una imagen en memoria y la escribe en disco.
+
+    :param image: Array NumPy uint8 (uint16 para PNG16).
+    :param output_path: Ruta del archivo de salida.
+    :param formato: Una de FORMATOS_IMAGEN.
+    :param codificacion: Opciones del codificador (ver src/procesamiento/codificacion.py).
+    :return: Tupla (segundos de codificación, bytes escritos).
+    """
+    datos, segundos = codificar(image, formato, **codificacion)
+    with open(output_path, 'wb') as f:
+        f.write(datos)
+    return segundos, len(datos)
+
+
+def convertir_archivo(dicom_path, output_path, output_size, formato, codificacion=None):
+    """
+    Convierte un DICOM y guarda la imagen. Está a nivel de módulo para poder ejecutarse en otro proceso.
+
+    :return: Tupla (segundos de codificación, bytes escritos), o None si falla la conversión.
+    """
+    image = convertir_dicom_a_imagen(dicom_path, output_size, bits=profundidad(formato))
+    if image is None:
+        return None
+    try:
+        return guardar_imagen(image, output_path, formato, **(codificacion or {}))
+    except Exception as e:
+        logger.error(f"Error al guardar {output_path}: {e}")
+        return None
+
+
+def convertir_a_array(dicom_path, output_size):
+    """
+    Convierte un DICOM y devuelve la imagen para escribirla en un shard desde el proceso principal.
+
+    :return: Array uint8 o None si falla la conversión.
+    """
+    return convertir_dicom_a_imagen(dicom_path, output_size)
+
+
+class ManifiestoConversion:
+    """
+    Registro de los archivos ya convertidos en una carpeta de salida.
+    Se guarda como JSON Lines y cada conversión se agrega al final con flush, de modo que
+    una ejecución interrumpida conserva todo lo convertido hasta ese momento.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._entradas = {}
+        self._lock = threading.Lock()
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea truncada por una interrupción
+                        continue
+                    self._entradas[entrada['origen']] = entrada
+
+    def vigente(self, origen, hash_origen, opciones):
+        """
+        Indica si el archivo ya se convirtió con el mismo contenido y las mismas opciones,
+        y su salida sigue existiendo.
+        """
+        entrada = self._entradas.get(origen)
+        return (entrada is not None and entrada['hash'] == hash_origen and entrada['opciones'] == opciones
+                and os.path.exists(entrada['salida']))
+
+    def registrar(self, origen, hash_origen, opciones, salida):
+        entrada = {'origen': origen, 'hash': hash_origen, 'opciones': opciones, 'salida': salida,
+                   'convertido': time.time()}
+        with self._lock:
+            self._entradas[origen] = entrada
+            with open(self.ruta, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada) + '\n')
+                f.flush()
+
+    def compactar(self):
+        """
+        Reescribe el manifiesto con una sola línea por archivo.
+        """
+        with self._lock:
+            temporal = f"{self.ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                for entrada in self._entradas.values():
+                    f.write(json.dumps(entrada) + '\n')
+            os.replace(temporal, self.ruta)
+
+
+def convertir_carpeta(source_dir, output_dir, output_size=(224, 224), formato="PNG", max_workers=None,
+                      forzar=False, progreso=None, catalogo=None, filtros=None, backend=CONVERSION_BACKEND,
+                      codificacion=None):
+    """
+    Convierte todos los DICOM de una carpeta, omitiendo los que el manifiesto da por vigentes.
+    Los archivos se listan desde el catálogo, que aporta el hash del contenido sin releerlos.
+
+    :param source_dir: Carpeta de origen (se recorre recursivamente).
+    :param output_dir: Carpeta de salida; replica la estructura de subcarpetas de source_dir.
+    :param output_size: Tupla (ancho, alto) de salida.
+    :param formato: Una de FORMATOS ('PNG', 'PNG16', 'JPG', 'WEBP' o 'NPY'). Con NPY los shards se escriben
+                    en la subcarpeta npy_<ancho>x<alto> de output_dir.
+    :param max_workers: Cantidad de workers de conversión. None para usar todos los núcleos.
+    :param forzar: Si es True se convierten todos los archivos aunque estén vigentes.
+    :param progreso: Función opcional progreso(completados, total) llamada al terminar cada archivo.
+    :param catalogo: CatalogoDicom a usar; por defecto el de CATALOGO_DICOM_SQLITE.
+    :param filtros: Filtros opcionales del catálogo, p. ej. {'modality': 'MG'}.
+    :param backend: 'procesos' o 'hilos' (ver src/procesamiento/planificador.py).
+    :param codificacion: Opciones del codificador: compresion_png, estrategia_png, calidad_jpg.
+    :return: Diccionario con 'total', 'convertidos', 'omitidos', 'fallidos' (lista de rutas),
+             'ilegibles' (archivos cuya cabecera no se pudo leer), 'codificacion_segundos' y
+             'bytes_salida' (suma sobre los archivos convertidos) y 'segundos'.
+    """
+    inicio = time.perf_counter()
+    formato = formato.upper()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: '{formato}'. Opciones: {', '.join(FORMATOS)}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    catalogo = catalogo or CatalogoDicom(CATALOGO_DICOM_SQLITE)
+    escaneo = catalogo.escanear(source_dir)
+    registros = catalogo.listar(carpeta=source_dir, **(filtros or {}))
+
+    manifiesto = ManifiestoConversion(os.path.join(output_dir, ARCHIVO_MANIFIESTO))
+    codificacion = {clave: valor for clave, valor in (codificacion or {}).items() if valor is not None}
+    opciones = {'tamano': list(output_size), 'formato': formato, 'codificacion': codificacion}
+    pendientes = [
+        registro for registro in registros
+        if forzar or not manifiesto.vigente(os.path.relpath(registro['ruta'], source_dir), registro['hash'], opciones)
+    ]
+    resumen = {'total': len(registros), 'convertidos': 0, 'omitidos': len(registros) - len(pendientes),
+               'fallidos': [], 'ilegibles': escaneo['ilegibles'], 'codificacion_segundos': 0.0, 'bytes_salida': 0}
+
+    def salida(dicom_path):
+        # Se replica la ruta relativa: archivos con el mismo nombre en subcarpetas distintas no se pisan
+        relativa = os.path.splitext(os.path.relpath(dicom_path, source_dir))[0]
+        return os.path.join(output_dir, f"{relativa}.{extension(formato)}")
+
+    # Con NPY los workers devuelven la imagen y el proceso principal la agrega al shard.
+    # Cada tamaño va en su propia subcarpeta: los shards de una exportación tienen forma fija
+    exportador = ExportadorShards(os.path.join(output_dir, f"npy_{output_size[0]}x{output_size[1]}"), output_size,
+                                  EXPORTACION_NPY_IMAGENES_POR_SHARD) if formato == 'NPY' else None
+
+    # Los más grandes primero y una ventana acotada de trabajos en vuelo; el manifiesto se escribe aquí
+    por_ruta = {registro['ruta']: registro for registro in pendientes}
+    if exportador is not None:
+        funcion, tareas = convertir_a_array, [(ruta, (ruta, tuple(output_size))) for ruta in por_ruta]
+    else:
+        funcion, tareas = convertir_archivo, [(ruta, (ruta, salida(ruta), tuple(output_size), formato, codificacion))
+                                              for ruta in por_ruta]
+        for carpeta_salida in {os.path.dirname(salida(ruta)) for ruta in por_ruta}:
+            os.makedirs(carpeta_salida, exist_ok=True)
+    completados = resumen['omitidos']
+    if progreso is not None:
+        progreso(completados, len(registros))
+    for ruta, resultado, excepcion in ejecutar(funcion, tareas, backend, max_workers,
+                                                tamano=lambda ruta: por_ruta[ruta]['tamano']):
+        if excepcion is not None:
+            logger.error(f"Error al convertir {ruta}: {excepcion}")
+        origen, registro = os.path.relpath(ruta, source_dir), por_ruta[ruta]
+        if exportador is not None and resultado is not None:
+            try:
+                ruta_salida = exportador.agregar(resultado, origen, registro['hash'], registro)
+            except ValueError as e:
+                # P. ej. un DICOM RGB: no entra en shards uint8 (alto, ancho); falla solo ese archivo
+                logger.error(f"Error al exportar {ruta} a NPY: {e}")
+                ruta_salida = None
+        elif exportador is None and resultado is not None:
+            ruta_salida = salida(ruta)
+            resumen['codificacion_segundos'] += resultado[0]
+            resumen['bytes_salida'] += resultado[1]
+        else:
+            ruta_salida = None
+        if ruta_salida is not None:
+            resumen['convertidos'] += 1
+            manifiesto.registrar(origen, registro['hash'], opciones, ruta_salida)
+        else:
+            resumen['fallidos'].append(ruta)
+        completados += 1
+        if progreso is not None:
+            progreso(completados, len(registros))
+
+    if exportador is not None:
+        exportador.cerrar()
+    manifiesto.compactar()
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+def _tamano(valor):
+    ancho, _, alto = valor.lower().partition('x')
+    return int(ancho), int(alto or ancho)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte una carpeta de data/raw a imágenes o shards en data/processed.")
+    parser.add_argument('carpeta', help="Subcarpeta de data/raw a convertir.")
+    parser.add_argument('--tamano', type=_tamano, default=(224, 224), help="ANCHOxALTO o un solo lado (224).")
+    parser.add_argument('--formato', type=str.upper, default='PNG', choices=FORMATOS,
+                        help="PNG16 guarda 16 bits; WEBP es sin pérdida.")
+    parser.add_argument('--compresion-png', type=int, choices=range(10), default=COMPRESION_PNG_POR_DEFECTO,
+                        help=f"Nivel zlib de 0 (más rápido) a 9 (más pequeño). Por defecto {COMPRESION_PNG_POR_DEFECTO}.")
+    parser.add_argument('--estrategia-png', choices=tuple(ESTRATEGIAS_PNG), default=None)
+    parser.add_argument('--calidad-jpg', type=int, default=95)
+    parser.add_argument('--workers', type=int, default=None, help="Por defecto, un worker por núcleo.")
+    parser.add_argument('--backend', default=CONVERSION_BACKEND, choices=BACKENDS)
+    parser.add_argument('--forzar', action='store_true', help="Reconvierte también los archivos vigentes.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s [%(levelname)s] %(message)s')
+    source_dir = os.path.join(DATA_RAW_DIR, args.carpeta)
+    output_dir = os.path.join(DATA_PROCESSED_DIR, args.carpeta)
+    if not os.path.isdir(source_dir):
+        print(f"La carpeta de datos crudos no existe: {source_dir}", file=sys.stderr)
+        sys.exit(2)
+
+    codificacion = {'compresion_png': args.compresion_png, 'estrategia_png': args.estrategia_png,
+                    'calidad_jpg': args.calidad_jpg if args.formato == 'JPG' else None}
+    resumen = convertir_carpeta(source_dir, output_dir, args.tamano, args.formato, args.workers, args.forzar,
+                                backend=args.backend, codificacion=codificacion)
+    segundos = resumen['segundos']
+    tasa = resumen['convertidos'] / segundos if segundos > 0 else 0.0
+    print(f"Carpeta: {source_dir} -> {output_dir}")
+    print(f"Archivos: {resumen['total']}, convertidos: {resumen['convertidos']}, omitidos: {resumen['omitidos']}, "
+          f"fallidos: {len(resumen['fallidos'])}, ilegibles: {resumen['ilegibles']}")
+    print(f"Tiempo: {segundos:.1f} s ({tasa:.1f} imágenes/s)")
+    if resumen['convertidos'] and args.formato != 'NPY':
+        print(f"Codificación {args.formato}: {resumen['codificacion_segundos'] * 1000 / resumen['convertidos']:.1f} ms/imagen, "
+              f"{resumen['bytes_salida'] / resumen['convertidos'] / 1024:.1f} KB/imagen "
+              f"({resumen['bytes_salida'] / 1024 ** 2:.1f} MB en total)")
+    for ruta in resumen['fallidos']:
+        print(f"Fallido: {ruta}")
+    # Los DICOM ilegibles (cabecera dañada o no DICOM) tampoco se convirtieron: también cuentan como fallo
+    sys.exit(1 if resumen['fallidos'] or resumen['ilegibles'] else 0)
+
+
+if __name__ == "__main__":
+    main()
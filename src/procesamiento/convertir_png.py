@@ -1,44 +1,36 @@
 # src/procesamiento/convertir_png.py
 
 import pydicom
-import numpy as np
-import cv2
-import io
-from pydicom.pixel_data_handlers.util import apply_voi_lut
 import logging
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.config.settings import DECODIFICACION_REDUCIDA
 
 logger = logging.getLogger(__name__)
 
-def convertir_dicom_a_imagen(dicom_path, output_size=(224, 224)):
+def convertir_dicom_a_imagen(dicom_path, output_size=(224, 224), bits=8):
     """
     Convierte un archivo DICOM a una imagen numpy array con el tamaño especificado.
 
     :param dicom_path: Ruta al archivo DICOM.
     :param output_size: Tupla (ancho, alto) para redimensionar la imagen.
-    :return: Imagen como numpy array en formato uint8 o None si falla la conversión.
+    :param bits: Profundidad de la salida: 8 (uint8) o 16 (uint16, conserva el rango de la ventana).
+    :return: Imagen como numpy array en formato uint8 (o uint16) o None si falla la conversión.
     """
     try:
         # Leer el dataset DICOM
         dicom = pydicom.dcmread(dicom_path)
-        original_image = dicom.pixel_array
 
-        # Aplicar VOI LUT con prefer_lut=True (priorizando LUT si está presente)
-        img_windowed = apply_voi_lut(original_image, dicom, prefer_lut=True)
-
-        # Manejar Photometric Interpretation si es MONOCHROME1 (invertir la imagen)
+        # Manejar Photometric Interpretation si es MONOCHROME1 (el motor invierte la imagen)
         photometric_interpretation = dicom.get('PhotometricInterpretation', 'UNKNOWN')
         if photometric_interpretation == 'MONOCHROME1':
-            img_windowed = img_windowed.max() - img_windowed
-            print(f"Imagen '{dicom_path}' invertida debido a Photometric Interpretation: {photometric_interpretation}")
+            logger.debug(f"Imagen '{dicom_path}' invertida debido a Photometric Interpretation: "
+                         f"{photometric_interpretation}")
         else:
-            print(f"Imagen '{dicom_path}' Photometric Interpretation: {photometric_interpretation}")
-
-        # Normalizar la imagen para que esté en el rango [0, 255]
-        img_normalized = (img_windowed - img_windowed.min()) / (img_windowed.max() - img_windowed.min()) * 255
-        img_normalized = img_normalized.astype(np.uint8)
+            logger.debug(f"Imagen '{dicom_path}' Photometric Interpretation: {photometric_interpretation}")
 
-        # Redimensionar la imagen al tamaño especificado
-        img_resized = cv2.resize(img_normalized, output_size, interpolation=cv2.INTER_AREA)
+        # VOI LUT (priorizando la LUT si está presente), normalización a [0, 255] y redimensionado,
+        # decodificando a la menor resolución que cubre output_size cuando la sintaxis lo permite
+        img_resized = procesar_dicom(dicom, output_size=output_size, reducida=DECODIFICACION_REDUCIDA, bits=bits)
 
         return img_resized
 
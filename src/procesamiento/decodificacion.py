@@ -0,0 +1,207 @@
+# src/procesamiento/decodificacion.py
+# Decodificación de píxeles DICOM a resolución reducida cuando la salida es pequeña.
+# JPEG 2000 se decodifica en el menor nivel de la transformada wavelet que cubre el tamaño pedido, con
+# pylibjpeg-openjpeg si su decode admite 'reduce' y si no con el decodificador JPEG 2000 de Pillow;
+# los datos sin comprimir se submuestrean con un paso entero, sin materializar la imagen completa, hasta
+# el doble del tamaño pedido para que el INTER_AREA final del motor actúe como filtro antialiasing.
+# Cualquier otro caso vuelve a la decodificación completa de pydicom.
+
+import io
+import inspect
+import logging
+import threading
+import numpy as np
+from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian, JPEG2000, JPEG2000Lossless
+from src.procesamiento.cache_pixeles import pixeles_dicom, buscar_pixeles_dicom
+
+try:
+    from pydicom.encaps import generate_frames as _generar_frames
+except ImportError:  # pydicom < 3
+    from pydicom.encaps import generate_pixel_data_frame as _generar_frames
+
+try:
+    import openjpeg
+except ImportError:
+    openjpeg = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+SINTAXIS_SIN_COMPRIMIR = (ExplicitVRLittleEndian, ImplicitVRLittleEndian)
+SINTAXIS_JPEG2000 = (JPEG2000, JPEG2000Lossless)
+
+# El submuestreo sin filtrar se detiene en este múltiplo del tamaño de salida (ver _submuestrear_sin_comprimir)
+FACTOR_MARGEN_SUBMUESTREO = 2
+
+# Marcadores del codestream JPEG 2000 (ITU-T T.800, anexo A)
+_MARCADOR_COD = 0xFF52
+_MARCADOR_SOT = 0xFF90
+
+# Posición del Ssiz de la primera componente: SOC (2) + SIZ (2) + Lsiz, Rsiz (4) + tamaños y offsets (32) + Csiz (2)
+_POSICION_SSIZ = 42
+
+
+def _es_monocromo_simple(ds):
+    """
+    Indica si el dataset tiene un único frame monocromo sin signo, el caso que cubren los caminos reducidos.
+    """
+    return (int(ds.get('SamplesPerPixel', 1)) == 1
+            and int(ds.get('NumberOfFrames', 1) or 1) == 1
+            and int(ds.get('PixelRepresentation', 0)) == 0)
+
+
+def nivel_reduccion(filas, columnas, output_size, niveles_max):
+    """
+    Calcula el mayor nivel de reducción (cada nivel divide por 2) que aún cubre el tamaño de salida.
+
+    :param filas: Alto de la imagen completa.
+    :param columnas: Ancho de la imagen completa.
+    :param output_size: Tupla (ancho, alto) de la salida.
+    :param niveles_max: Niveles disponibles en el origen.
+    :return: Nivel entre 0 y niveles_max.
+    """
+    ancho, alto = output_size
+    nivel = 0
+    while nivel < niveles_max:
+        siguiente = 2 ** (nivel + 1)
+        # El códec redondea hacia arriba el tamaño de cada nivel
+        if -(-filas // siguiente) < alto or -(-columnas // siguiente) < ancho:
+            break
+        nivel += 1
+    return nivel
+
+
+def niveles_descomposicion_j2k(codestream):
+    """
+    Lee el número de niveles de descomposición wavelet del segmento COD del codestream.
+
+    :param codestream: Bytes del codestream JPEG 2000 (con o sin contenedor JP2).
+    :return: Número de niveles, o None si no se encuentra el segmento COD.
+    """
+    inicio = codestream.find(b'\xff\x4f\xff\x51')
+    if inicio < 0:
+        return None
+    posicion = inicio + 2
+    while posicion + 4 <= len(codestream):
+        marcador = int.from_bytes(codestream[posicion:posicion + 2], 'big')
+        if marcador == _MARCADOR_SOT:
+            return None
+        longitud = int.from_bytes(codestream[posicion + 2:posicion + 4], 'big')
+        if marcador == _MARCADOR_COD:
+            # Lcod(2) Scod(1) SGcod(4) y el primer byte de SPcod son los niveles de descomposición
+            return codestream[posicion + 9] if posicion + 9 < len(codestream) else None
+        posicion += 2 + longitud
+    return None
+
+
+def _admite_parametro(funcion, parametro):
+    try:
+        return parametro in inspect.signature(funcion).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+# pylibjpeg-openjpeg 2.x no expone 'reduce' en decode; se comprueba la firma en lugar de probar y capturar TypeError
+OPENJPEG_REDUCE = openjpeg is not None and _admite_parametro(openjpeg.decode, 'reduce')
+PILLOW_JPEG2000 = Image is not None and features.check('jpg_2000')
+
+_sin_decodificador_avisado = threading.Event()
+
+
+def _decodificar_pillow_reducido(codestream, nivel):
+    imagen = Image.open(io.BytesIO(codestream))
+    imagen.reduce = nivel  # Pillow descarta los 'nivel' niveles wavelet más finos al decodificar
+    imagen.load()
+    pixeles = np.asarray(imagen)
+    # Pillow escala las muestras al rango completo del modo (p. ej. 12 bits a 16); se devuelven a su precisión,
+    # que está en el Ssiz de la primera componente del marcador SIZ (justo después de SOC)
+    precision = (codestream[_POSICION_SSIZ] & 0x7F) + 1
+    desplazamiento = pixeles.dtype.itemsize * 8 - precision
+    return pixeles >> desplazamiento if desplazamiento > 0 else pixeles
+
+
+def _decodificar_j2k_reducido(ds, output_size):
+    """
+    Decodifica un frame JPEG 2000 en el menor nivel de resolución que cubre output_size.
+
+    :return: Array de píxeles reducido, o None si no se puede reducir.
+    """
+    if not (OPENJPEG_REDUCE or PILLOW_JPEG2000):
+        if not _sin_decodificador_avisado.is_set():
+            _sin_decodificador_avisado.set()
+            logger.warning("No hay un decodificador JPEG 2000 con reducción de resolución (pylibjpeg-openjpeg con "
+                           "'reduce' o Pillow con OpenJPEG); JPEG 2000 se decodifica completo.")
+        return None
+    codestream = next(_generar_frames(ds.PixelData))
+    niveles = niveles_descomposicion_j2k(codestream)
+    if not niveles:
+        return None
+    nivel = nivel_reduccion(int(ds.Rows), int(ds.Columns), output_size, niveles)
+    if nivel == 0:
+        return None
+    if OPENJPEG_REDUCE:
+        return openjpeg.decode(codestream, reduce=nivel)
+    return _decodificar_pillow_reducido(codestream, nivel)
+
+
+def _submuestrear_sin_comprimir(ds, output_size):
+    """
+    Toma una vista con paso entero de los datos sin comprimir, copiando solo los píxeles usados.
+    El paso deja al menos el doble de output_size: tomar un píxel de cada 'paso' no filtra y, con la salida
+    final, repliega la estructura fina (microcalcificaciones) en patrones falsos; el margen de 2x permite
+    que la reducción INTER_AREA posterior promedie antes de llegar al tamaño final.
+
+    :return: Array de píxeles submuestreado, o None si el formato no lo permite.
+    """
+    bits_allocated = int(ds.BitsAllocated)
+    if bits_allocated not in (8, 16):
+        return None
+    filas, columnas = int(ds.Rows), int(ds.Columns)
+    ancho, alto = output_size
+    paso = min(filas // (FACTOR_MARGEN_SUBMUESTREO * alto), columnas // (FACTOR_MARGEN_SUBMUESTREO * ancho))
+    if paso < 2:
+        return None
+
+    dtype = np.dtype('<u2') if bits_allocated == 16 else np.dtype(np.uint8)
+    datos = np.frombuffer(ds.PixelData, dtype=dtype, count=filas * columnas).reshape(filas, columnas)
+    pixeles = np.ascontiguousarray(datos[::paso, ::paso]).astype(dtype.newbyteorder('='), copy=False)
+    bits_stored = int(ds.get('BitsStored', bits_allocated))
+    if bits_stored < bits_allocated:
+        # Igual que pydicom, los bits por encima de BitsStored no forman parte del valor
+        pixeles &= (1 << bits_stored) - 1
+    return pixeles
+
+
+def decodificar_reducido(ds, output_size):
+    """
+    Devuelve los píxeles del dataset a la menor resolución que cubre output_size.
+    Si la sintaxis de transferencia no lo admite devuelve la decodificación completa (pixel_array).
+    Si los píxeles completos ya están en la caché de píxeles se devuelven sin decodificar.
+
+    :param ds: Dataset DICOM.
+    :param output_size: Tupla (ancho, alto) de la salida.
+    :return: Array de píxeles 2D.
+    """
+    if output_size is not None and _es_monocromo_simple(ds) and 'PixelData' in ds:
+        sintaxis = ds.file_meta.get('TransferSyntaxUID') if hasattr(ds, 'file_meta') else None
+        try:
+            if sintaxis in SINTAXIS_JPEG2000:
+                # Abrir la decodificación completa ya cacheada es más barato que decodificar un nivel reducido
+                cacheados = buscar_pixeles_dicom(ds)
+                if cacheados is not None:
+                    return cacheados
+                pixeles = _decodificar_j2k_reducido(ds, output_size)
+            elif sintaxis in SINTAXIS_SIN_COMPRIMIR:
+                pixeles = _submuestrear_sin_comprimir(ds, output_size)
+            else:
+                pixeles = None
+        except Exception as e:
+            logger.warning(f"Fallo la decodificación reducida ({sintaxis}); se decodifica completo: {e}")
+            pixeles = None
+        if pixeles is not None:
+            return pixeles
+    return pixeles_dicom(ds)
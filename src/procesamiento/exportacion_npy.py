@@ -0,0 +1,157 @@
+# src/procesamiento/exportacion_npy.py
+# Exportación del dataset convertido a shards .npy mapeados en memoria (N×alto×ancho, uint8),
+# con un índice JSON Lines de origen, SOP Instance UID y metadatos clave.
+# Los lectores mapean un shard y acceden a cualquier imagen sin decodificar nada.
+
+import os
+import json
+import glob
+import threading
+import numpy as np
+
+# Archivos dentro de la carpeta de salida
+ARCHIVO_INDICE = 'indice.jsonl'
+PLANTILLA_SHARD = 'shard_{:05d}.npy'
+
+# Metadatos del catálogo que se copian al índice
+METADATOS_INDICE = ('sop_uid', 'patient_id', 'study_uid', 'series_uid', 'study_date', 'modality', 'laterality',
+                    'view_position')
+
+
+def _leer_indice(ruta):
+    """
+    Lee el índice JSON Lines, ignorando una última línea truncada por una interrupción.
+    """
+    entradas = []
+    if os.path.exists(ruta):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entradas.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue
+    return entradas
+
+
+class ExportadorShards:
+    """
+    Agrega imágenes de tamaño fijo a shards .npy preasignados con capacidad fija.
+    Cada imagen se escribe y se vacía a disco antes de registrarla en el índice, de modo que
+    una exportación interrumpida se retoma en la siguiente posición libre.
+    """
+
+    def __init__(self, output_dir, output_size, imagenes_por_shard=1024):
+        """
+        :param output_dir: Carpeta de salida de los shards y del índice.
+        :param output_size: Tupla (ancho, alto) de las imágenes.
+        :param imagenes_por_shard: Capacidad de cada shard.
+        """
+        self.output_dir = output_dir
+        self.forma = (int(output_size[1]), int(output_size[0]))
+        self.imagenes_por_shard = imagenes_por_shard
+        self._lock = threading.Lock()
+        self._shard_abierto = None
+        os.makedirs(output_dir, exist_ok=True)
+
+        entradas = _leer_indice(os.path.join(output_dir, ARCHIVO_INDICE))
+        for entrada in entradas:
+            if tuple(entrada['forma']) != self.forma:
+                raise ValueError(f"La exportación en {output_dir} usa imágenes de {entrada['forma']}, "
+                                 f"no de {list(self.forma)}; usa otra carpeta de salida.")
+        # Siguiente posición libre: después de la última registrada
+        self._siguiente = max((entrada['shard'] * imagenes_por_shard + entrada['posicion'] + 1
+                               for entrada in entradas), default=0)
+
+    def _abrir_shard(self, numero):
+        if self._shard_abierto is not None and self._shard_abierto[0] == numero:
+            return self._shard_abierto[1]
+        if self._shard_abierto is not None:
+            self._shard_abierto[1].flush()
+        ruta = os.path.join(self.output_dir, PLANTILLA_SHARD.format(numero))
+        if os.path.exists(ruta):
+            shard = np.load(ruta, mmap_mode='r+')
+        else:
+            shard = np.lib.format.open_memmap(ruta, mode='w+', dtype=np.uint8,
+                                              shape=(self.imagenes_por_shard,) + self.forma)
+        self._shard_abierto = (numero, shard)
+        return shard
+
+    def agregar(self, imagen, origen, hash_origen, metadatos=None):
+        """
+        Escribe una imagen en la siguiente posición libre y la registra en el índice.
+
+        :param imagen: Array uint8 de forma (alto, ancho).
+        :param origen: Ruta del DICOM de origen (relativa a la carpeta convertida).
+        :param hash_origen: Hash del contenido del DICOM de origen.
+        :param metadatos: Diccionario opcional con los campos de METADATOS_INDICE.
+        :return: Ruta del shard donde quedó la imagen.
+        """
+        if imagen.shape != self.forma or imagen.dtype != np.uint8:
+            raise ValueError(f"Se esperaba una imagen uint8 de forma {self.forma}, no {imagen.dtype} {imagen.shape}")
+        metadatos = metadatos or {}
+        with self._lock:
+            numero, posicion = divmod(self._siguiente, self.imagenes_por_shard)
+            shard = self._abrir_shard(numero)
+            shard[posicion] = imagen
+            shard.flush()
+
+            entrada = {'shard': numero, 'posicion': posicion, 'forma': list(self.forma), 'origen': origen,
+                       'hash': hash_origen}
+            entrada.update({clave: metadatos.get(clave) for clave in METADATOS_INDICE})
+            with open(os.path.join(self.output_dir, ARCHIVO_INDICE), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada) + '\n')
+                f.flush()
+            self._siguiente += 1
+        return os.path.join(self.output_dir, PLANTILLA_SHARD.format(numero))
+
+    def cerrar(self):
+        with self._lock:
+            if self._shard_abierto is not None:
+                self._shard_abierto[1].flush()
+                self._shard_abierto = None
+
+
+class LectorShards:
+    """
+    Acceso aleatorio a una exportación en shards: cada shard se mapea en memoria la primera vez que se usa.
+    Si un origen se exportó varias veces, solo cuenta su última versión.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        ultimas = {}
+        for entrada in _leer_indice(os.path.join(output_dir, ARCHIVO_INDICE)):
+            ultimas[entrada['origen']] = entrada
+        self.indice = sorted(ultimas.values(), key=lambda entrada: (entrada['shard'], entrada['posicion']))
+        self._por_origen = {entrada['origen']: i for i, entrada in enumerate(self.indice)}
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.indice)
+
+    def _shard(self, numero):
+        if numero not in self._shards:
+            ruta = os.path.join(self.output_dir, PLANTILLA_SHARD.format(numero))
+            self._shards[numero] = np.load(ruta, mmap_mode='r')
+        return self._shards[numero]
+
+    def __getitem__(self, i):
+        """
+        :param i: Posición en el índice.
+        :return: Vista de solo lectura uint8 (alto, ancho) sobre el shard.
+        """
+        entrada = self.indice[i]
+        return self._shard(entrada['shard'])[entrada['posicion']]
+
+    def buscar(self, origen):
+        """
+        Devuelve la imagen exportada para un origen, o None si no está en el índice.
+        """
+        i = self._por_origen.get(origen)
+        return None if i is None else self[i]
+
+    def shards(self):
+        """
+        Lista las rutas de los shards de la exportación.
+        """
+        return sorted(glob.glob(os.path.join(self.output_dir, 'shard_*.npy')))
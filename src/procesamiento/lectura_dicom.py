@@ -22,6 +22,20 @@ def leer_imagen_dicom(dicom_file):
         logger.error(f"Error al leer el archivo DICOM {dicom_file.name}: {e}")
         return None
 
+def leer_cabecera_dicom(dicom_file):
+    """
+    Lee solo la cabecera de un archivo DICOM, deteniéndose antes de los datos de píxeles.
+    Basta para obtener_metadatos_relevantes y es mucho más barata que leer el archivo completo.
+
+    :param dicom_file: Ruta o archivo DICOM a leer.
+    :return: Dataset DICOM sin PixelData, o None si falla la lectura.
+    """
+    try:
+        return pydicom.dcmread(dicom_file, stop_before_pixels=True)
+    except Exception as e:
+        logger.error(f"Error al leer la cabecera DICOM {getattr(dicom_file, 'name', dicom_file)}: {e}")
+        return None
+
 def obtener_metadatos_relevantes(ds):
     """
     Extrae y devuelve los metadatos relevantes del dataset DICOM.
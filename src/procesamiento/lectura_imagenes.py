@@ -0,0 +1,71 @@
+# src/procesamiento/lectura_imagenes.py
+# Lectura de archivos DICOM, PNG y JPG a la imagen RGB de 224x224 que reciben los modelos de clasificación.
+# No depende de Streamlit, para que la compartan la interfaz y el servidor de inferencia.
+
+import os
+import logging
+import pydicom
+from PIL import Image
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.config.settings import DECODIFICACION_REDUCIDA_CLASIFICACION
+
+logger = logging.getLogger(__name__)
+
+TAMANO_MODELO = (224, 224)
+
+EXTENSIONES_DICOM = ('.dcm', '.dicom')
+EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg')
+
+
+def leer_dicom_modelo(dicom_file):
+    """
+    Lee un archivo DICOM y lo convierte a la imagen RGB de entrada del modelo.
+
+    :param dicom_file: Ruta o archivo DICOM abierto (por ejemplo un Streamlit UploadedFile).
+    :return: Tupla (imagen PIL Image RGB de 224x224, Photometric Interpretation).
+    :raises Exception: Si el archivo no se puede leer o decodificar.
+    """
+    dicom = pydicom.dcmread(dicom_file)
+    photometric_interpretation = dicom.get('PhotometricInterpretation', 'UNKNOWN')
+
+    # VOI LUT y normalización a [0, 255] con la tabla precompilada del motor (MONOCHROME1 se invierte);
+    # solo si se activa DECODIFICACION_REDUCIDA_CLASIFICACION los píxeles se leen a menor resolución
+    reducida = DECODIFICACION_REDUCIDA_CLASIFICACION
+    output_size = TAMANO_MODELO if reducida else None
+    img_normalized = procesar_dicom(dicom, output_size=output_size, reducida=reducida)
+
+    image = Image.fromarray(img_normalized).convert('RGB').resize(TAMANO_MODELO)
+    return image, photometric_interpretation
+
+
+def leer_imagen_modelo(imagen_file):
+    """
+    Lee una imagen PNG o JPG y la convierte a la imagen RGB de entrada del modelo.
+
+    :param imagen_file: Ruta o archivo de imagen abierto.
+    :return: Tupla (imagen PIL Image RGB de 224x224, True si hubo que redimensionarla).
+    :raises Exception: Si el archivo no se puede leer.
+    """
+    image = Image.open(imagen_file).convert('RGB')
+    if image.size == TAMANO_MODELO:
+        return image, False
+    return image.resize(TAMANO_MODELO), True
+
+
+def leer_archivo_modelo(archivo):
+    """
+    Convierte un archivo DICOM, PNG o JPG a la imagen de entrada del modelo según su extensión.
+
+    :param archivo: Archivo abierto con atributo 'name' (Streamlit UploadedFile, archivo o BytesIO con nombre).
+    :return: Tupla (imagen PIL Image RGB de 224x224, tipo de archivo 'DICOM' o 'PNG_JPG').
+    :raises ValueError: Si la extensión no es de un formato soportado.
+    :raises Exception: Si el archivo no se puede leer o decodificar.
+    """
+    extension = os.path.splitext(archivo.name)[1].lower()
+    if extension in EXTENSIONES_DICOM:
+        image, photometric_interpretation = leer_dicom_modelo(archivo)
+        return image, 'DICOM'
+    if extension in EXTENSIONES_IMAGEN:
+        image, redimensionada = leer_imagen_modelo(archivo)
+        return image, 'PNG_JPG'
+    raise ValueError(f"Formato de archivo no soportado: '{extension}'. Se admiten DICOM, PNG y JPG.")
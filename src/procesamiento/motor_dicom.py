@@ -0,0 +1,359 @@
+# src/procesamiento/motor_dicom.py
+# Motor común para convertir los píxeles DICOM en imágenes: ventana VOI, inversión MONOCHROME1,
+# normalización min-max y redimensionado. Trabaja en float32 sobre un único búfer de trabajo,
+# calcula mínimo y máximo en una sola pasada y reserva una sola salida.
+# Para píxeles enteros de hasta 16 bits la cadena completa se compila en una tabla y se aplica con un solo gather.
+
+import logging
+from functools import lru_cache
+import cv2
+import numpy as np
+from pydicom.pixel_data_handlers.util import apply_voi_lut
+from src.procesamiento.decodificacion import decodificar_reducido
+from src.procesamiento.cache_pixeles import pixeles_dicom
+
+logger = logging.getLogger(__name__)
+
+# Margen sumado antes de truncar a uint8; es menor que la separación entre niveles de datos de hasta 16 bits
+_MARGEN_TRUNCADO = 1e-3
+
+# Tipos de píxel con rango acotado que admiten la tabla precompilada; los con signo se indexan con su vista sin signo
+_TIPOS_TABLA = {
+    np.dtype(np.uint8): np.uint8,
+    np.dtype(np.int8): np.uint8,
+    np.dtype(np.uint16): np.uint16,
+    np.dtype(np.int16): np.uint16,
+}
+
+
+def parametros_ventana(ds, index=0):
+    """
+    Obtiene los parámetros de la ventana VOI del dataset, siguiendo PS3.3 C.11.2.
+
+    :param ds: Dataset DICOM.
+    :param index: Índice de la ventana cuando el dataset define varias.
+    :return: Diccionario con 'centro', 'ancho', 'funcion', 'y_min' e 'y_max', o None si no hay ventana.
+    :raises ValueError: Si la función VOI no está soportada o el ancho no es válido.
+    """
+    if 'WindowWidth' not in ds and 'WindowCenter' not in ds:
+        return None
+
+    elemento = ds['WindowCenter']
+    centro = float(elemento.value[index] if elemento.VM > 1 else elemento.value)
+    elemento = ds['WindowWidth']
+    ancho = float(elemento.value[index] if elemento.VM > 1 else elemento.value)
+    funcion = str(ds.get('VOILUTFunction', 'LINEAR')).upper()
+
+    # El rango de salida depende de la representación de los píxeles y del reescalado de modalidad
+    bits_stored = int(ds.BitsStored)
+    if ds.get('ModalityLUTSequence'):
+        y_min, y_max = 0.0, float(2 ** int(ds.ModalityLUTSequence[0].LUTDescriptor[2]) - 1)
+    elif ds.get('PixelRepresentation', 0) == 0:
+        y_min, y_max = 0.0, float(2 ** bits_stored - 1)
+    else:
+        y_min, y_max = float(-(2 ** (bits_stored - 1))), float(2 ** (bits_stored - 1) - 1)
+    pendiente = ds.get('RescaleSlope', None)
+    intercepto = ds.get('RescaleIntercept', None)
+    if pendiente is not None and intercepto is not None:
+        y_min = y_min * float(pendiente) + float(intercepto)
+        y_max = y_max * float(pendiente) + float(intercepto)
+
+    if funcion == 'LINEAR':
+        if ancho < 1:
+            raise ValueError("El ancho de ventana debe ser mayor o igual a 1 para la función 'LINEAR'")
+        centro -= 0.5
+        ancho -= 1
+    elif funcion in ('LINEAR_EXACT', 'SIGMOID'):
+        if ancho <= 0:
+            raise ValueError(f"El ancho de ventana debe ser mayor que 0 para la función '{funcion}'")
+    else:
+        raise ValueError(f"Función VOI LUT no soportada: '{funcion}'")
+
+    return {'centro': centro, 'ancho': ancho, 'funcion': funcion, 'y_min': y_min, 'y_max': y_max}
+
+
+def aplicar_ventana(arr, parametros):
+    """
+    Aplica la ventana VOI sobre un array float32, en el mismo array.
+
+    :param arr: Array float32 con los píxeles; se modifica.
+    :param parametros: Resultado de parametros_ventana.
+    :return: El mismo array, ventaneado.
+    """
+    centro, ancho = parametros['centro'], parametros['ancho']
+    y_min, y_max = parametros['y_min'], parametros['y_max']
+    rango = y_max - y_min
+
+    if parametros['funcion'] == 'SIGMOID':
+        arr -= centro
+        arr *= -4.0 / ancho
+        np.exp(arr, out=arr)
+        arr += 1.0
+        np.reciprocal(arr, out=arr)
+        arr *= rango
+        arr += y_min
+        return arr
+
+    # LINEAR y LINEAR_EXACT: la recta es continua en los extremos de la ventana, así que equivale a recortar
+    if ancho == 0:
+        # Ventana degenerada (LINEAR con ancho 1): un escalón en el centro
+        np.copyto(arr, np.where(arr > centro, y_max, y_min).astype(np.float32))
+        return arr
+    arr -= centro
+    arr *= rango / ancho
+    arr += 0.5 * rango + y_min
+    np.clip(arr, y_min, y_max, out=arr)
+    return arr
+
+
+def ventanear(pixeles, ds, aplicar_voilut=True):
+    """
+    Devuelve una copia float32 de los píxeles con la ventana VOI aplicada.
+    Si el dataset trae una secuencia VOI LUT se usa apply_voi_lut de pydicom, que la prioriza.
+
+    :param pixeles: Array de píxeles (pixel_array).
+    :param ds: Dataset DICOM.
+    :param aplicar_voilut: Si es False solo se convierte a float32.
+    :return: Array float32 nuevo.
+    """
+    if aplicar_voilut and ds.get('VOILUTSequence'):
+        return np.asarray(apply_voi_lut(pixeles, ds, prefer_lut=True), dtype=np.float32)
+
+    arr = pixeles.astype(np.float32)
+    if aplicar_voilut:
+        parametros = parametros_ventana(ds)
+        if parametros is not None:
+            aplicar_ventana(arr, parametros)
+    return arr
+
+
+def minimo_maximo(arr):
+    """
+    Calcula el mínimo y el máximo de un array en una sola pasada.
+
+    :return: Tupla (mínimo, máximo) como float.
+    """
+    if arr.ndim == 2 and arr.dtype in (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32, np.float64):
+        minimo, maximo, _, _ = cv2.minMaxLoc(arr)
+        return float(minimo), float(maximo)
+    return float(arr.min()), float(arr.max())
+
+
+def normalizar(arr, invertir=False, escala=1.0, margen=0.0):
+    """
+    Normaliza un array float32 al rango [0, escala] en el mismo array, invirtiéndolo si se indica.
+    Si la imagen es constante devuelve ceros.
+
+    :param arr: Array float32; se modifica.
+    :param invertir: Si es True el máximo pasa a 0 y el mínimo a 'escala'.
+    :param escala: Valor máximo de la salida.
+    :param margen: Valor sumado a toda la salida, incluido en las mismas dos operaciones.
+    :return: El mismo array, normalizado.
+    """
+    minimo, maximo = minimo_maximo(arr)
+    rango = maximo - minimo
+    if rango == 0:
+        arr.fill(0)
+        return arr
+    # (arr - base) * factor + margen, expresado como una resta y una multiplicación en el sitio
+    base, factor = (maximo, -escala / rango) if invertir else (minimo, escala / rango)
+    arr -= base - margen / factor
+    arr *= factor
+    return arr
+
+
+def a_uint8(arr, invertir=False):
+    """
+    Normaliza un array float32 y lo convierte a uint8 [0, 255] con una sola asignación de salida.
+    Como en los caminos anteriores, la conversión trunca los decimales.
+
+    :param arr: Array float32; se usa como búfer de trabajo.
+    :param invertir: Si es True invierte la imagen durante la normalización.
+    :return: Array uint8.
+    """
+    # El margen evita que los valores enteros exactos caigan al nivel inferior por el redondeo de float32
+    return normalizar(arr, invertir, 255.0, _MARGEN_TRUNCADO).astype(np.uint8)
+
+
+def redimensionar(imagen, output_size):
+    """
+    Redimensiona una imagen con interpolación por área.
+
+    :param imagen: Array 2D.
+    :param output_size: Tupla (ancho, alto).
+    :return: Imagen redimensionada.
+    """
+    if imagen.shape[1::-1] == tuple(output_size):
+        return imagen
+    return cv2.resize(imagen, tuple(output_size), interpolation=cv2.INTER_AREA)
+
+
+def debe_invertir(ds, invertir=False):
+    """
+    Indica si la imagen debe invertirse: MONOCHROME1 se invierte para mostrarse como MONOCHROME2,
+    y la inversión pedida por el usuario se combina con esa.
+    """
+    return (ds.get('PhotometricInterpretation', 'UNKNOWN') == 'MONOCHROME1') != bool(invertir)
+
+
+def clave_ventana(ds, aplicar_voilut=True):
+    """
+    Resume la transformación VOI del dataset en una tupla hashable para cachear su tabla.
+
+    :param ds: Dataset DICOM.
+    :param aplicar_voilut: Si es False la clave representa la identidad.
+    :return: Tupla con la secuencia VOI LUT, los parámetros de ventana o ('identidad',).
+    """
+    if not aplicar_voilut:
+        return ('identidad',)
+    if ds.get('VOILUTSequence'):
+        item = ds.VOILUTSequence[0]
+        descriptor = tuple(int(v) for v in item.LUTDescriptor)
+        datos = np.asarray(item.LUTData, dtype=np.int64)
+        return ('lut', descriptor, datos.tobytes())
+    parametros = parametros_ventana(ds)
+    if parametros is None:
+        return ('identidad',)
+    return ('ventana', parametros['funcion'], parametros['centro'], parametros['ancho'],
+            parametros['y_min'], parametros['y_max'])
+
+
+@lru_cache(maxsize=16)
+def _tabla_ventana(clave, tipo):
+    """
+    Calcula la ventana VOI para todos los valores posibles de un tipo entero.
+    La tabla se indexa con la vista sin signo de los píxeles.
+
+    :param clave: Resultado de clave_ventana.
+    :param tipo: Nombre del tipo de los píxeles ('uint16', 'int16', ...).
+    :return: Tupla (tabla float32 de solo lectura, True si la tabla es monótona no decreciente).
+    """
+    tipo = np.dtype(tipo)
+    valores = np.arange(2 ** (8 * tipo.itemsize), dtype=_TIPOS_TABLA[tipo]).view(tipo).astype(np.float32)
+
+    if clave[0] == 'lut':
+        # PS3.3 C.11.2.1.1: los valores fuera de la LUT toman la primera o la última entrada
+        (entradas, primer_valor, _), datos = clave[1], np.frombuffer(clave[2], dtype=np.int64)
+        entradas = entradas or 65536
+        indices = np.clip(valores - primer_valor, 0, min(entradas, datos.size) - 1).astype(np.int64)
+        tabla = datos[indices].astype(np.float32)
+    elif clave[0] == 'ventana':
+        _, funcion, centro, ancho, y_min, y_max = clave
+        tabla = aplicar_ventana(valores, {'funcion': funcion, 'centro': centro, 'ancho': ancho,
+                                          'y_min': y_min, 'y_max': y_max})
+    else:
+        tabla = valores
+
+    # Vista en el orden de los valores (no de los índices) para comprobar la monotonía
+    orden = np.argsort(np.arange(tabla.size, dtype=_TIPOS_TABLA[tipo]).view(tipo), kind='stable')
+    monotona = bool(np.all(np.diff(tabla[orden]) >= 0))
+    tabla.setflags(write=False)
+    return tabla, monotona
+
+
+@lru_cache(maxsize=64)
+def _tabla_salida(clave, tipo, minimo, maximo, invertir, flotante):
+    """
+    Compila ventana, inversión y normalización en una tabla final para un rango de píxeles crudos.
+
+    :param clave: Resultado de clave_ventana.
+    :param tipo: Nombre del tipo de los píxeles.
+    :param minimo: Valor crudo mínimo de la imagen.
+    :param maximo: Valor crudo máximo de la imagen.
+    :param invertir: Si es True la tabla invierte la imagen.
+    :param flotante: Si es True la tabla es float32 en [0, 1]; si no, uint8 en [0, 255].
+    :return: Tabla de solo lectura indexada con la vista sin signo de los píxeles.
+    """
+    tabla_ventana, _ = _tabla_ventana(clave, tipo)
+    dtype = np.dtype(tipo)
+    indice_min = int(np.array(minimo, dtype=dtype).view(_TIPOS_TABLA[dtype]))
+    indice_max = int(np.array(maximo, dtype=dtype).view(_TIPOS_TABLA[dtype]))
+    extremos = np.array([tabla_ventana[indice_min], tabla_ventana[indice_max]], dtype=np.float32)
+
+    # La ventana es monótona, así que los extremos de la imagen ventaneada son los de los extremos crudos
+    tabla = tabla_ventana.copy()
+    bajo, alto = float(extremos[0]), float(extremos[1])
+    rango = alto - bajo
+    if rango == 0:
+        tabla.fill(0)
+    else:
+        escala, margen = (1.0, 0.0) if flotante else (255.0, _MARGEN_TRUNCADO)
+        base, factor = (alto, -escala / rango) if invertir else (bajo, escala / rango)
+        tabla -= base - margen / factor
+        tabla *= factor
+        # Los valores que la imagen no contiene pueden quedar fuera de rango; se recortan para el cast
+        np.clip(tabla, 0.0, escala + margen, out=tabla)
+    if not flotante:
+        tabla = tabla.astype(np.uint8)
+    tabla.setflags(write=False)
+    return tabla
+
+
+def procesar_con_tabla(pixeles, ds, aplicar_voilut=True, invertir=False, flotante=False):
+    """
+    Aplica ventana, inversión y normalización con una tabla precompilada y un solo gather.
+    Las tablas se cachean por transformación VOI, tipo de píxel, rango de la imagen e inversión,
+    de modo que una serie de la misma modalidad solo recorre cada imagen una vez.
+
+    :param pixeles: Array de píxeles (pixel_array).
+    :param ds: Dataset DICOM.
+    :param aplicar_voilut: Si es True se aplica la ventana VOI o la secuencia VOI LUT.
+    :param invertir: Si es True la imagen se invierte (ya combinada con MONOCHROME1).
+    :param flotante: Si es True devuelve float32 en [0, 1]; si no, uint8.
+    :return: Array uint8 o float32, o None si los píxeles o la transformación no admiten tabla.
+    """
+    if pixeles.dtype not in _TIPOS_TABLA or pixeles.ndim != 2:
+        return None
+    clave = clave_ventana(ds, aplicar_voilut)
+    tipo = pixeles.dtype.name
+    if not _tabla_ventana(clave, tipo)[1]:
+        # Con una LUT no monótona los extremos de la imagen no se deducen de los extremos crudos
+        return None
+    minimo, maximo = minimo_maximo(pixeles)
+    tabla = _tabla_salida(clave, tipo, minimo, maximo, bool(invertir), flotante)
+    return np.take(tabla, pixeles.view(_TIPOS_TABLA[pixeles.dtype]))
+
+
+def a_uint16(arr):
+    """
+    Convierte un array float32 en [0, 1] a uint16 [0, 65535] redondeando, para salidas de 16 bits
+    que conservan el rango dinámico de la imagen ventaneada.
+
+    :param arr: Array float32 en [0, 1]; se usa como búfer de trabajo.
+    :return: Array uint16.
+    """
+    arr *= 65535.0
+    arr += 0.5
+    return arr.astype(np.uint16)
+
+
+def procesar_dicom(ds, aplicar_voilut=True, invertir=False, output_size=None, flotante=False, reducida=False,
+                   bits=8):
+    """
+    Convierte los píxeles de un dataset DICOM en una imagen lista para mostrar o clasificar.
+
+    :param ds: Dataset DICOM.
+    :param aplicar_voilut: Si es True se aplica la ventana VOI o la secuencia VOI LUT.
+    :param invertir: Inversión adicional pedida por el usuario (se combina con MONOCHROME1).
+    :param output_size: Tupla (ancho, alto) para redimensionar la salida entera. None para no redimensionar.
+    :param flotante: Si es True devuelve float32 en [0, 1] sin redimensionar, en lugar de uint8.
+    :param reducida: Si es True y hay output_size, decodifica a la menor resolución que lo cubre.
+    :param bits: 8 para uint8 o 16 para uint16 (se normaliza y redimensiona en float32 antes de convertir).
+    :return: Array uint8, uint16 o float32.
+    """
+    if bits not in (8, 16):
+        raise ValueError(f"Profundidad de salida no soportada: {bits} bits. Opciones: 8, 16")
+    pixeles = decodificar_reducido(ds, output_size) if reducida and not flotante else pixeles_dicom(ds)
+    invertir = debe_invertir(ds, invertir)
+    en_flotante = flotante or bits == 16
+    imagen = procesar_con_tabla(pixeles, ds, aplicar_voilut, invertir, en_flotante)
+    if imagen is None:
+        arr = ventanear(pixeles, ds, aplicar_voilut)
+        imagen = normalizar(arr, invertir) if en_flotante else a_uint8(arr, invertir)
+    if flotante:
+        return imagen
+    if output_size is not None:
+        imagen = redimensionar(imagen, output_size)
+    if bits == 16:
+        imagen = a_uint16(imagen)
+    return imagen
@@ -0,0 +1,94 @@
+# src/procesamiento/planificador.py
+# Planificador de trabajos de conversión con backend de hilos o de procesos.
+# Mantiene una ventana acotada de trabajos en vuelo, envía primero los más grandes para acortar la cola final
+# y entrega cada resultado en cuanto termina, sin esperar a los enviados antes.
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('procesos', 'hilos')
+
+
+def workers_por_defecto():
+    """
+    Cantidad de workers según los núcleos disponibles para el proceso.
+
+    :return: Número de núcleos utilizables (al menos 1).
+    """
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # sched_getaffinity no existe en macOS ni Windows
+        return max(1, os.cpu_count() or 1)
+
+
+def _iniciar_proceso():
+    """
+    Inicializador de cada proceso worker: OpenCV usa un solo hilo, porque el paralelismo ya lo dan los procesos
+    y N procesos con su propio pool de hilos sobresuscriben los núcleos.
+    """
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def crear_executor(backend, max_workers):
+    """
+    Crea el executor del backend indicado.
+    Los procesos se crean con 'spawn': hacer fork del servidor de Streamlit, con sus hilos de tornado,
+    de precalentamiento de modelos y de torch/OpenMP, puede dejar a los workers bloqueados.
+
+    :param backend: 'procesos' o 'hilos'.
+    :param max_workers: Cantidad de workers.
+    :return: ProcessPoolExecutor o ThreadPoolExecutor.
+    """
+    if backend == 'procesos':
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_iniciar_proceso)
+    if backend == 'hilos':
+        return ThreadPoolExecutor(max_workers=max_workers)
+    raise ValueError(f"Backend no soportado: '{backend}'. Opciones: {', '.join(BACKENDS)}")
+
+
+def ejecutar(funcion, tareas, backend='procesos', max_workers=None, ventana=None, tamano=None):
+    """
+    Ejecuta funcion(*argumentos) para cada tarea y entrega los resultados a medida que terminan.
+    Con el backend de procesos la función y sus argumentos deben poder serializarse con pickle.
+
+    :param funcion: Función a ejecutar (a nivel de módulo si el backend es de procesos).
+    :param tareas: Iterable de pares (identificador, argumentos); argumentos es una tupla.
+    :param backend: 'procesos' o 'hilos'.
+    :param max_workers: Cantidad de workers. None para usar workers_por_defecto().
+    :param ventana: Máximo de trabajos en vuelo. None para el doble de workers.
+    :param tamano: Función opcional tamano(identificador) para enviar primero las tareas más grandes.
+    :return: Generador de tuplas (identificador, resultado, excepción o None).
+    """
+    max_workers = max_workers or workers_por_defecto()
+    ventana = max(ventana or 2 * max_workers, 1)
+    tareas = list(tareas)
+    if tamano is not None:
+        tareas.sort(key=lambda tarea: tamano(tarea[0]), reverse=True)
+    if not tareas:
+        return
+
+    pendientes = iter(tareas)
+    with crear_executor(backend, max_workers) as executor:
+        en_vuelo = {}
+
+        def enviar():
+            # Completa la ventana con las siguientes tareas
+            for identificador, argumentos in pendientes:
+                en_vuelo[executor.submit(funcion, *argumentos)] = identificador
+                if len(en_vuelo) >= ventana:
+                    break
+
+        enviar()
+        while en_vuelo:
+            terminados, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for future in terminados:
+                identificador = en_vuelo.pop(future)
+                excepcion = future.exception()
+                yield identificador, None if excepcion else future.result(), excepcion
+            enviar()
@@ -1,25 +1,311 @@
 # src/procesamiento/procesar.py
 
 import numpy as np
-from src.procesamiento.lectura_dicom import leer_imagen_dicom
+import cv2
+from src.procesamiento.lectura_dicom import leer_imagen_dicom, obtener_metadatos_relevantes
 from src.procesamiento.transformaciones import aplicar_transformaciones
+from src.procesamiento.motor_dicom import procesar_dicom
+from src.procesamiento.visor import CopiaTrabajo
+from src.procesamiento.cache_imagenes import CacheImagenes, digest_bytes, digest_archivo
+from src.config.settings import CACHE_IMAGENES_MAX_BYTES, CACHE_IMAGENES_DIR, CACHE_IMAGENES_DISCO_MAX_BYTES
+from src.config.settings import (MINIATURA_ANCHO, MINIATURA_CALIDAD_JPG, CACHE_MINIATURAS_MAX_BYTES,
+                                 CACHE_MINIATURAS_DIR, CACHE_MINIATURAS_DISCO_MAX_BYTES)
+from src.config.settings import (CACHE_COPIAS_TRABAJO_MAX_BYTES, CACHE_COPIAS_TRABAJO_DIR,
+                                 CACHE_COPIAS_TRABAJO_DISCO_MAX_BYTES)
 import logging
-import streamlit as st
+import threading
 import io
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Caché de imágenes procesadas del proceso; se usa también desde los hilos del grid, fuera del contexto de Streamlit
+_cache_imagenes = None
+_cache_miniaturas = None
+_cache_copias_trabajo = None
+_lock_cache_imagenes = threading.Lock()
 
-@st.cache_data(show_spinner=False, ttl=3600)
-def procesar_imagen_dicom_cached(dicom_file_bytes, opciones):
+# Precarga en segundo plano de páginas siguientes: un executor del proceso y las claves ya en curso
+_executor_precarga = ThreadPoolExecutor(max_workers=2, thread_name_prefix='precarga')
+_precargas_en_curso = set()
+_lock_precarga = threading.Lock()
+
+
+def obtener_cache_imagenes():
+    """
+    Devuelve la caché de imágenes procesadas del proceso.
+
+    :return: Instancia única de CacheImagenes.
+    """
+    global _cache_imagenes
+    with _lock_cache_imagenes:
+        if _cache_imagenes is None:
+            _cache_imagenes = CacheImagenes(CACHE_IMAGENES_MAX_BYTES, CACHE_IMAGENES_DIR, CACHE_IMAGENES_DISCO_MAX_BYTES)
+        return _cache_imagenes
+
+
+def obtener_cache_miniaturas():
+    """
+    Devuelve la caché de miniaturas codificadas del proceso.
+
+    :return: Instancia única de CacheImagenes que guarda los bytes JPEG como arrays uint8.
+    """
+    global _cache_miniaturas
+    with _lock_cache_imagenes:
+        if _cache_miniaturas is None:
+            _cache_miniaturas = CacheImagenes(CACHE_MINIATURAS_MAX_BYTES, CACHE_MINIATURAS_DIR,
+                                              CACHE_MINIATURAS_DISCO_MAX_BYTES)
+        return _cache_miniaturas
+
+
+def obtener_cache_copias_trabajo():
+    """
+    Devuelve la caché de copias de trabajo de 16 bits del visor de ventana/nivel.
+
+    :return: Instancia única de CacheImagenes.
+    """
+    global _cache_copias_trabajo
+    with _lock_cache_imagenes:
+        if _cache_copias_trabajo is None:
+            _cache_copias_trabajo = CacheImagenes(CACHE_COPIAS_TRABAJO_MAX_BYTES, CACHE_COPIAS_TRABAJO_DIR,
+                                                  CACHE_COPIAS_TRABAJO_DISCO_MAX_BYTES)
+        return _cache_copias_trabajo
+
+
+def _copia_trabajo_cacheada(digest, leer_dataset):
+    """
+    Devuelve la copia de trabajo desde su caché o decodifica el DICOM una vez para crearla.
+    La resolución completa y el nivel de pantalla se guardan como dos entradas; la primera lleva los metadatos.
+
+    :param digest: Digest del archivo DICOM.
+    :param leer_dataset: Función sin argumentos que devuelve el Dataset (o None si no se puede leer).
+    :return: Instancia de CopiaTrabajo, o None si falla la lectura o la decodificación.
+    """
+    cache = obtener_cache_copias_trabajo()
+    # La copia de trabajo no depende de las opciones de procesamiento
+    clave_completa = cache.clave(f"{digest}|trabajo", {})
+    clave_pantalla = cache.clave(f"{digest}|pantalla", {})
+    completa = cache.obtener(clave_completa)
+    pantalla = cache.obtener(clave_pantalla) if completa is not None else None
+    if pantalla is not None:
+        return CopiaTrabajo(completa[0], pantalla[0], completa[1])
+
+    try:
+        ds = leer_dataset()
+        if ds is None:
+            logger.warning("Dataset DICOM no pudo ser leído.")
+            return None
+        copia = CopiaTrabajo.desde_dataset(ds)
+    except Exception as e:
+        logger.error(f"Error al crear la copia de trabajo del archivo DICOM: {e}")
+        return None
+    cache.guardar(clave_completa, copia.completa, copia.metadatos)
+    cache.guardar(clave_pantalla, copia.pantalla, {})
+    return copia
+
+
+def copia_trabajo_dicom_cached(dicom_file_bytes, digest=None):
+    """
+    Copia de trabajo de 16 bits de un DICOM cargado por el usuario, para el visor de ventana/nivel.
+
+    :param dicom_file_bytes: Bytes del archivo DICOM.
+    :param digest: Digest del archivo si el llamador ya lo conoce; si es None se calcula de los bytes.
+    :return: Instancia de CopiaTrabajo, o None si falla.
+    """
+    return _copia_trabajo_cacheada(digest or digest_bytes(dicom_file_bytes),
+                                   lambda: leer_imagen_dicom(io.BytesIO(dicom_file_bytes)))
+
+
+def copia_trabajo_dicom_ruta(ruta):
+    """
+    Copia de trabajo de 16 bits de un DICOM del servidor; un acierto en la caché no lee el archivo.
+
+    :param ruta: Ruta al archivo DICOM.
+    :return: Instancia de CopiaTrabajo, o None si falla.
+    """
+    def leer_dataset():
+        with open(ruta, 'rb') as f:
+            return leer_imagen_dicom(io.BytesIO(f.read()))
+
+    return _copia_trabajo_cacheada(digest_archivo(ruta), leer_dataset)
+
+
+def crear_miniatura(imagen, ancho=MINIATURA_ANCHO):
+    """
+    Reduce una imagen al ancho de visualización con interpolación por área y la codifica en JPEG.
+
+    :param imagen: Array uint8 2D.
+    :param ancho: Ancho máximo en píxeles; las imágenes más angostas no se agrandan.
+    :return: Bytes JPEG.
+    """
+    alto_original, ancho_original = imagen.shape[:2]
+    if ancho_original > ancho:
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        imagen = cv2.resize(imagen, (ancho, alto), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', imagen, [cv2.IMWRITE_JPEG_QUALITY, MINIATURA_CALIDAD_JPG])
+    if not ok:
+        raise ValueError("OpenCV no pudo codificar la miniatura")
+    return buffer.tobytes()
+
+
+def _miniatura_cacheada(digest, opciones, ancho, obtener_imagen):
+    """
+    Devuelve la miniatura desde su caché o la crea a partir de la imagen procesada.
+
+    :param digest: Digest del archivo DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :param ancho: Ancho de la miniatura.
+    :param obtener_imagen: Función sin argumentos que devuelve (imagen, metadatos) a resolución completa.
+    :return: Bytes JPEG de la miniatura (o None si falla el procesamiento) y metadatos.
+    """
+    cache = obtener_cache_miniaturas()
+    clave = cache.clave(f"{digest}|miniatura{ancho}", opciones)
+    entrada = cache.obtener(clave)
+    if entrada is not None:
+        return entrada[0].tobytes(), entrada[1]
+
+    imagen, metadatos = obtener_imagen()
+    if imagen is None:
+        return None, metadatos
+    miniatura = crear_miniatura(imagen, ancho)
+    cache.guardar(clave, np.frombuffer(miniatura, dtype=np.uint8), metadatos)
+    return miniatura, metadatos
+
+
+def _imagen_para_miniatura(digest, opciones, leer_bytes):
     """
-    Procesa una imagen DICOM según las opciones seleccionadas y devuelve la imagen y el dataset.
-    Esta función está cacheada para evitar reprocesar imágenes ya procesadas.
+    Imagen a resolución completa de la que se saca una miniatura. Se reutiliza si ya está en la caché de imágenes,
+    pero no se guarda en ella: una página de miniaturas llenaría la caché (y su volcado a disco) con imágenes
+    que quizá nunca se abran. La vista completa la procesa y la cachea al abrirla.
+
+    :param digest: Digest del archivo DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :param leer_bytes: Función sin argumentos que devuelve los bytes del archivo DICOM.
+    :return: Imagen procesada y diccionario de metadatos relevantes, o (None, None) si falla.
+    """
+    cache = obtener_cache_imagenes()
+    entrada = cache.obtener(cache.clave(digest, opciones))
+    if entrada is not None:
+        return entrada
+    return _procesar_imagen_dicom(leer_bytes(), opciones)
+
+
+def miniatura_imagen_dicom_cached(dicom_file_bytes, opciones, ancho=MINIATURA_ANCHO, digest=None):
+    """
+    Miniatura JPEG de un DICOM cargado por el usuario, para la cuadrícula de visualización.
 
     :param dicom_file_bytes: Bytes del archivo DICOM.
     :param opciones: Diccionario de opciones de procesamiento.
-    :return: Imagen procesada y dataset.
+    :param ancho: Ancho de la miniatura.
+    :param digest: Digest del archivo si el llamador ya lo conoce; si es None se calcula de los bytes.
+    :return: Bytes JPEG (o None si falla) y diccionario de metadatos relevantes.
+    """
+    digest = digest or digest_bytes(dicom_file_bytes)
+    return _miniatura_cacheada(digest, opciones, ancho,
+                               lambda: _imagen_para_miniatura(digest, opciones, lambda: dicom_file_bytes))
+
+
+def miniatura_imagen_dicom_ruta(ruta, opciones, ancho=MINIATURA_ANCHO):
+    """
+    Miniatura JPEG de un DICOM del servidor; un acierto en la caché no lee ni decodifica el archivo.
+
+    :param ruta: Ruta al archivo DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :param ancho: Ancho de la miniatura.
+    :return: Bytes JPEG (o None si falla) y diccionario de metadatos relevantes.
+    """
+    def leer_bytes():
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    digest = digest_archivo(ruta)
+    return _miniatura_cacheada(digest, opciones, ancho, lambda: _imagen_para_miniatura(digest, opciones, leer_bytes))
+
+
+def _metadatos_reducidos(ds):
+    """
+    Metadatos relevantes del dataset como tipos simples, para guardarlos en la caché sin el Dataset.
+    """
+    return {clave: valor if isinstance(valor, (int, float)) else str(valor)
+            for clave, valor in obtener_metadatos_relevantes(ds).items()}
+
+
+def procesar_imagen_dicom_cached(dicom_file_bytes, opciones, digest=None):
+    """
+    Procesa una imagen DICOM según las opciones seleccionadas y devuelve la imagen y sus metadatos.
+    El resultado se guarda en la caché de imágenes, con clave por contenido del archivo y opciones.
+
+    :param dicom_file_bytes: Bytes del archivo DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :param digest: Digest del archivo si el llamador ya lo conoce; si es None se calcula de los bytes.
+    :return: Imagen procesada (uint8, solo lectura) y diccionario de metadatos relevantes.
+    """
+    cache = obtener_cache_imagenes()
+    clave = cache.clave(digest or digest_bytes(dicom_file_bytes), opciones)
+    entrada = cache.obtener(clave)
+    if entrada is not None:
+        return entrada
+
+    imagen, metadatos = _procesar_imagen_dicom(dicom_file_bytes, opciones)
+    if imagen is not None:
+        cache.guardar(clave, imagen, metadatos)
+    return imagen, metadatos
+
+
+def procesar_imagen_dicom_ruta(ruta, opciones):
+    """
+    Procesa un DICOM del servidor usando la caché de imágenes.
+    La clave se calcula con la ruta, el tamaño y la fecha de modificación, así que un acierto no lee el archivo.
+
+    :param ruta: Ruta al archivo DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :return: Imagen procesada y diccionario de metadatos relevantes.
+    """
+    cache = obtener_cache_imagenes()
+    digest = digest_archivo(ruta)
+    entrada = cache.obtener(cache.clave(digest, opciones))
+    if entrada is not None:
+        return entrada
+    with open(ruta, 'rb') as f:
+        return procesar_imagen_dicom_cached(f.read(), opciones, digest=digest)
+
+
+def precargar_imagenes(rutas, opciones):
+    """
+    Prepara en segundo plano las miniaturas que aún no están en la caché (p. ej. la página siguiente).
+    Las rutas que ya se están precargando no se vuelven a encolar.
+
+    :param rutas: Rutas de los archivos DICOM.
+    :param opciones: Diccionario de opciones de procesamiento.
+    """
+    opciones = dict(opciones)
+
+    def precargar(ruta, clave):
+        try:
+            miniatura_imagen_dicom_ruta(ruta, opciones)
+        except Exception as e:
+            logger.warning(f"Error al precargar {ruta}: {e}")
+        finally:
+            with _lock_precarga:
+                _precargas_en_curso.discard(clave)
+
+    for ruta in rutas:
+        try:
+            clave = CacheImagenes.clave(digest_archivo(ruta), opciones)
+        except OSError:
+            continue
+        with _lock_precarga:
+            if clave in _precargas_en_curso:
+                continue
+            _precargas_en_curso.add(clave)
+        _executor_precarga.submit(precargar, ruta, clave)
+
+
+def _procesar_imagen_dicom(dicom_file_bytes, opciones):
+    """
+    Lee y procesa el DICOM sin pasar por la caché.
+
+    :return: Imagen uint8 y metadatos reducidos, o (None, None) si falla.
     """
     try:
         # Leer el dataset DICOM
@@ -30,29 +316,18 @@ def procesar_imagen_dicom_cached(dicom_file_bytes, opciones):
             logger.warning("Dataset DICOM no pudo ser leído.")
             return None, None
 
-        # Obtener los datos de píxeles
-        data = ds.pixel_array
+        # VOI LUT, inversión (MONOCHROME1 y la elegida por el usuario) y normalización a [0, 1] en float32
+        data = procesar_dicom(
+            ds,
+            aplicar_voilut=opciones.get("aplicar_voilut", True),
+            invertir=opciones.get('invertir_interpretacion', False),
+            flotante=True
+        )
 
-        # Aplicar VOI LUT si está seleccionado
-        if opciones.get("aplicar_voilut", True):
-            from pydicom.pixel_data_handlers.util import apply_voi_lut
-            data = apply_voi_lut(data, ds)
-
-        # Si la interpretación es MONOCHROME1, invertimos la imagen y cambiamos a MONOCHROME2
+        # Tras invertir MONOCHROME1 la imagen queda como MONOCHROME2
         if ds.PhotometricInterpretation == 'MONOCHROME1':
-            data = np.amax(data) - data
             ds.PhotometricInterpretation = 'MONOCHROME2'
-
-        # Invertir interpretación si el usuario lo seleccionó
-        if opciones.get('invertir_interpretacion', False):
-            data = np.amax(data) - data
-
-        # Normalizar la imagen
-        data = data - np.min(data)
-        if np.max(data) != 0:
-            data = data / np.max(data)
-        else:
-            data = np.zeros(data.shape)
+        metadatos = _metadatos_reducidos(ds)
 
         # Aplicar transformaciones si está seleccionado
         if opciones.get("aplicar_transformaciones", False):
@@ -60,9 +335,10 @@ def procesar_imagen_dicom_cached(dicom_file_bytes, opciones):
             data = aplicar_transformaciones(data, transformaciones_seleccionadas)
 
         # Convertir a uint8
-        image = (data * 255).astype(np.uint8)
+        data *= 255
+        image = data.astype(np.uint8)
 
-        return image, ds
+        return image, metadatos
 
     except Exception as e:
         logger.error(f"Error al procesar el archivo DICOM: {e}")
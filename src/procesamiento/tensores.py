@@ -0,0 +1,85 @@
+# src/procesamiento/tensores.py
+# Preprocesamiento directo de arrays NumPy a tensores de torch para la inferencia
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+def tamano_procesador(image_processor):
+    """
+    Obtiene el tamaño de entrada (alto, ancho) que espera el procesador de imágenes del modelo.
+
+    :param image_processor: Procesador de imágenes de transformers (AutoImageProcessor).
+    :return: Tupla (alto, ancho).
+    """
+    size = image_processor.size
+    if 'height' in size and 'width' in size:
+        return size['height'], size['width']
+    return size['shortest_edge'], size['shortest_edge']
+
+
+def redimensionar_normalizado(array, size=(224, 224), invertir=False):
+    """
+    Redimensiona un array 2D (ya ventaneado) y lo normaliza al rango [0, 1] con una sola interpolación.
+    La normalización min-max usa los extremos de la imagen completa, igual que el camino con PIL.
+
+    :param array: Array NumPy 2D con la imagen ventaneada (entero o flotante).
+    :param size: Tupla (alto, ancho) de salida.
+    :param invertir: Si es True invierte la imagen (MONOCHROME1) durante la normalización.
+    :return: Tensor float32 de forma (1, 1, alto, ancho) en el rango [0, 1].
+    """
+    tensor = torch.from_numpy(np.ascontiguousarray(array))
+    if tensor.dtype != torch.float32:
+        tensor = tensor.to(torch.float32)
+    minimo, maximo = tensor.aminmax()
+
+    # Redimensionar una sola vez sobre el canal único; la normalización es afín y conmuta con la interpolación
+    tensor = F.interpolate(tensor[None, None], size=tuple(size), mode='bilinear', antialias=True,
+                           align_corners=False)
+
+    rango = (maximo - minimo).item()
+    if rango == 0:
+        return torch.zeros_like(tensor)
+    if invertir:
+        tensor = tensor.sub_(maximo).mul_(-1.0 / rango)
+    else:
+        tensor = tensor.sub_(minimo).mul_(1.0 / rango)
+    return tensor.clamp_(0.0, 1.0)
+
+
+def normalizar_para_modelo(tensor, image_processor):
+    """
+    Convierte un tensor de un canal en [0, 1] a los pixel_values que espera el modelo.
+    Replica el reescalado y la normalización del procesador de imágenes sin pasar por PIL.
+
+    :param tensor: Tensor float32 de forma (N, 1, alto, ancho) en el rango [0, 1].
+    :param image_processor: Procesador de imágenes de transformers (AutoImageProcessor).
+    :return: Tensor float32 de forma (N, 3, alto, ancho).
+    """
+    alto, ancho = tamano_procesador(image_processor)
+    if tensor.shape[-2:] != (alto, ancho):
+        tensor = F.interpolate(tensor, size=(alto, ancho), mode='bilinear', antialias=True, align_corners=False)
+
+    # El camino con PIL trabaja en uint8 [0, 255] antes del reescalado del procesador
+    escala = 255.0
+    if getattr(image_processor, 'do_rescale', True):
+        escala *= image_processor.rescale_factor
+
+    # La triplicación RGB se resuelve con broadcasting en la única asignación de salida
+    tensor = tensor.expand(-1, 3, -1, -1)
+    if getattr(image_processor, 'do_normalize', True):
+        media = torch.tensor(image_processor.image_mean, dtype=torch.float32).view(1, 3, 1, 1)
+        desviacion = torch.tensor(image_processor.image_std, dtype=torch.float32).view(1, 3, 1, 1)
+        return (tensor * escala - media) / desviacion
+    return tensor * escala
+
+
+def tensor_a_imagen(tensor):
+    """
+    Convierte un tensor de un canal en [0, 1] a una imagen uint8 para mostrarla.
+
+    :param tensor: Tensor float32 de forma (1, 1, alto, ancho) en el rango [0, 1].
+    :return: Array NumPy uint8 de forma (alto, ancho).
+    """
+    return (tensor[0, 0] * 255).round_().to(torch.uint8).numpy()
@@ -1,6 +1,5 @@
 # src/procesamiento/transformaciones.py
 
-import albumentations as A
 import numpy as np
 
 def construir_pipeline_transformaciones(opciones):
@@ -10,6 +9,9 @@ def construir_pipeline_transformaciones(opciones):
     :param opciones: Diccionario de opciones de transformación.
     :return: Pipeline de transformaciones de Albumentations.
     """
+    # Albumentations importa torch; se carga solo cuando se aplican transformaciones
+    import albumentations as A
+
     transformaciones = []
 
     # Rotación Aleatoria eliminada
@@ -0,0 +1,182 @@
+# src/procesamiento/visor.py
+# Visor interactivo de ventana/nivel. Cada DICOM se decodifica una sola vez a una copia de trabajo uint16
+# (más un nivel reducido al tamaño de pantalla); centro, ancho e inversión se aplican después como una tabla
+# de 65536 entradas sobre esa copia, sin volver a leer ni decodificar el archivo.
+
+import logging
+from functools import lru_cache
+import cv2
+import numpy as np
+from src.procesamiento.motor_dicom import aplicar_ventana, debe_invertir
+from src.procesamiento.cache_pixeles import pixeles_dicom
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor del nivel de pantalla de la pirámide
+LADO_PANTALLA = 1024
+
+_NIVELES_16_BITS = 65535
+
+
+def crear_copia_trabajo(pixeles, ds):
+    """
+    Convierte los píxeles a una copia de trabajo uint16 y calcula la recta que la lleva a unidades de modalidad.
+    Los datos de hasta 16 bits se guardan sin pérdida; otros tipos se reescalan a 16 bits.
+
+    :param pixeles: Array de píxeles 2D (pixel_array).
+    :param ds: Dataset DICOM (para Rescale Slope/Intercept).
+    :return: Tupla (array uint16, pendiente, intercepto) tal que modalidad = valor * pendiente + intercepto.
+    """
+    pendiente = float(ds.get('RescaleSlope', 1) or 1)
+    intercepto = float(ds.get('RescaleIntercept', 0) or 0)
+
+    if pixeles.dtype in (np.uint8, np.uint16):
+        return pixeles.astype(np.uint16), pendiente, intercepto
+    if pixeles.dtype in (np.int8, np.int16):
+        # Desplaza el rango con signo a [0, 65535] (o [0, 255] para int8) conservando todos los valores
+        desplazamiento = 128 if pixeles.dtype == np.int8 else 32768
+        copia = pixeles.astype(np.int32)
+        copia += desplazamiento
+        return copia.astype(np.uint16), pendiente, intercepto - desplazamiento * pendiente
+
+    minimo, maximo = float(pixeles.min()), float(pixeles.max())
+    escala = (maximo - minimo) / _NIVELES_16_BITS if maximo > minimo else 1.0
+    copia = (pixeles.astype(np.float32) - minimo) / escala
+    copia += 0.5
+    return copia.astype(np.uint16), pendiente * escala, intercepto + minimo * pendiente
+
+
+def nivel_pantalla(copia, lado=LADO_PANTALLA):
+    """
+    Reduce la copia de trabajo para que su lado mayor no supere 'lado', con interpolación por área.
+
+    :param copia: Array uint16 2D.
+    :param lado: Lado mayor del nivel de pantalla.
+    :return: Array uint16 reducido (o la misma copia si ya es pequeña).
+    """
+    alto, ancho = copia.shape
+    factor = lado / max(alto, ancho)
+    if factor >= 1:
+        return copia
+    return cv2.resize(copia, (max(1, round(ancho * factor)), max(1, round(alto * factor))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def presets_ventana(ds, minimo, maximo):
+    """
+    Ventanas predefinidas del dataset (WindowCenter/WindowWidth y sus explicaciones) más el rango completo.
+
+    :param ds: Dataset DICOM.
+    :param minimo: Valor mínimo de la imagen en unidades de modalidad.
+    :param maximo: Valor máximo de la imagen en unidades de modalidad.
+    :return: Diccionario nombre -> (centro, ancho, función VOI).
+    """
+    presets = {}
+    funcion = str(ds.get('VOILUTFunction', 'LINEAR')).upper()
+    if funcion not in ('LINEAR', 'LINEAR_EXACT', 'SIGMOID'):
+        funcion = 'LINEAR'
+    if 'WindowCenter' in ds and 'WindowWidth' in ds:
+        centros = ds['WindowCenter'].value
+        anchos = ds['WindowWidth'].value
+        centros = list(centros) if ds['WindowCenter'].VM > 1 else [centros]
+        anchos = list(anchos) if ds['WindowWidth'].VM > 1 else [anchos]
+        explicaciones = ds.get('WindowCenterWidthExplanation', None)
+        if explicaciones is not None and ds['WindowCenterWidthExplanation'].VM <= 1:
+            explicaciones = [explicaciones]
+        for i, (centro, ancho) in enumerate(zip(centros, anchos)):
+            nombre = str(explicaciones[i]) if explicaciones is not None and i < len(explicaciones) else f"Ventana {i + 1}"
+            presets[nombre] = (float(centro), max(float(ancho), 1.0), funcion)
+    presets["Rango completo"] = ((minimo + maximo) / 2, max(maximo - minimo, 1.0), 'LINEAR')
+    return presets
+
+
+class CopiaTrabajo:
+    """
+    Copia de trabajo de un DICOM para el visor: array uint16 a resolución completa, nivel de pantalla,
+    recta a unidades de modalidad, rango de valores, presets de ventana e inversión por MONOCHROME1.
+    """
+
+    def __init__(self, completa, pantalla, metadatos):
+        """
+        :param completa: Array uint16 a resolución completa.
+        :param pantalla: Array uint16 del nivel de pantalla.
+        :param metadatos: Diccionario con 'pendiente', 'intercepto', 'minimo', 'maximo', 'presets'
+                          e 'invertir_por_defecto' (ver desde_dataset).
+        """
+        self.completa = completa
+        self.pantalla = pantalla
+        self.metadatos = metadatos
+        self.pendiente = metadatos['pendiente']
+        self.intercepto = metadatos['intercepto']
+        self.minimo = metadatos['minimo']
+        self.maximo = metadatos['maximo']
+        self.presets = {nombre: tuple(valores) for nombre, valores in metadatos['presets'].items()}
+        self.invertir_por_defecto = metadatos['invertir_por_defecto']
+
+    @classmethod
+    def desde_dataset(cls, ds, pixeles=None):
+        """
+        Decodifica el dataset una vez y arma la copia de trabajo.
+
+        :param ds: Dataset DICOM.
+        :param pixeles: Píxeles ya decodificados; si es None se obtienen con pixeles_dicom.
+        :return: Instancia de CopiaTrabajo.
+        """
+        pixeles = pixeles_dicom(ds) if pixeles is None else pixeles
+        if pixeles.ndim != 2:
+            raise ValueError(f"El visor solo admite imágenes 2D en escala de grises, no de forma {pixeles.shape}")
+        completa, pendiente, intercepto = crear_copia_trabajo(pixeles, ds)
+        minimo, maximo = cv2.minMaxLoc(completa)[:2]
+        minimo, maximo = sorted((minimo * pendiente + intercepto, maximo * pendiente + intercepto))
+        metadatos = {
+            'pendiente': pendiente,
+            'intercepto': intercepto,
+            'minimo': minimo,
+            'maximo': maximo,
+            'presets': {nombre: list(valores) for nombre, valores in presets_ventana(ds, minimo, maximo).items()},
+            'invertir_por_defecto': debe_invertir(ds),
+        }
+        return cls(completa, nivel_pantalla(completa), metadatos)
+
+    def renderizar(self, centro, ancho, invertir=False, funcion='LINEAR', completa=False):
+        """
+        Aplica la ventana a la copia de trabajo con una tabla precalculada.
+
+        :param centro: Centro de la ventana en unidades de modalidad.
+        :param ancho: Ancho de la ventana en unidades de modalidad (al menos 1).
+        :param invertir: Si es True la imagen se muestra invertida.
+        :param funcion: Función VOI ('LINEAR', 'LINEAR_EXACT' o 'SIGMOID').
+        :param completa: Si es True se usa la resolución completa en lugar del nivel de pantalla.
+        :return: Array uint8.
+        """
+        tabla = tabla_ventana(round(float(centro), 4), round(max(float(ancho), 1.0), 4), bool(invertir), funcion,
+                              self.pendiente, self.intercepto)
+        return np.take(tabla, self.completa if completa else self.pantalla)
+
+
+@lru_cache(maxsize=64)
+def tabla_ventana(centro, ancho, invertir, funcion, pendiente, intercepto):
+    """
+    Tabla uint8 de 65536 entradas: valor de la copia de trabajo -> píxel mostrado.
+
+    :param centro: Centro de la ventana en unidades de modalidad.
+    :param ancho: Ancho de la ventana en unidades de modalidad.
+    :param invertir: Si es True la tabla invierte la salida.
+    :param funcion: Función VOI.
+    :param pendiente: Pendiente de la copia de trabajo a unidades de modalidad.
+    :param intercepto: Intercepto de la copia de trabajo a unidades de modalidad.
+    :return: Array uint8 de solo lectura.
+    """
+    valores = np.arange(_NIVELES_16_BITS + 1, dtype=np.float32)
+    valores *= pendiente
+    valores += intercepto
+    # Mismo ajuste de PS3.3 C.11.2.1.2 que parametros_ventana para la función LINEAR
+    if funcion == 'LINEAR':
+        centro, ancho = centro - 0.5, max(ancho - 1, 0.0)
+    aplicar_ventana(valores, {'funcion': funcion, 'centro': centro, 'ancho': ancho, 'y_min': 0.0, 'y_max': 255.0})
+    if invertir:
+        np.subtract(255.0, valores, out=valores)
+    valores += 0.5
+    tabla = valores.astype(np.uint8)
+    tabla.setflags(write=False)
+    return tabla
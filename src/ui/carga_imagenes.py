@@ -14,7 +14,7 @@ def cargar_imagenes(opciones, max_imagenes=100):
 
     tipo_carga = opciones.get('tipo_carga')
 
-    if tipo_carga == "Procesamiento de DICOM":
+    if tipo_carga in ("Procesamiento de DICOM", "Cargar Imágenes"):
         uploaded_files = opciones.get('uploaded_files')
         if uploaded_files:
             st.success(f"Se han cargado {len(uploaded_files)} archivos.")
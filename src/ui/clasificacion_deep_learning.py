@@ -1,131 +1,206 @@
 # src/ui/clasificacion_deep_learning.py
 
 import streamlit as st
-from PIL import Image
 import pydicom
-from pydicom.pixel_data_handlers.util import apply_voi_lut
-import numpy as np
 import os
-from transformers import pipeline, AutoImageProcessor, AutoConfig, AutoModelForImageClassification
 import torch
-from safetensors.torch import load_file  # Asegúrate de tener safetensors instalado
 import logging
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.procesamiento.motor_dicom import ventanear
+from src.procesamiento.cache_pixeles import pixeles_dicom
+from src.procesamiento.tensores import redimensionar_normalizado, normalizar_para_modelo
+from src.procesamiento.lectura_imagenes import (
+    leer_dicom_modelo,
+    leer_imagen_modelo,
+    EXTENSIONES_DICOM,
+    EXTENSIONES_IMAGEN
+)
+from src.inferencia.reduccion_tokens import forward_reducido
+from src.inferencia import cascada
+from src.inferencia.cascada import huella_clasificador
+from src.inferencia.registro import RegistroModelos
+from src.inferencia.cache_resultados import CacheResultados, digest_imagen
+from src.config.settings import CACHE_RESULTADOS_MAX_ENTRADAS, CACHE_RESULTADOS_EN_DISCO, CACHE_RESULTADOS_SQLITE
 
 # Configuración del logger
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 
-def cargar_modelo_primary(model_path):
+@st.cache_resource
+def obtener_registro_modelos():
     """
-    Carga el modelo primario de clasificación de imágenes desde la ruta especificada.
-    Este modelo clasifica la imagen en 'masas', 'calcificaciones' o 'no_encontrado'.
+    Devuelve el registro de modelos del proceso, compartido entre re-ejecuciones y sesiones.
 
-    :param model_path: Ruta al directorio del modelo primario.
+    :return: Instancia única de RegistroModelos.
+    """
+    return RegistroModelos()
+
+
+@st.cache_resource
+def obtener_cache_resultados():
+    """
+    Devuelve la caché de resultados de clasificación del proceso.
+
+    :return: Instancia única de CacheResultados.
+    """
+    ruta_sqlite = CACHE_RESULTADOS_SQLITE if CACHE_RESULTADOS_EN_DISCO else None
+    return CacheResultados(max_entradas=CACHE_RESULTADOS_MAX_ENTRADAS, ruta_sqlite=ruta_sqlite)
+
+
+def _inferir_con_cache(entrada, classifier, inferir, variante=None):
+    """
+    Devuelve los resultados crudos del modelo para la entrada, usando la caché de resultados si es posible.
+
+    :param entrada: Imagen preprocesada (PIL Image o tensor).
+    :param classifier: Pipeline de clasificación de imágenes.
+    :param inferir: Función sin argumentos que ejecuta la inferencia.
+    :param variante: Identificador del modo de inferencia cuando no es el modelo completo.
+    :return: Lista de diccionarios con 'label' y 'score'.
+    """
+    huella = huella_clasificador(classifier)
+    if huella is None:
+        return inferir()
+    if variante:
+        huella = f"{huella}:{variante}"
+
+    cache = obtener_cache_resultados()
+    clave = cache.clave(huella, digest_imagen(entrada))
+    results = cache.obtener(clave)
+    if results is None:
+        results = inferir()
+        cache.guardar(clave, results)
+    return results
+
+
+def _cargar_desde_registro(model_path, descripcion, precision='fp32'):
+    """
+    Carga un modelo a través del registro mostrando los errores en la interfaz.
+
+    :param model_path: Ruta al directorio del modelo.
+    :param descripcion: Descripción del modelo para los mensajes de error.
+    :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
     :return: Pipeline de clasificación de imágenes o None si falla la carga.
     """
     if not os.path.exists(model_path):
-        st.error(f"La ruta del modelo primario especificada no existe: {model_path}")
+        st.error(f"La ruta del {descripcion} especificada no existe: {model_path}")
         return None
 
     try:
-        # Cargar configuración y procesador de imágenes
-        config = AutoConfig.from_pretrained(model_path)
-        image_processor = AutoImageProcessor.from_pretrained(model_path)
-
-        # Cargar modelo
-        model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True)
-
-        # Determinar dispositivo
-        if torch.cuda.is_available():
-            device = 0  # GPU CUDA
-        elif torch.backends.mps.is_available():
-            device = "mps"  # GPU Apple MPS
-        else:
-            device = -1  # CPU
-
-        # Crear pipeline
-        classifier_primary = pipeline("image-classification", model=model, image_processor=image_processor,
-                                      device=device)
-        return classifier_primary
+        return obtener_registro_modelos().obtener(model_path, precision=precision)
     except Exception as e:
-        st.error(f"Error al cargar el modelo primario con transformers: {e}")
+        logger.error(f"Error al cargar el {descripcion} con transformers: {e}")
+        st.error(f"Error al cargar el {descripcion} con transformers: {e}")
         return None
 
 
-def cargar_modelo_secondary_masas(model_path):
+def cargar_modelo_primary(model_path, precision='fp32'):
+    """
+    Carga el modelo primario de clasificación de imágenes desde la ruta especificada.
+    Este modelo clasifica la imagen en 'masas', 'calcificaciones' o 'no_encontrado'.
+
+    :param model_path: Ruta al directorio del modelo primario.
+    :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
+    :return: Pipeline de clasificación de imágenes o None si falla la carga.
+    """
+    return _cargar_desde_registro(model_path, "modelo primario", precision)
+
+
+def cargar_modelo_secondary_masas(model_path, precision='fp32'):
     """
     Carga el modelo secundario para clasificar masas desde la ruta especificada.
     Este modelo clasifica la masa en 'benigna' o 'maligna'.
 
     :param model_path: Ruta al directorio del modelo secundario para masas.
+    :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
     :return: Pipeline de clasificación de imágenes o None si falla la carga.
     """
-    if not os.path.exists(model_path):
-        st.error(f"La ruta del modelo secundario de masas especificada no existe: {model_path}")
-        return None
-
-    try:
-        # Cargar configuración y procesador de imágenes
-        config = AutoConfig.from_pretrained(model_path)
-        image_processor = AutoImageProcessor.from_pretrained(model_path)
-
-        # Cargar modelo
-        model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True)
-
-        # Determinar dispositivo
-        if torch.cuda.is_available():
-            device = 0  # GPU CUDA
-        elif torch.backends.mps.is_available():
-            device = "mps"  # GPU Apple MPS
-        else:
-            device = -1  # CPU
-
-        # Crear pipeline
-        classifier_secondary_masas = pipeline("image-classification", model=model, image_processor=image_processor,
-                                              device=device)
-        return classifier_secondary_masas
-    except Exception as e:
-        st.error(f"Error al cargar el modelo secundario de masas con transformers: {e}")
-        return None
+    return _cargar_desde_registro(model_path, "modelo secundario de masas", precision)
 
 
-def cargar_modelo_secondary_calcifi(model_path):
+def cargar_modelo_secondary_calcifi(model_path, precision='fp32'):
     """
     Carga el modelo secundario CALCI para clasificar calcificaciones desde la ruta especificada.
     Este modelo clasifica la calcificación en 'benigna', 'sospechosa' o 'maligna'.
 
     :param model_path: Ruta al directorio del modelo CALCI para calcificaciones.
+    :param precision: Modo de precisión: 'fp32', 'bf16' o 'int8'.
     :return: Pipeline de clasificación de imágenes o None si falla la carga.
     """
-    if not os.path.exists(model_path):
-        st.error(f"La ruta del modelo CALCI especificada no existe: {model_path}")
-        return None
+    return _cargar_desde_registro(model_path, "modelo CALCI", precision)
 
-    try:
-        # Cargar configuración y procesador de imágenes
-        config = AutoConfig.from_pretrained(model_path)
-        image_processor = AutoImageProcessor.from_pretrained(model_path)
-
-        # Cargar modelo
-        model = AutoModelForImageClassification.from_pretrained(model_path, trust_remote_code=True)
-
-        # Determinar dispositivo
-        if torch.cuda.is_available():
-            device = 0  # GPU CUDA
-        elif torch.backends.mps.is_available():
-            device = "mps"  # GPU Apple MPS
-        else:
-            device = -1  # CPU
 
-        # Crear pipeline
-        classifier_secondary_calcifi = pipeline("image-classification", model=model, image_processor=image_processor,
-                                                device=device)
-        return classifier_secondary_calcifi
-    except Exception as e:
-        st.error(f"Error al cargar el modelo CALCI con transformers: {e}")
+# Hilo de precarga en curso (uno por proceso)
+_hilo_precalentamiento = None
+
+
+def precalentar_modelos(model_paths, precision='fp32'):
+    """
+    Carga en un hilo de fondo los modelos indicados que ya están en disco pero aún no en memoria.
+    Se usa para tener listos los modelos secundarios después de mostrar el primer resultado.
+
+    :param model_paths: Lista de rutas a los directorios de los modelos.
+    :param precision: Modo de precisión con el que se cargarán.
+    :return: Hilo de precarga o None si no hay modelos pendientes.
+    """
+    global _hilo_precalentamiento
+
+    registro = obtener_registro_modelos()
+    pendientes = [ruta for ruta in model_paths if os.path.exists(ruta) and not registro.esta_cargado(ruta, precision=precision)]
+    if not pendientes:
         return None
+    if _hilo_precalentamiento is not None and _hilo_precalentamiento.is_alive():
+        return _hilo_precalentamiento
+
+    def _precalentar():
+        for ruta in pendientes:
+            try:
+                registro.obtener(ruta, precision=precision)
+            except Exception as e:
+                logger.error(f"Error al precargar el modelo '{ruta}': {e}")
+
+    _hilo_precalentamiento = threading.Thread(target=_precalentar, name="precalentamiento-modelos", daemon=True)
+    _hilo_precalentamiento.start()
+    return _hilo_precalentamiento
+
+
+def mostrar_estado_modelos():
+    """
+    Muestra en la barra lateral los modelos cargados en memoria y permite liberarlos.
+    """
+    registro = obtener_registro_modelos()
+    with st.sidebar.expander("Modelos en memoria"):
+        estado = registro.estado()
+        if not estado:
+            st.write("No hay modelos cargados.")
+            return
+        for entrada in estado:
+            st.write(f"**{os.path.basename(entrada['carpeta'])}** ({entrada['dispositivo']}, {entrada['precision']}): "
+                     f"{entrada['memoria_bytes'] / 1024 ** 2:.0f} MB, cargado en {entrada['tiempo_carga']:.1f} s")
+        st.write(f"Total: {registro.memoria_total() / 1024 ** 2:.0f} MB")
+        cache = obtener_cache_resultados()
+        st.write(f"Caché de resultados: {cache.aciertos} aciertos, {cache.fallos} fallos")
+        if st.button("Liberar modelos"):
+            cantidad = registro.liberar_todos()
+            st.success(f"Se liberaron {cantidad} modelos.")
+
+
+def _leer_dicom_ventaneado(dicom_file):
+    """
+    Lee un archivo DICOM y aplica el VOI LUT a sus píxeles.
+
+    :param dicom_file: Archivo DICOM cargado por el usuario (Streamlit UploadedFile).
+    :return: Tupla (array float32 ventaneado, Photometric Interpretation).
+    """
+    # Leer el archivo DICOM desde el objeto UploadedFile
+    dicom = pydicom.dcmread(dicom_file)
+
+    # Aplicar VOI LUT (priorizando la LUT si está presente)
+    img_windowed = ventanear(pixeles_dicom(dicom), dicom)
+
+    return img_windowed, dicom.get('PhotometricInterpretation', 'UNKNOWN')
 
 
 def leer_dicom(dicom_file):
@@ -136,33 +211,33 @@ def leer_dicom(dicom_file):
     :return: Imagen PIL Image en formato RGB o None si falla la conversión.
     """
     try:
-        # Leer el archivo DICOM desde el objeto UploadedFile
-        dicom = pydicom.dcmread(dicom_file)
-        original_image = dicom.pixel_array
-
-        # Aplicar VOI LUT con prefer_lut=True (priorizando LUT si está presente)
-        img_windowed = apply_voi_lut(original_image, dicom, prefer_lut=True)
-
-        # Manejar Photometric Interpretation si es MONOCHROME1 (invertir la imagen)
-        photometric_interpretation = dicom.get('PhotometricInterpretation', 'UNKNOWN')
-        if photometric_interpretation == 'MONOCHROME1':
-            img_windowed = img_windowed.max() - img_windowed
-            st.write(f"Imagen invertida debido a Photometric Interpretation: {photometric_interpretation}")
-        else:
-            st.write(f"Photometric Interpretation: {photometric_interpretation}")
-
-        # Normalizar la imagen para que esté en el rango [0, 255]
-        img_normalized = (img_windowed - img_windowed.min()) / (img_windowed.max() - img_windowed.min()) * 255
-        img_normalized = img_normalized.astype(np.uint8)
+        image, photometric_interpretation = leer_dicom_modelo(dicom_file)
+    except Exception as e:
+        logger.error(f"Error al procesar el archivo DICOM: {e}")
+        st.error(f"Error al procesar el archivo DICOM: {e}")
+        return None
 
-        # Convertir a PIL Image
-        image = Image.fromarray(img_normalized).convert('RGB')
+    # Con MONOCHROME1 el motor invierte la imagen
+    if photometric_interpretation == 'MONOCHROME1':
+        st.write(f"Imagen invertida debido a Photometric Interpretation: {photometric_interpretation}")
+    else:
+        st.write(f"Photometric Interpretation: {photometric_interpretation}")
+    return image
 
-        # Redimensionar a 224x224
-        image = image.resize((224, 224))
 
-        return image
+def leer_dicom_tensor(dicom_file, size=(224, 224)):
+    """
+    Lee un archivo DICOM y lo convierte directamente a un tensor normalizado, sin pasar por PIL.
+    La imagen se redimensiona una sola vez y se mantiene en un canal hasta la etapa del modelo.
 
+    :param dicom_file: Archivo DICOM cargado por el usuario (Streamlit UploadedFile).
+    :param size: Tupla (alto, ancho) de salida.
+    :return: Tensor float32 de forma (1, 1, alto, ancho) en el rango [0, 1] o None si falla la conversión.
+    """
+    try:
+        img_windowed, photometric_interpretation = _leer_dicom_ventaneado(dicom_file)
+        return redimensionar_normalizado(img_windowed, size,
+                                         invertir=photometric_interpretation == 'MONOCHROME1')
     except Exception as e:
         logger.error(f"Error al procesar el archivo DICOM: {e}")
         st.error(f"Error al procesar el archivo DICOM: {e}")
@@ -177,22 +252,18 @@ def leer_imagen(imagen_file):
     :return: Imagen PIL Image en formato RGB o None si falla la conversión.
     """
     try:
-        # Leer la imagen usando PIL
-        image = Image.open(imagen_file).convert('RGB')
-
-        # Verificar el tamaño y redimensionar si es necesario
-        if image.size != (224, 224):
-            image = image.resize((224, 224))
-            st.write(f"Imagen redimensionada a (224, 224)")
-        else:
-            st.write(f"Imagen ya tiene el tamaño (224, 224)")
-
-        return image
+        image, redimensionada = leer_imagen_modelo(imagen_file)
     except Exception as e:
         logger.error(f"Error al procesar la imagen: {e}")
         st.error(f"Error al procesar la imagen: {e}")
         return None
 
+    if redimensionada:
+        st.write(f"Imagen redimensionada a (224, 224)")
+    else:
+        st.write(f"Imagen ya tiene el tamaño (224, 224)")
+    return image
+
 
 def procesar_archivo(uploaded_file):
     """
@@ -201,50 +272,236 @@ def procesar_archivo(uploaded_file):
     :param uploaded_file: Archivo cargado por el usuario (Streamlit UploadedFile).
     :return: Tupla (imagen PIL Image, tipo de archivo) o (None, None) si falla la conversión.
     """
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    if extension in EXTENSIONES_DICOM:
+        return leer_dicom(uploaded_file), 'DICOM'
+    if extension in EXTENSIONES_IMAGEN:
+        return leer_imagen(uploaded_file), 'PNG_JPG'
+    st.error("Formato de archivo no soportado. Por favor, carga una imagen en formato DICOM, PNG o JPG.")
+    return None, None
+
+
+def clasificar_imagen(image, classifier, prediction_mapping, lanzar_errores=False):
+    """
+    Realiza la inferencia sobre una imagen y mapea las etiquetas predichas.
+
+    :param image: Imagen PIL Image a clasificar.
+    :param classifier: Pipeline de clasificación de imágenes.
+    :param prediction_mapping: Diccionario para mapear etiquetas predichas a etiquetas legibles.
+    :param lanzar_errores: Si es True los errores se relanzan en lugar de mostrarse con st.error
+                           (necesario fuera del hilo del script de Streamlit, donde st.error se pierde).
+    :return: Diccionario con etiquetas mapeadas y sus respectivas puntuaciones.
+    """
     try:
-        filename = uploaded_file.name
-        extension = os.path.splitext(filename)[1].lower()
+        results = _inferir_con_cache(image, classifier, lambda: classifier(image))
+        # Mapear etiquetas
+        mapped_results = {prediction_mapping.get(result['label'], result['label']): result['score'] for result in
+                          results}
+        return mapped_results
+    except Exception as e:
+        if lanzar_errores:
+            raise
+        st.error(f"Ocurrió un error durante la clasificación: {e}")
+        return None
 
-        if extension in ['.dcm', '.dicom']:
-            # Procesar archivo DICOM
-            image = leer_dicom(uploaded_file)
-            return image, 'DICOM'
 
-        elif extension in ['.png', '.jpg', '.jpeg']:
-            # Procesar archivo PNG o JPG
-            image = leer_imagen(uploaded_file)
-            return image, 'PNG_JPG'
+def clasificar_tensor(tensor, classifier, prediction_mapping, top_k=5, lanzar_errores=False):
+    """
+    Realiza la inferencia sobre un tensor preprocesado y mapea las etiquetas predichas.
+    Equivale a clasificar_imagen, pero usa directamente el modelo del pipeline sin pasar por PIL.
 
-        else:
-            st.error("Formato de archivo no soportado. Por favor, carga una imagen en formato DICOM, PNG o JPG.")
-            return None, None
+    :param tensor: Tensor float32 de forma (1, 1, alto, ancho) en el rango [0, 1].
+    :param classifier: Pipeline de clasificación de imágenes.
+    :param prediction_mapping: Diccionario para mapear etiquetas predichas a etiquetas legibles.
+    :param top_k: Cantidad máxima de etiquetas devueltas, como en el pipeline.
+    :param lanzar_errores: Si es True los errores se relanzan en lugar de mostrarse con st.error
+                           (necesario fuera del hilo del script de Streamlit, donde st.error se pierde).
+    :return: Diccionario con etiquetas mapeadas y sus respectivas puntuaciones.
+    """
+    def inferir():
+        model = classifier.model
+        pixel_values = normalizar_para_modelo(tensor, classifier.image_processor)
+        with torch.inference_mode():
+            logits = model(pixel_values=pixel_values.to(model.device, model.dtype)).logits
+        return _logits_a_resultados(logits, model, top_k)
 
+    try:
+        results = _inferir_con_cache(tensor, classifier, inferir)
+        # Mapear etiquetas
+        mapped_results = {prediction_mapping.get(result['label'], result['label']): result['score'] for result in
+                          results}
+        return mapped_results
     except Exception as e:
-        logger.error(f"Error al procesar el archivo: {e}")
-        st.error(f"Error al procesar el archivo: {e}")
-        return None, None
+        if lanzar_errores:
+            raise
+        st.error(f"Ocurrió un error durante la clasificación: {e}")
+        return None
 
 
-def clasificar_imagen(image, classifier, prediction_mapping):
+def _logits_a_resultados(logits, model, top_k=5):
     """
-    Realiza la inferencia sobre una imagen y mapea las etiquetas predichas.
+    Convierte los logits de una imagen en la lista de etiquetas y puntuaciones que devuelve el pipeline.
+    """
+    scores, ids = logits[0].float().softmax(-1).topk(min(top_k, logits.shape[-1]))
+    return [{'label': model.config.id2label[idx], 'score': score} for score, idx in zip(scores.tolist(), ids.tolist())]
 
-    :param image: Imagen PIL Image a clasificar.
+
+def clasificar_reducida(entrada, classifier, prediction_mapping, proporcion=0.5, top_k=5, lanzar_errores=False):
+    """
+    Realiza la inferencia descartando los parches de fondo casi constantes antes del encoder del ViT.
+    Si la arquitectura no admite la reducción se usa el modelo completo.
+
+    :param entrada: Imagen PIL Image o tensor de un canal en [0, 1] (ver leer_dicom_tensor).
     :param classifier: Pipeline de clasificación de imágenes.
     :param prediction_mapping: Diccionario para mapear etiquetas predichas a etiquetas legibles.
+    :param proporcion: Fracción de parches a descartar, entre 0 y 1.
+    :param top_k: Cantidad máxima de etiquetas devueltas, como en el pipeline.
+    :param lanzar_errores: Si es True los errores se relanzan en lugar de mostrarse con st.error
+                           (necesario fuera del hilo del script de Streamlit, donde st.error se pierde).
     :return: Diccionario con etiquetas mapeadas y sus respectivas puntuaciones.
     """
+    def inferir():
+        model = classifier.model
+        if isinstance(entrada, torch.Tensor):
+            pixel_values = normalizar_para_modelo(entrada, classifier.image_processor)
+        else:
+            pixel_values = classifier.image_processor(images=entrada, return_tensors='pt')['pixel_values']
+        pixel_values = pixel_values.to(model.device, model.dtype)
+        with torch.inference_mode():
+            try:
+                if getattr(classifier, 'precision', 'fp32') == 'bf16':
+                    with torch.autocast(device_type=model.device.type, dtype=torch.bfloat16):
+                        logits = forward_reducido(model, pixel_values, proporcion)
+                else:
+                    logits = forward_reducido(model, pixel_values, proporcion)
+            except ValueError as e:
+                logger.warning(f"{e} Se usa el modelo completo.")
+                logits = model(pixel_values=pixel_values).logits
+        return _logits_a_resultados(logits, model, top_k)
+
     try:
-        results = classifier(image)
+        results = _inferir_con_cache(entrada, classifier, inferir, variante=f"tokens{proporcion:.2f}")
         # Mapear etiquetas
         mapped_results = {prediction_mapping.get(result['label'], result['label']): result['score'] for result in
                           results}
         return mapped_results
     except Exception as e:
-        st.error(f"Ocurrió un error durante la clasificación: {e}")
+        if lanzar_errores:
+            raise
+        st.error(f"Ocurrió un error durante la clasificación con reducción de tokens: {e}")
         return None
 
 
+def clasificar_cascada_lote(images, classifier_primary, obtener_clasificador_secundario, prediction_mappings,
+                            modelo_secundario_por_etiqueta, batch_size=8):
+    """
+    Clasifica varias imágenes con la cascada primaria/secundaria usando la caché de resultados del proceso
+    y mostrando en la interfaz los lotes que fallan.
+
+    :param images: Lista de imágenes PIL Image a clasificar.
+    :param classifier_primary: Pipeline del modelo primario.
+    :param obtener_clasificador_secundario: Función que recibe la clave del modelo secundario y
+                                            devuelve su pipeline (o None si no se pudo cargar).
+    :param prediction_mappings: Diccionario clave de modelo -> mapeo de etiquetas.
+    :param modelo_secundario_por_etiqueta: Diccionario etiqueta primaria -> clave del modelo secundario.
+    :param batch_size: Cantidad de imágenes por pasada del modelo.
+    :return: Tupla (lista de resultados por imagen, métricas de rendimiento) o (None, None) si falla.
+    """
+    return cascada.clasificar_cascada_lote(images, classifier_primary, obtener_clasificador_secundario,
+                                           prediction_mappings, modelo_secundario_por_etiqueta,
+                                           batch_size=batch_size, cache=obtener_cache_resultados(),
+                                           reportar_error=st.error)
+
+
+# Ejecutor compartido para la cascada paralela (un hilo por modelo)
+_executor_cascada = None
+_lock_executor_cascada = threading.Lock()
+
+
+def configurar_hilos(intra_op=None, inter_op=None):
+    """
+    Configura los hilos de PyTorch para que los modelos no sobresuscriban la CPU.
+
+    :param intra_op: Hilos intra-op del proceso (torch.set_num_threads). None mantiene el valor actual.
+    :param inter_op: Hilos inter-op (torch.set_num_interop_threads). Solo puede fijarse una vez por proceso,
+                     antes de la primera inferencia; si ya no es posible se mantiene el valor actual.
+    """
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op and torch.get_num_interop_threads() != int(inter_op):
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError as e:
+            logger.warning(f"No se pudo cambiar la cantidad de hilos inter-op: {e}")
+
+
+def _obtener_executor_cascada(max_workers):
+    global _executor_cascada
+    with _lock_executor_cascada:
+        if _executor_cascada is None or _executor_cascada._max_workers < max_workers:
+            if _executor_cascada is not None:
+                # Las tareas en curso terminan; los hilos del pool anterior se liberan al quedar ociosos
+                _executor_cascada.shutdown(wait=False)
+            _executor_cascada = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cascada")
+        return _executor_cascada
+
+
+def clasificar_cascada_paralela(entrada, classifier_primary, classifiers_secondary, prediction_mappings,
+                                modelo_secundario_por_etiqueta, clasificar=None, hilos_por_modelo=1):
+    """
+    Ejecuta el modelo primario y todos los secundarios a la vez sobre la misma imagen, cada uno en su
+    propio hilo con una cantidad acotada de hilos intra-op, y conserva solo el secundario que elige
+    la etiqueta primaria. Usa núcleos libres a cambio de reducir la latencia de la cascada: los secundarios
+    no elegidos ya están en ejecución cuando termina el primario, así que su inferencia se paga completa
+    aunque su resultado se descarte.
+    Los errores de los hilos se muestran desde el hilo del script, que es el que tiene contexto de Streamlit.
+
+    :param entrada: Imagen PIL Image o tensor preprocesado.
+    :param classifier_primary: Pipeline del modelo primario.
+    :param classifiers_secondary: Diccionario clave del modelo secundario -> pipeline (o None).
+    :param prediction_mappings: Diccionario clave de modelo -> mapeo de etiquetas.
+    :param modelo_secundario_por_etiqueta: Diccionario etiqueta primaria -> clave del modelo secundario.
+    :param clasificar: Función de clasificación (clasificar_imagen, clasificar_tensor o clasificar_reducida);
+                       debe aceptar lanzar_errores.
+    :param hilos_por_modelo: Hilos intra-op que usa cada modelo.
+    :return: Tupla (resultado primario, resultado del secundario elegido o None).
+    """
+    if clasificar is None:
+        clasificar = clasificar_imagen
+
+    def tarea(classifier, prediction_mapping):
+        # Con OpenMP la cantidad de hilos intra-op se aplica al hilo que lanza la inferencia
+        torch.set_num_threads(hilos_por_modelo)
+        return clasificar(entrada, classifier, prediction_mapping, lanzar_errores=True)
+
+    def resultado(futuro, modelo):
+        try:
+            return futuro.result()
+        except Exception as e:
+            logger.error(f"Error en la clasificación con el modelo {modelo}: {e}")
+            st.error(f"Ocurrió un error durante la clasificación con el modelo {modelo}: {e}")
+            return None
+
+    secundarios = {key: classifier for key, classifier in classifiers_secondary.items() if classifier}
+    executor = _obtener_executor_cascada(1 + len(secundarios))
+    futuro_primario = executor.submit(tarea, classifier_primary, prediction_mappings['primario'])
+    futuros = {key: executor.submit(tarea, classifier, prediction_mappings[key])
+               for key, classifier in secundarios.items()}
+
+    mapped_result_primary = resultado(futuro_primario, 'primario')
+    key = None
+    if mapped_result_primary:
+        primary_label = max(mapped_result_primary, key=mapped_result_primary.get)
+        key = modelo_secundario_por_etiqueta.get(primary_label)
+
+    # Los resultados de los secundarios no elegidos se descartan; cancel solo evita los que aún no empezaron
+    for otra_key, futuro in futuros.items():
+        if otra_key != key:
+            futuro.cancel()
+    mapped_result_secondary = resultado(futuros[key], key) if key in futuros else None
+    return mapped_result_primary, mapped_result_secondary
+
+
 def mostrar_resultados_primary(mapped_result):
     """
     Muestra los resultados de la clasificación primaria en la interfaz de Streamlit.
@@ -285,3 +542,37 @@ def mostrar_resultados_secondary_calcifi(mapped_result):
             st.write(f"**{label.capitalize()}**: {score * 100:.2f}%")
     else:
         st.write("No se pudieron obtener resultados de la clasificación secundaria para calcificaciones.")
+
+
+def mostrar_resultados_lote(nombres, resultados, metricas):
+    """
+    Muestra los resultados de la clasificación en lote y el rendimiento obtenido.
+
+    :param nombres: Lista de nombres de archivo, en el mismo orden que los resultados.
+    :param resultados: Lista de resultados devuelta por clasificar_cascada_lote.
+    :param metricas: Métricas de rendimiento devueltas por clasificar_cascada_lote.
+    """
+    if not resultados:
+        st.write("No se pudieron obtener resultados de la clasificación en lote.")
+        return
+
+    st.write("### Resultados de la Clasificación en Lote")
+    filas = []
+    for nombre, resultado in zip(nombres, resultados):
+        primary_label = resultado['etiqueta_primaria']
+        fila = {
+            'Archivo': nombre,
+            'Clasificación primaria': primary_label,
+            'Puntuación primaria': f"{resultado['primario'][primary_label] * 100:.2f}%",
+            'Clasificación secundaria': '',
+            'Puntuación secundaria': ''
+        }
+        if resultado['secundario']:
+            secondary_label = max(resultado['secundario'], key=resultado['secundario'].get)
+            fila['Clasificación secundaria'] = secondary_label
+            fila['Puntuación secundaria'] = f"{resultado['secundario'][secondary_label] * 100:.2f}%"
+        filas.append(fila)
+    st.dataframe(filas, use_container_width=True)
+
+    st.write(f"**Imágenes clasificadas:** {metricas['imagenes']} en {metricas['tiempo_inferencia']:.2f} s "
+             f"({metricas['imagenes_por_segundo']:.2f} imágenes/s)")
@@ -3,9 +3,20 @@
 import streamlit as st
 import os
 import shutil
-from src.procesamiento.convertir_png import convertir_dicom_a_imagen
-from concurrent.futures import ThreadPoolExecutor
-import cv2
+from src.procesamiento.conversion_lote import convertir_carpeta
+from src.procesamiento.catalogo import CatalogoDicom
+from src.procesamiento.codificacion import ESTRATEGIAS_PNG
+from src.config.settings import CATALOGO_DICOM_SQLITE, COMPRESION_PNG_POR_DEFECTO
+
+
+@st.cache_resource
+def obtener_catalogo():
+    """
+    Devuelve el catálogo de metadatos DICOM del proceso.
+
+    :return: Instancia única de CatalogoDicom.
+    """
+    return CatalogoDicom(CATALOGO_DICOM_SQLITE)
 
 
 def mostrar_convertir_png(opciones):
@@ -13,7 +24,7 @@ def mostrar_convertir_png(opciones):
     Muestra la sección 'Convertir a PNG' y maneja la conversión de DICOM a PNG o JPG.
     """
     st.header("Convertir DICOM a PNG o JPG")
-    st.info("Convierte todas las imágenes DICOM de una carpeta a formato PNG o JPG.")
+    st.info("Convierte todas las imágenes DICOM de una carpeta a formato PNG o JPG, o a shards NPY para entrenamiento.")
 
     # Seleccionar la carpeta de origen desde 'data/raw'
     raw_data_dir = os.path.join(os.getcwd(), 'data', 'raw')
@@ -49,63 +60,70 @@ def mostrar_convertir_png(opciones):
     selected_size = size_options[selected_size_label]
 
     # Seleccionar el formato de salida
-    format_options = ["PNG", "JPG"]
-    selected_format = st.selectbox("Selecciona el formato de salida", format_options)
+    format_options = ["PNG", "PNG16", "JPG", "WEBP", "NPY"]
+    selected_format = st.selectbox("Selecciona el formato de salida", format_options,
+                                   help="PNG16 conserva el rango de la ventana en 16 bits; WEBP es sin pérdida; "
+                                        "NPY escribe shards .npy mapeables en memoria con un índice (indice.jsonl).")
+
+    # Opciones del codificador: compresión más baja codifica más rápido a cambio de archivos más grandes
+    codificacion = {}
+    if selected_format in ("PNG", "PNG16"):
+        codificacion['compresion_png'] = st.slider("Nivel de compresión PNG", 0, 9, COMPRESION_PNG_POR_DEFECTO,
+                                                   help="0 es el más rápido; 9 el más pequeño.")
+        codificacion['estrategia_png'] = st.selectbox("Estrategia de compresión PNG", list(ESTRATEGIAS_PNG))
+
+    # Actualizar el catálogo de la carpeta solo al cambiar de carpeta o a pedido: cada escaneo recorre la carpeta
+    # completa (solo se leen las cabeceras de archivos nuevos o modificados). La conversión vuelve a escanear.
+    catalogo = obtener_catalogo()
+    actualizar = st.button("Actualizar catálogo", help="Vuelve a recorrer la carpeta para detectar archivos "
+                                                       "nuevos, modificados o eliminados.")
+    if actualizar or st.session_state.get('catalogo_carpeta_escaneada') != source_dir:
+        with st.spinner("Actualizando el catálogo de la carpeta..."):
+            catalogo.escanear(source_dir)
+        st.session_state['catalogo_carpeta_escaneada'] = source_dir
+
+    # Filtros por metadatos a partir de los valores presentes en el catálogo
+    filtros = {}
+    for columna, etiqueta in (('modality', "Modalidad"), ('laterality', "Lateralidad")):
+        valores = catalogo.valores(columna, carpeta=source_dir)
+        if len(valores) > 1:
+            seleccion = st.selectbox(f"Filtrar por {etiqueta.lower()}", ["Todas"] + valores)
+            filtros[columna] = None if seleccion == "Todas" else seleccion
+    st.write(f"Archivos DICOM seleccionados: {catalogo.contar(carpeta=source_dir, **filtros)}")
 
     # Botón para iniciar la conversión
     if st.button("Iniciar Conversión"):
         with st.spinner("Procesando las imágenes..."):
             # Definir la carpeta de salida
             output_dir = os.path.join(processed_data_dir, selected_subfolder)
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Listar todos los archivos DICOM en la carpeta de origen
-            dicom_files = []
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    if file.lower().endswith(('.dcm', '.dicom')):
-                        dicom_files.append(os.path.join(root, file))
-
-            total_files = len(dicom_files)
-            if total_files == 0:
-                st.warning(f"No se encontraron archivos DICOM en la carpeta: {source_dir}")
-                return
 
             progress_bar = st.progress(0)
             status_text = st.empty()
 
-            # Función para procesar una sola imagen
-            def process_image(dicom_path):
-                image_name = os.path.splitext(os.path.basename(dicom_path))[0]
-                image = convertir_dicom_a_imagen(dicom_path, selected_size)
-                if image is not None:
-                    output_filename = f"{image_name}.{selected_format.lower()}"
-                    output_path = os.path.join(output_dir, output_filename)
-                    try:
-                        if selected_format == "PNG":
-                            cv2.imwrite(output_path, image)
-                        elif selected_format == "JPG":
-                            cv2.imwrite(output_path, image, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-                        return True
-                    except Exception as e:
-                        print(f"Error al guardar {output_path}: {e}")
-                        return False
-                else:
-                    return False
-
-            # Procesar imágenes en paralelo
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = []
-                for idx, dicom_path in enumerate(dicom_files):
-                    futures.append(executor.submit(process_image, dicom_path))
-
-                for idx, future in enumerate(futures):
-                    result = future.result()
-                    progress = (idx + 1) / total_files
-                    progress_bar.progress(progress)
-                    status_text.text(f"Procesando {idx + 1} de {total_files} imágenes...")
-
-            st.success(f"Conversión completada. Imágenes guardadas en: {output_dir}")
+            def progreso(completados, total):
+                progress_bar.progress(completados / total if total else 1.0)
+                status_text.text(f"Procesando {completados} de {total} imágenes...")
+
+            # Los archivos sin cambios desde la última conversión con las mismas opciones se omiten
+            try:
+                resumen = convertir_carpeta(source_dir, output_dir, selected_size, selected_format,
+                                            progreso=progreso, catalogo=catalogo, filtros=filtros,
+                                            codificacion=codificacion)
+            except ValueError as e:
+                st.error(f"No se pudo iniciar la conversión: {e}")
+                return
+
+            if resumen['total'] == 0:
+                st.warning(f"No se encontraron archivos DICOM en la carpeta: {source_dir}")
+                return
+            for ruta in resumen['fallidos']:
+                st.error(f"No se pudo convertir {ruta}")
+            st.success(f"Conversión completada ({resumen['convertidos']} convertidas, {resumen['omitidos']} sin cambios). "
+                       f"Imágenes guardadas en: {output_dir}")
+            if resumen['convertidos'] and selected_format != "NPY":
+                st.write(f"Codificación {selected_format}: "
+                         f"{resumen['codificacion_segundos'] * 1000 / resumen['convertidos']:.1f} ms/imagen, "
+                         f"{resumen['bytes_salida'] / resumen['convertidos'] / 1024:.1f} KB/imagen")
 
     # Información adicional
     st.write("---")
@@ -29,6 +29,11 @@ def mostrar_sidebar():
 
         aplicar_voilut = st.sidebar.checkbox("Aplicar VOI LUT", value=True)
         mostrar_metadatos = st.sidebar.checkbox("Mostrar Metadatos", value=False)
+        opciones['visor_ventana'] = st.sidebar.checkbox(
+            "Visor interactivo de ventana/nivel",
+            value=False,
+            help="Muestra la imagen en un visor con centro y ancho de ventana ajustables."
+        )
         aplicar_transformaciones = st.sidebar.checkbox("Aplicar Transformaciones", value=False)
 
         # Opción para invertir interpretación fotométrica
@@ -90,6 +95,11 @@ def mostrar_sidebar():
             'invertir_interpretacion': False,
             'interpretacion_fotometrica': '2'
         })
+        opciones['visor_ventana'] = st.sidebar.checkbox(
+            "Visor interactivo de ventana/nivel",
+            value=False,
+            help="Abre la vista completa en un visor con centro y ancho de ventana ajustables."
+        )
 
     # Agregar control de paginación
     if tipo_carga == "Cargar Carpeta":
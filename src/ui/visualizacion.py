@@ -2,10 +2,16 @@
 
 import streamlit as st
 from src.ui.carga_imagenes import cargar_imagenes
-from src.procesamiento.procesar import procesar_imagen_dicom_cached
-from src.procesamiento.lectura_dicom import obtener_metadatos_relevantes
+from src.procesamiento.procesar import (procesar_imagen_dicom_cached, procesar_imagen_dicom_ruta, precargar_imagenes,
+                                       miniatura_imagen_dicom_cached, miniatura_imagen_dicom_ruta,
+                                       copia_trabajo_dicom_cached, copia_trabajo_dicom_ruta)
+from src.procesamiento.catalogo import listar_archivos
+from src.procesamiento.cache_imagenes import digest_bytes, digest_archivo
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -19,66 +25,254 @@ def mostrar_visualizacion(opciones):
     tipo_carga = opciones.get('tipo_carga')
 
     if tipo_carga == "Procesamiento de DICOM":
-        subseccion = opciones.get('subseccion')
-
-        if subseccion == "Visualización de DICOM":
-            dicom_files = cargar_imagenes(opciones)
-
-            if not dicom_files:
-                st.info("No hay imágenes para mostrar en esta sección.")
-                return
-
-            num_imagenes = len(dicom_files)
-            logger.info(f"Cantidad de imágenes cargadas en 'Procesamiento de DICOM': {num_imagenes}")
-
-            if num_imagenes == 1:
-                # Mostrar una sola imagen en alta resolución
-                dicom_file = dicom_files[0]
-                with st.container():
-                    with st.spinner("Procesando la imagen..."):
-                        imagen, ds = procesar_imagen_dicom_cached(dicom_file.getvalue(), opciones)
-                    if imagen is not None:
-                        st.image(imagen, caption=dicom_file.name, use_column_width=True)
-                        if opciones.get('mostrar_metadatos', False) and ds is not None:
-                            metadatos = obtener_metadatos_relevantes(ds)
-                            st.expander("Metadatos").write(metadatos)
-                    else:
-                        st.error(f"No se pudo procesar la imagen {dicom_file.name}")
-            else:
-                # Mostrar múltiples imágenes en columnas con tamaño reducido
-                num_columns = min(3, num_imagenes)  # Máximo 3 columnas
-                cols = st.columns(num_columns)
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    futures = [
-                        executor.submit(procesar_imagen_dicom_cached, dicom_file.getvalue(), opciones)
-                        for dicom_file in dicom_files
-                    ]
-
-                    # Barra de progreso
-                    progress_bar = st.progress(0)
-                    total = len(futures)
-
-                    for idx, future in enumerate(futures):
-                        try:
-                            imagen, ds = future.result()
-                            logger.info(f"Imagen procesada: {dicom_files[idx].name}")
-                        except Exception as e:
-                            st.error(f"Error al procesar la imagen {dicom_files[idx].name}: {e}")
-                            logger.error(f"Error al procesar la imagen {dicom_files[idx].name}: {e}")
-                            continue
-
-                        dicom_file = dicom_files[idx]
-                        if imagen is not None:
-                            with cols[idx % num_columns]:
-                                st.image(imagen, caption=dicom_file.name, use_column_width=True)
-                                if opciones.get('mostrar_metadatos', False) and ds is not None:
-                                    metadatos = obtener_metadatos_relevantes(ds)
-                                    st.expander("Metadatos").write(metadatos)
-                        else:
-                            st.error(f"No se pudo procesar la imagen {dicom_file.name}")
-
-                        # Actualizar barra de progreso
-                        progress_bar.progress((idx + 1) / total)
+        if opciones.get('subseccion') == "Visualización de DICOM":
+            mostrar_archivos_cargados(opciones)
+    elif tipo_carga == "Cargar Imágenes":
+        mostrar_archivos_cargados(opciones)
+    elif tipo_carga == "Cargar Carpeta":
+        mostrar_carpeta(opciones)
     elif tipo_carga == "Clasificación mediante Deep Learning":
         
         st.info("Funcionalidad de Clasificación mediante Deep Learning en desarrollo.")
+
+
+def mostrar_archivos_cargados(opciones):
+    """
+    Muestra los DICOM subidos desde la barra lateral: una sola imagen en alta resolución (o en el visor de
+    ventana/nivel si está activado) y varias en una cuadrícula de miniaturas.
+    """
+    dicom_files = cargar_imagenes(opciones)
+
+    if not dicom_files:
+        st.info("No hay imágenes para mostrar en esta sección.")
+        return
+
+    num_imagenes = len(dicom_files)
+    logger.info(f"Cantidad de imágenes cargadas en '{opciones.get('tipo_carga')}': {num_imagenes}")
+
+    if num_imagenes == 1 and opciones.get('visor_ventana', False):
+        # Visor interactivo de ventana/nivel sobre la copia de trabajo de 16 bits
+        dicom_file = dicom_files[0]
+        digest = digest_bytes(dicom_file.getvalue())
+        _mostrar_visor(dicom_file.name, digest,
+                       partial(copia_trabajo_dicom_cached, dicom_file.getvalue(), digest=digest), opciones)
+    elif num_imagenes == 1:
+        # Mostrar una sola imagen en alta resolución
+        dicom_file = dicom_files[0]
+        with st.container():
+            with st.spinner("Procesando la imagen..."):
+                imagen, metadatos = procesar_imagen_dicom_cached(dicom_file.getvalue(), opciones)
+            if imagen is not None:
+                st.image(imagen, caption=dicom_file.name, use_column_width=True)
+                if opciones.get('mostrar_metadatos', False) and metadatos is not None:
+                    st.expander("Metadatos").write(metadatos)
+            else:
+                st.error(f"No se pudo procesar la imagen {dicom_file.name}")
+    else:
+        # Mostrar múltiples imágenes en columnas con tamaño reducido
+        nombres = [dicom_file.name for dicom_file in dicom_files]
+        digests = [digest_bytes(dicom_file.getvalue()) for dicom_file in dicom_files]
+        miniaturas = [partial(miniatura_imagen_dicom_cached, dicom_file.getvalue(), opciones, digest=digest)
+                      for dicom_file, digest in zip(dicom_files, digests)]
+        completas = [partial(procesar_imagen_dicom_cached, dicom_file.getvalue(), opciones, digest=digest)
+                     for dicom_file, digest in zip(dicom_files, digests)]
+        copias = [partial(copia_trabajo_dicom_cached, dicom_file.getvalue(), digest=digest)
+                  for dicom_file, digest in zip(dicom_files, digests)]
+        _mostrar_cuadricula(nombres, digests, miniaturas, completas, opciones, copias)
+
+
+def _aplicar_preset(clave, copia, preset):
+    """
+    Copia una ventana predefinida a los controles del visor, dentro del rango de los sliders.
+    """
+    centro, ancho, funcion = copia.presets[preset]
+    st.session_state[f"{clave}_centro"] = float(min(max(centro, copia.minimo), copia.maximo))
+    st.session_state[f"{clave}_ancho"] = float(min(max(ancho, 1.0), _ancho_maximo(copia)))
+    st.session_state[f"{clave}_funcion"] = funcion
+
+
+def _ancho_maximo(copia):
+    return max(2 * (copia.maximo - copia.minimo), 2.0)
+
+
+def _mostrar_visor(nombre, digest, obtener_copia, opciones):
+    """
+    Visor interactivo de ventana/nivel. El DICOM se decodifica una sola vez a una copia de trabajo de 16 bits;
+    mover los sliders, cambiar de ventana predefinida o invertir solo aplica una tabla sobre esa copia.
+
+    :param nombre: Nombre de la imagen, para el título.
+    :param digest: Digest del archivo; identifica el estado de los controles, de modo que otro archivo con el mismo
+                   nombre no hereda la ventana ni sus límites.
+    :param obtener_copia: Función sin argumentos que devuelve la CopiaTrabajo (o None si falla).
+    :param opciones: Diccionario de opciones de procesamiento.
+    """
+    with st.spinner("Decodificando la imagen..."):
+        copia = obtener_copia()
+    if copia is None:
+        st.error(f"No se pudo procesar la imagen {nombre}")
+        return
+
+    clave = f"visor_{digest}"
+    nombres_presets = list(copia.presets)
+    if f"{clave}_centro" not in st.session_state:
+        _aplicar_preset(clave, copia, nombres_presets[0])
+
+    col_preset, col_invertir, col_completa = st.columns(3)
+    col_preset.selectbox("Ventana predefinida", nombres_presets, key=f"{clave}_preset",
+                         on_change=lambda: _aplicar_preset(clave, copia, st.session_state[f"{clave}_preset"]))
+    # MONOCHROME1 se muestra invertida por defecto, combinada con la inversión elegida en la barra lateral
+    invertir = col_invertir.checkbox(
+        "Invertir", key=f"{clave}_invertir",
+        value=copia.invertir_por_defecto != bool(opciones.get('invertir_interpretacion', False))
+    )
+    completa = col_completa.checkbox("Resolución completa", value=False, key=f"{clave}_completa")
+
+    paso = max((copia.maximo - copia.minimo) / 1000, 0.01)
+    centro = st.slider("Centro de ventana", min_value=float(copia.minimo),
+                       max_value=float(max(copia.maximo, copia.minimo + 1)), step=paso, key=f"{clave}_centro")
+    ancho = st.slider("Ancho de ventana", min_value=1.0, max_value=float(_ancho_maximo(copia)), step=paso,
+                      key=f"{clave}_ancho")
+
+    inicio = time.perf_counter()
+    imagen = copia.renderizar(centro, ancho, invertir, st.session_state[f"{clave}_funcion"], completa)
+    milisegundos = (time.perf_counter() - inicio) * 1000
+    st.image(imagen, caption=f"{nombre} (C {centro:.1f} / A {ancho:.1f}, {milisegundos:.1f} ms)",
+             use_column_width=True)
+
+
+def _abrir_vista_completa(digest):
+    st.session_state['vista_completa'] = digest
+
+
+def _mostrar_vista_completa(nombres, digests, completas, opciones, copias=None):
+    """
+    Muestra a resolución completa la imagen abierta desde la cuadrícula, hasta que se cierre.
+    La selección se guarda por digest, porque dos archivos pueden tener el mismo nombre.
+    Con el visor de ventana/nivel activado se muestra en el visor a partir de su copia de trabajo.
+    """
+    digest = st.session_state.get('vista_completa')
+    if digest not in digests:
+        return
+    indice = digests.index(digest)
+    nombre = nombres[indice]
+    if copias is not None and opciones.get('visor_ventana', False):
+        with st.container():
+            _mostrar_visor(nombre, digest, copias[indice], opciones)
+            st.button("Cerrar vista completa", key='cerrar_vista_completa',
+                      on_click=lambda: st.session_state.pop('vista_completa', None))
+        st.write("---")
+        return
+    with st.container():
+        with st.spinner("Procesando la imagen..."):
+            imagen, metadatos = completas[indice]()
+        if imagen is not None:
+            st.image(imagen, caption=nombre, use_column_width=True)
+            if opciones.get('mostrar_metadatos', False) and metadatos is not None:
+                st.expander("Metadatos").write(metadatos)
+        else:
+            st.error(f"No se pudo procesar la imagen {nombre}")
+        st.button("Cerrar vista completa", key='cerrar_vista_completa',
+                  on_click=lambda: st.session_state.pop('vista_completa', None))
+    st.write("---")
+
+
+def _mostrar_cuadricula(nombres, digests, miniaturas, completas, opciones, copias=None):
+    """
+    Muestra las imágenes en una cuadrícula de hasta 3 columnas usando miniaturas al ancho de la columna.
+    Cada miniatura se puede abrir a resolución completa.
+
+    :param nombres: Nombres a mostrar como título de cada imagen.
+    :param digests: Digest del archivo de cada imagen; identifica sus controles aunque los nombres se repitan.
+    :param miniaturas: Funciones sin argumentos que devuelven (bytes JPEG, metadatos), una por imagen.
+    :param completas: Funciones sin argumentos que devuelven (imagen, metadatos) a resolución completa.
+    :param opciones: Diccionario de opciones de procesamiento.
+    :param copias: Funciones sin argumentos que devuelven la CopiaTrabajo de cada imagen, para el visor.
+    """
+    # Los botones de las miniaturas fijan la selección en su callback, antes del rerun que dibuja esta vista
+    _mostrar_vista_completa(nombres, digests, completas, opciones, copias)
+
+    num_columns = min(3, len(miniaturas))  # Máximo 3 columnas
+    cols = st.columns(num_columns)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(tarea) for tarea in miniaturas]
+
+        # Barra de progreso
+        progress_bar = st.progress(0)
+        total = len(futures)
+
+        for idx, future in enumerate(futures):
+            try:
+                imagen, metadatos = future.result()
+                logger.info(f"Imagen procesada: {nombres[idx]}")
+            except Exception as e:
+                st.error(f"Error al procesar la imagen {nombres[idx]}: {e}")
+                logger.error(f"Error al procesar la imagen {nombres[idx]}: {e}")
+                continue
+
+            if imagen is not None:
+                with cols[idx % num_columns]:
+                    st.image(imagen, caption=nombres[idx], use_column_width=True)
+                    st.button("Ver completa", key=f"abrir_{idx}_{digests[idx]}", on_click=_abrir_vista_completa,
+                              args=(digests[idx],))
+                    if opciones.get('mostrar_metadatos', False) and metadatos is not None:
+                        st.expander("Metadatos").write(metadatos)
+            else:
+                st.error(f"No se pudo procesar la imagen {nombres[idx]}")
+
+            # Actualizar barra de progreso
+            progress_bar.progress((idx + 1) / total)
+
+
+@st.cache_data(show_spinner=False, ttl=60)
+def _listar_carpeta(ruta_carpeta):
+    """
+    Lista los DICOM de una carpeta (recursivamente) ordenados por ruta, sin abrir ningún archivo.
+    El listado se reutiliza durante un minuto para que cambiar de página no vuelva a recorrer la carpeta.
+    """
+    return sorted(listar_archivos(ruta_carpeta))
+
+
+def _digest_ruta(ruta):
+    """
+    Digest de un archivo de la carpeta; si ya no existe se usa la ruta, y el error se muestra al procesarlo.
+    """
+    try:
+        return digest_archivo(ruta)
+    except OSError:
+        return ruta
+
+
+def mostrar_carpeta(opciones):
+    """
+    Muestra una carpeta del servidor página a página: solo se decodifican los DICOM de la página actual
+    y la página siguiente se precarga en segundo plano en la caché de imágenes.
+    """
+    ruta_carpeta = os.path.abspath(opciones.get('ruta_carpeta') or 'data/raw')
+    if not os.path.isdir(ruta_carpeta):
+        st.error(f"La carpeta no existe: {ruta_carpeta}")
+        return
+
+    rutas = _listar_carpeta(ruta_carpeta)
+    if not rutas:
+        st.info(f"No se encontraron archivos DICOM en: {ruta_carpeta}")
+        return
+
+    por_pagina = int(opciones.get('imagenes_por_pagina', 10))
+    total_paginas = (len(rutas) + por_pagina - 1) // por_pagina
+    pagina = min(int(opciones.get('pagina', 1)), total_paginas)
+    inicio = (pagina - 1) * por_pagina
+    rutas_pagina = rutas[inicio:inicio + por_pagina]
+    st.write(f"Página {pagina} de {total_paginas} ({len(rutas)} imágenes en la carpeta)")
+
+    comienzo = time.perf_counter()
+    nombres = [os.path.relpath(ruta, ruta_carpeta) for ruta in rutas_pagina]
+    digests = [_digest_ruta(ruta) for ruta in rutas_pagina]
+    miniaturas = [partial(miniatura_imagen_dicom_ruta, ruta, opciones) for ruta in rutas_pagina]
+    completas = [partial(procesar_imagen_dicom_ruta, ruta, opciones) for ruta in rutas_pagina]
+    copias = [partial(copia_trabajo_dicom_ruta, ruta) for ruta in rutas_pagina]
+    _mostrar_cuadricula(nombres, digests, miniaturas, completas, opciones, copias)
+    logger.info(f"Página {pagina} de {ruta_carpeta} mostrada en {time.perf_counter() - comienzo:.2f} s")
+
+    # Precargar la página siguiente mientras el usuario mira la actual
+    if pagina < total_paginas:
+        precargar_imagenes(rutas[inicio + por_pagina:inicio + 2 * por_pagina], opciones)
@@ -0,0 +1,338 @@
+# src/utilidades/descarga_modelos.py
+# Descarga de los modelos: bloques grandes, reanudación con HTTP Range, verificación SHA-256 opcional y
+# extracción atómica (carpeta temporal + rename), con descargas concurrentes. Un archivo de bloqueo exclusivo
+# evita que dos sesiones o procesos escriban a la vez en el mismo archivo parcial o instalen el mismo modelo.
+#
+# Verificación contra un servidor HTTP local: python -m benchmarks.verificar_descarga
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de los bloques de lectura de la red y de extracción
+TAMANO_BLOQUE = 8 * 1024 * 1024
+
+# Prefijo de las carpetas temporales de extracción dentro del directorio de modelos
+PREFIJO_TEMPORAL = '.extrayendo-'
+
+# Tiempo máximo que se espera a que otra descarga del mismo archivo libere su bloqueo
+TIEMPO_ESPERA_BLOQUEO = 2 * 3600
+
+# En Windows no se puede comprobar si el proceso dueño sigue vivo: el bloqueo se da por abandonado por antigüedad
+ANTIGUEDAD_BLOQUEO_ABANDONADO = 6 * 3600
+
+
+class ErrorDescarga(RuntimeError):
+    """
+    Error al descargar, verificar o extraer un modelo.
+    """
+
+
+def _hash_archivo(ruta, h):
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            h.update(bloque)
+    return h
+
+
+def _bloqueo_abandonado(ruta):
+    """
+    Indica si el archivo de bloqueo quedó de un proceso que ya no existe.
+    """
+    try:
+        with open(ruta, 'r') as f:
+            contenido = f.read().strip()
+        antiguedad = time.time() - os.path.getmtime(ruta)
+    except OSError:
+        return False
+    if not contenido.isdigit():
+        # Recién creado y aún sin PID escrito, o dañado
+        return antiguedad > 60
+    if os.name == 'nt':
+        return antiguedad > ANTIGUEDAD_BLOQUEO_ABANDONADO
+    try:
+        os.kill(int(contenido), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+@contextmanager
+def bloqueo_exclusivo(ruta, espera=TIEMPO_ESPERA_BLOQUEO, intervalo=0.5):
+    """
+    Bloqueo entre hilos y procesos basado en un archivo creado con O_EXCL que guarda el PID del dueño.
+    Si el bloqueo está tomado se espera a que se libere; uno abandonado por un proceso terminado se reemplaza.
+
+    :param ruta: Ruta del archivo de bloqueo.
+    :param espera: Segundos máximos de espera.
+    :param intervalo: Segundos entre dos intentos.
+    :raises ErrorDescarga: Si el bloqueo no se libera dentro del tiempo de espera.
+    """
+    limite = time.monotonic() + espera
+    while True:
+        try:
+            descriptor = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            break
+        except FileExistsError:
+            if _bloqueo_abandonado(ruta):
+                logger.warning(f"Se elimina el bloqueo abandonado '{ruta}'.")
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.monotonic() >= limite:
+                raise ErrorDescarga(f"'{ruta}' sigue bloqueado por otra descarga después de {espera} s.")
+            time.sleep(intervalo)
+    try:
+        with os.fdopen(descriptor, 'w') as f:
+            f.write(str(os.getpid()))
+        yield
+    finally:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def descargar_archivo(url, destino, sha256=None, al_avanzar=None, timeout=60, sesion=None):
+    """
+    Descarga un archivo en bloques grandes. Los bytes se escriben en '<destino>.part'; si ese archivo ya
+    existe se pide el resto con una cabecera Range. El archivo final solo aparece cuando la descarga
+    terminó y, si se indicó, el SHA-256 coincide. Mientras dura la descarga se toma '<destino>.part.lock';
+    quien espera ese bloqueo y encuentra el archivo final ya descargado lo devuelve sin volver a pedirlo.
+
+    :param url: URL del archivo.
+    :param destino: Ruta final del archivo.
+    :param sha256: Hash SHA-256 esperado en hexadecimal. None para no verificarlo.
+    :param al_avanzar: Función (descargado, total) llamada después de cada bloque. total es 0 si no se conoce.
+    :param timeout: Tiempo máximo de espera de la conexión en segundos.
+    :param sesion: Sesión de requests a reutilizar.
+    :return: Ruta del archivo descargado.
+    :raises ErrorDescarga: Si el servidor responde con error, la conexión se corta o el hash no coincide.
+    """
+    import requests
+
+    parcial = f"{destino}.part"
+    with bloqueo_exclusivo(f"{parcial}.lock"):
+        if os.path.exists(destino) and not os.path.exists(parcial):
+            return destino
+        try:
+            return _descargar(url, destino, parcial, sha256, al_avanzar, timeout, sesion or requests.Session())
+        except requests.RequestException as e:
+            # El archivo parcial se conserva para reanudar en el siguiente intento
+            raise ErrorDescarga(f"La descarga de {url} se interrumpió: {e}") from e
+
+
+def _descargar(url, destino, parcial, sha256, al_avanzar, timeout, sesion):
+    descargado = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+    cabeceras = {'Range': f'bytes={descargado}-'} if descargado else {}
+
+    with sesion.get(url, stream=True, headers=cabeceras, timeout=timeout) as response:
+        if response.status_code == 416:
+            # El archivo parcial ya está completo (o es más largo que el remoto); se verifica abajo
+            modo = None
+        elif response.status_code == 206:
+            modo = 'ab'
+        elif response.status_code == 200:
+            # El servidor no admite Range: se empieza de nuevo
+            modo = 'wb'
+            descargado = 0
+        else:
+            raise ErrorDescarga(f"Código de estado {response.status_code} al descargar {url}")
+
+        if modo is not None:
+            total = int(response.headers.get('content-length', 0))
+            total = total + descargado if total else 0
+            with open(parcial, modo) as f:
+                for bloque in response.iter_content(TAMANO_BLOQUE):
+                    f.write(bloque)
+                    descargado += len(bloque)
+                    if al_avanzar:
+                        al_avanzar(descargado, total)
+            if total and descargado < total:
+                # El archivo parcial se conserva para reanudar en el siguiente intento
+                raise ErrorDescarga(f"La descarga de {url} se interrumpió ({descargado} de {total} bytes).")
+
+    if sha256:
+        obtenido = _hash_archivo(parcial, hashlib.sha256()).hexdigest()
+        if obtenido != sha256.lower():
+            os.remove(parcial)
+            raise ErrorDescarga(f"El hash de {os.path.basename(destino)} no coincide "
+                                f"(esperado {sha256}, obtenido {obtenido}).")
+    os.replace(parcial, destino)
+    return destino
+
+
+def extraer_atomico(zip_path, model_dir, model_folder):
+    """
+    Extrae el ZIP en una carpeta temporal dentro de model_dir y la renombra a model_folder al terminar,
+    de modo que una extracción interrumpida nunca deja una carpeta de modelo incompleta.
+
+    :param zip_path: Ruta del ZIP.
+    :param model_dir: Directorio de los modelos.
+    :param model_folder: Nombre de la carpeta final del modelo.
+    :return: Ruta de la carpeta del modelo.
+    :raises ErrorDescarga: Si el ZIP está corrupto.
+    """
+    model_path = os.path.join(model_dir, model_folder)
+    temporal = tempfile.mkdtemp(prefix=f"{PREFIJO_TEMPORAL}{model_folder}-", dir=model_dir)
+    # mkdtemp crea la carpeta con permisos 0700; se extrae en una subcarpeta creada con la umask del proceso
+    # para que la carpeta que se renombra como modelo sea legible por los demás usuarios y servicios
+    contenido = os.path.join(temporal, 'contenido')
+    os.mkdir(contenido)
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            corrupto = zip_ref.testzip()
+            if corrupto is not None:
+                raise ErrorDescarga(f"El archivo '{corrupto}' del ZIP de {model_folder} está corrupto.")
+            for miembro in zip_ref.infolist():
+                ruta = os.path.realpath(os.path.join(contenido, miembro.filename))
+                if not ruta.startswith(os.path.realpath(contenido) + os.sep):
+                    raise ErrorDescarga(f"Ruta no permitida en el ZIP de {model_folder}: {miembro.filename}")
+                if miembro.is_dir():
+                    os.makedirs(ruta, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                with zip_ref.open(miembro) as origen, open(ruta, 'wb') as salida:
+                    shutil.copyfileobj(origen, salida, TAMANO_BLOQUE)
+
+        # El ZIP puede contener la carpeta del modelo o directamente sus archivos
+        origen = os.path.join(contenido, model_folder)
+        if not os.path.isdir(origen):
+            origen = contenido
+        if os.path.islink(model_path) and not os.path.exists(model_path):
+            raise ErrorDescarga(f"'{model_path}' es un enlace simbólico roto; elimínelo para instalar el modelo.")
+        if os.path.exists(model_path):
+            logger.info(f"El modelo '{model_folder}' ya fue extraído por otro proceso.")
+        else:
+            os.replace(origen, model_path)
+    except zipfile.BadZipFile as e:
+        raise ErrorDescarga(f"El ZIP de {model_folder} no es válido: {e}") from e
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+    return model_path
+
+
+def limpiar_temporales(model_dir, antiguedad_minima=3600):
+    """
+    Elimina las carpetas de extracción que quedaron de ejecuciones interrumpidas.
+    Solo se borran las que tienen cierta antigüedad, para no interferir con una extracción en curso.
+
+    :param model_dir: Directorio de los modelos.
+    :param antiguedad_minima: Segundos desde la última modificación para considerar abandonada una carpeta.
+    """
+    if not os.path.isdir(model_dir):
+        return
+    limite = time.time() - antiguedad_minima
+    for nombre in os.listdir(model_dir):
+        ruta = os.path.join(model_dir, nombre)
+        if nombre.startswith(PREFIJO_TEMPORAL) and os.path.getmtime(ruta) < limite:
+            shutil.rmtree(ruta, ignore_errors=True)
+
+
+def obtener_modelo(model_dir, model_folder, file_url, sha256=None, al_avanzar=None, sesion=None):
+    """
+    Descarga y extrae un modelo si su carpeta no existe, verificando el ZIP si se indica su SHA-256.
+
+    :param model_dir: Directorio de los modelos.
+    :param model_folder: Nombre de la carpeta del modelo.
+    :param file_url: URL del ZIP del modelo.
+    :param sha256: Hash SHA-256 esperado del ZIP. None para no verificarlo.
+    :param al_avanzar: Función (descargado, total) llamada durante la descarga.
+    :param sesion: Sesión de requests a reutilizar.
+    :return: Ruta de la carpeta del modelo.
+    :raises ErrorDescarga: Si la descarga, la verificación o la extracción fallan.
+    """
+    model_path = os.path.join(model_dir, model_folder)
+    if os.path.exists(model_path):
+        return model_path
+
+    os.makedirs(model_dir, exist_ok=True)
+    # Otra sesión o proceso puede estar instalando el mismo modelo: se espera y se reutiliza su resultado
+    with bloqueo_exclusivo(os.path.join(model_dir, f"{model_folder}.lock")):
+        if os.path.exists(model_path):
+            return model_path
+        zip_path = os.path.join(model_dir, f"{model_folder}.zip")
+        descargar_archivo(file_url, zip_path, sha256=sha256, al_avanzar=al_avanzar, sesion=sesion)
+        try:
+            extraer_atomico(zip_path, model_dir, model_folder)
+        finally:
+            # Un ZIP inválido se descarta para que el siguiente intento lo descargue de nuevo
+            os.remove(zip_path)
+    return model_path
+
+
+def obtener_modelos(modelos, model_dir, al_progresar=None, intervalo=0.5, max_workers=3):
+    """
+    Descarga varios modelos en paralelo. El progreso se informa desde el hilo que llama, como mucho
+    una vez por intervalo, para que la interfaz pueda actualizarse sin saturarse.
+
+    :param modelos: Diccionario clave -> {'model_folder', 'file_url', 'sha256' (opcional)}.
+    :param model_dir: Directorio de los modelos.
+    :param al_progresar: Función que recibe {clave: (descargado, total)}.
+    :param intervalo: Segundos mínimos entre dos llamadas a al_progresar.
+    :param max_workers: Cantidad de descargas simultáneas.
+    :return: Diccionario clave -> ruta del modelo o excepción si falló.
+    """
+    limpiar_temporales(model_dir)
+    progreso = {key: (0, 0) for key in modelos}
+    lock = threading.Lock()
+
+    def avanzar(key):
+        def al_avanzar(descargado, total):
+            with lock:
+                progreso[key] = (descargado, total)
+        return al_avanzar
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="descarga-modelo") as executor:
+        futuros = {
+            key: executor.submit(obtener_modelo, model_dir, info['model_folder'], info['file_url'],
+                                 info.get('sha256'), avanzar(key))
+            for key, info in modelos.items()
+        }
+        pendientes = set(futuros.values())
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=intervalo)
+            if al_progresar:
+                with lock:
+                    estado = dict(progreso)
+                al_progresar(estado)
+
+    resultados = {}
+    for key, futuro in futuros.items():
+        try:
+            resultados[key] = futuro.result()
+        except Exception as e:
+            logger.error(f"Error al obtener el modelo '{key}': {e}")
+            resultados[key] = e
+    return resultados
+
+
+class ProgresoLimitado:
+    """
+    Envuelve una función de progreso (descargado, total) para llamarla como mucho una vez por intervalo,
+    además de al completar la descarga.
+    """
+
+    def __init__(self, funcion, intervalo=0.25):
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self._ultima = 0.0
+
+    def __call__(self, descargado, total):
+        ahora = time.monotonic()
+        if ahora - self._ultima >= self.intervalo or (total and descargado >= total):
+            self._ultima = ahora
+            self.funcion(descargado, total)
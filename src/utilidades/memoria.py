@@ -0,0 +1,30 @@
+# src/utilidades/memoria.py
+
+import os
+import resource
+import sys
+
+
+def memoria_residente_bytes():
+    """
+    Devuelve la memoria residente (RSS) actual del proceso.
+
+    :return: Memoria residente en bytes, o el pico de memoria si el sistema no expone el valor actual.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            paginas_residentes = int(f.read().split()[1])
+        return paginas_residentes * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return pico_memoria_bytes()
+
+
+def pico_memoria_bytes():
+    """
+    Devuelve el pico de memoria residente del proceso desde su inicio.
+
+    :return: Pico de memoria residente en bytes.
+    """
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KiB y macOS en bytes
+    return pico if sys.platform == 'darwin' else pico * 1024
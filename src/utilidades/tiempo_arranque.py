@@ -0,0 +1,151 @@
+# src/utilidades/tiempo_arranque.py
+# Informe del tiempo de arranque de la aplicación a partir de `python -X importtime`.
+# Se ejecuta en un proceso nuevo para medir un arranque en frío; el código de salida permite usarlo
+# como comprobación de salud.
+#
+# Uso: python -m src.utilidades.tiempo_arranque [--modulo app] [--top 15] [--max-ms 2000] \
+#          [--max-rss-mb 400] [--prohibidos torch transformers albumentations] [--json]
+
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+# Módulos pesados que no deben cargarse al arrancar la aplicación
+MODULOS_PROHIBIDOS = ('torch', 'transformers', 'albumentations')
+
+# Línea de -X importtime: "import time: self [us] | cumulative | imported package"
+_LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+# El proceso hijo imprime en stdout los módulos cargados y el pico de memoria después de importar
+_SCRIPT_HIJO = (
+    "import json, sys, time\n"
+    "inicio = time.perf_counter()\n"
+    "import {modulo}\n"
+    "duracion = time.perf_counter() - inicio\n"
+    "from src.utilidades.memoria import pico_memoria_bytes\n"
+    "print(json.dumps({{'modulos': sorted(sys.modules), 'segundos': duracion, 'pico_rss': pico_memoria_bytes()}}))\n"
+)
+
+
+def parsear_importtime(salida):
+    """
+    Interpreta la salida de `python -X importtime`.
+
+    :param salida: Texto de stderr del proceso.
+    :return: Lista de diccionarios con 'modulo', 'propio_us', 'acumulado_us' y 'nivel'.
+    """
+    registros = []
+    for linea in salida.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            registros.append({
+                'modulo': modulo,
+                'propio_us': int(propio),
+                'acumulado_us': int(acumulado),
+                'nivel': (len(sangria) - 1) // 2
+            })
+    return registros
+
+
+def desglose_por_paquete(registros):
+    """
+    Agrupa el tiempo propio de cada módulo por su paquete de primer nivel.
+
+    :param registros: Resultado de parsear_importtime.
+    :return: Lista de tuplas (paquete, microsegundos) ordenada de mayor a menor.
+    """
+    totales = defaultdict(int)
+    for registro in registros:
+        totales[registro['modulo'].split('.')[0]] += registro['propio_us']
+    return sorted(totales.items(), key=lambda item: item[1], reverse=True)
+
+
+def medir_arranque(modulo='app'):
+    """
+    Importa el módulo en un proceso nuevo con -X importtime.
+
+    :param modulo: Módulo a importar.
+    :return: Diccionario con 'segundos', 'pico_rss', 'modulos' (cargados) y 'registros' (importtime).
+    :raises RuntimeError: Si la importación falla.
+    """
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT_HIJO.format(modulo=modulo)],
+        capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar '{modulo}':\n{proceso.stderr[-2000:]}")
+    datos = json.loads(proceso.stdout.strip().splitlines()[-1])
+    datos['registros'] = parsear_importtime(proceso.stderr)
+    return datos
+
+
+def comprobar(datos, max_ms=None, max_rss_mb=None, prohibidos=MODULOS_PROHIBIDOS):
+    """
+    Verifica los umbrales del arranque.
+
+    :param datos: Resultado de medir_arranque.
+    :param max_ms: Tiempo máximo de importación en milisegundos. None para no comprobarlo.
+    :param max_rss_mb: Pico de memoria máximo en MB. None para no comprobarlo.
+    :param prohibidos: Paquetes que no deben estar cargados después del arranque.
+    :return: Lista de mensajes de error; vacía si todo está en orden.
+    """
+    errores = []
+    milisegundos = datos['segundos'] * 1000
+    if max_ms is not None and milisegundos > max_ms:
+        errores.append(f"El arranque tardó {milisegundos:.0f} ms (máximo {max_ms:.0f} ms).")
+    rss_mb = datos['pico_rss'] / 1024 ** 2
+    if max_rss_mb is not None and rss_mb > max_rss_mb:
+        errores.append(f"El pico de memoria fue {rss_mb:.0f} MB (máximo {max_rss_mb:.0f} MB).")
+    cargados = {nombre.split('.')[0] for nombre in datos['modulos']}
+    for paquete in prohibidos:
+        if paquete in cargados:
+            errores.append(f"El paquete '{paquete}' se importa durante el arranque.")
+    return errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informe del tiempo de arranque de la aplicación.")
+    parser.add_argument('--modulo', default='app', help="Módulo a importar.")
+    parser.add_argument('--top', type=int, default=15, help="Cantidad de paquetes a mostrar.")
+    parser.add_argument('--max-ms', type=float, default=None, help="Tiempo máximo de importación.")
+    parser.add_argument('--max-rss-mb', type=float, default=None, help="Pico de memoria máximo.")
+    parser.add_argument('--prohibidos', nargs='*', default=list(MODULOS_PROHIBIDOS),
+                        help="Paquetes que no deben cargarse al arrancar.")
+    parser.add_argument('--json', action='store_true', help="Imprime el informe en JSON.")
+    args = parser.parse_args()
+
+    try:
+        datos = medir_arranque(args.modulo)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+    desglose = desglose_por_paquete(datos['registros'])[:args.top]
+    errores = comprobar(datos, args.max_ms, args.max_rss_mb, args.prohibidos)
+
+    if args.json:
+        print(json.dumps({
+            'modulo': args.modulo,
+            'milisegundos': round(datos['segundos'] * 1000, 1),
+            'pico_rss_mb': round(datos['pico_rss'] / 1024 ** 2, 1),
+            'paquetes': {paquete: round(us / 1000, 1) for paquete, us in desglose},
+            'errores': errores
+        }, ensure_ascii=False))
+    else:
+        print(f"Importación de '{args.modulo}': {datos['segundos'] * 1000:.0f} ms, "
+              f"pico de memoria {datos['pico_rss'] / 1024 ** 2:.0f} MB")
+        print(f"{'Paquete':<30}{'ms':>10}")
+        for paquete, us in desglose:
+            print(f"{paquete:<30}{us / 1000:>10.1f}")
+        for error in errores:
+            print(f"ERROR: {error}")
+
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()